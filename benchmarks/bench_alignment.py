@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+句子对齐基准测试
+基于仓库中已有评估报告里的句对构造带有漏译、2:1合并、1:2拆分的合成文档，测量对齐速度和准确率（含各类句对的准确率）
+示例句对较少，同一篇文档里相邻位置常出现重复的句子，此时对齐到相邻的相同句子同样算正确，
+因此按句对的文本而不是下标比较；准确率或漏译（1:0）句对的准确率低于阈值时以非零状态退出
+
+用法: python benchmarks/bench_alignment.py --docs 2000 [--min-accuracy 0.85] [--min-deletion-accuracy 0.5]
+"""
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.sentence_aligner import align_sentences  # noqa: E402
+
+
+def load_sample_pairs(root):
+    """从已有评估报告中读取已经人工对齐的 (原文, 用户翻译) 句对"""
+    from modules.translation_evaluator import split_evaluation_sections, parse_sentence_section
+
+    pairs = []
+    for report_path in sorted((root / 'translation_results').glob('*.md')):
+        content = report_path.read_text(encoding='utf-8')
+        for section in split_evaluation_sections(content):
+            result = parse_sentence_section(section)
+            if result['original'] and result['user_translation']:
+                pairs.append((result['original'].replace('**', ''), result['user_translation']))
+    return pairs
+
+
+def make_document(pairs, rng, length=20):
+    """随机抽取句对构造文档，并随机制造漏译、两句合并为一行（2:1）和一句拆成两行（1:2），返回 (英文, 翻译, 正确的对齐)"""
+    english, translations, gold = [], [], []
+    sampled = rng.choices(pairs, k=length)
+    i = 0
+    while i < len(sampled):
+        eng, trans = sampled[i]
+        action = rng.random()
+        if action < 0.05:
+            # 漏译
+            english.append(eng)
+            gold.append(((len(english) - 1,), ()))
+        elif action < 0.10 and i + 1 < len(sampled):
+            # 两句的翻译合并为一行
+            next_eng, next_trans = sampled[i + 1]
+            english.extend([eng, next_eng])
+            translations.append(trans + next_trans)
+            gold.append(((len(english) - 2, len(english) - 1), (len(translations) - 1,)))
+            i += 1
+        elif action < 0.15 and len(trans) > 8:
+            # 一句拆成两行
+            cut = len(trans) // 2
+            english.append(eng)
+            translations.extend([trans[:cut], trans[cut:]])
+            gold.append(((len(english) - 1,), (len(translations) - 2, len(translations) - 1)))
+        else:
+            english.append(eng)
+            translations.append(trans)
+            gold.append(((len(english) - 1,), (len(translations) - 1,)))
+        i += 1
+    return english, translations, gold
+
+
+def bead_text(english, translations, bead):
+    """句对对应的 (英文, 翻译) 文本，用于在有重复句子时判断对齐是否等价"""
+    english_indices, translation_indices = bead
+    return (
+        ' '.join(english[i] for i in english_indices),
+        ''.join(translations[j] for j in translation_indices),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="句子对齐基准测试")
+    parser.add_argument('--docs', type=int, default=2000, help="文档数量")
+    parser.add_argument('--length', type=int, default=20, help="每篇文档的句子数")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--min-accuracy', type=float, default=0.85, help="总体对齐准确率下限")
+    parser.add_argument('--min-deletion-accuracy', type=float, default=0.5, help="漏译（1:0）句对准确率下限")
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parent.parent
+    pairs = load_sample_pairs(root)
+    if not pairs:
+        print("没有找到可用的示例文章和翻译")
+        return 1
+
+    rng = random.Random(args.seed)
+    documents = [make_document(pairs, rng, args.length) for _ in range(args.docs)]
+
+    start = time.perf_counter()
+    results = [align_sentences(english, translations) for english, translations, _ in documents]
+    elapsed = time.perf_counter() - start
+
+    correct = total = 0
+    by_type = {}
+    for (english, translations, gold), aligned in zip(documents, results):
+        predicted = Counter(
+            (len(pair.english_indices), len(pair.translation_indices),
+             bead_text(english, translations, (pair.english_indices, pair.translation_indices)))
+            for pair in aligned
+        )
+        for bead in gold:
+            key = (len(bead[0]), len(bead[1]), bead_text(english, translations, bead))
+            hit = predicted[key] > 0
+            if hit:
+                predicted[key] -= 1
+            bead_type = f"{len(bead[0])}:{len(bead[1])}"
+            hits = by_type.setdefault(bead_type, [0, 0])
+            hits[0] += hit
+            hits[1] += 1
+            correct += hit
+        total += len(gold)
+
+    print(f"文档数: {args.docs}, 每篇句数: {args.length}")
+    print(f"总耗时: {elapsed:.3f} 秒")
+    print(f"吞吐量: {args.docs / elapsed:.0f} 篇/秒")
+    print(f"对齐准确率: {correct / total:.1%}")
+    for bead_type, (hits, count) in sorted(by_type.items()):
+        print(f"  {bead_type} 句对: {hits / count:.1%}（{count} 个）")
+
+    failed = False
+    if correct / total < args.min_accuracy:
+        print(f"对齐准确率低于 {args.min_accuracy:.0%}")
+        failed = True
+    deletion_hits, deletion_count = by_type.get('1:0', (0, 0))
+    if deletion_count and deletion_hits / deletion_count < args.min_deletion_accuracy:
+        print(f"漏译句对准确率低于 {args.min_deletion_accuracy:.0%}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+评分分析基准测试
+在临时目录中生成合成评估报告（默认约10万句），测量首次解析、增量刷新和各项向量化查询的耗时
+
+用法: python benchmarks/bench_analytics.py --reports 5000 --sentences 20
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.score_analytics import ScoreAnalytics  # noqa: E402
+
+WORDS = [f"word{i}" for i in range(3000)]
+
+
+def write_reports(results_dir, articles_dir, reports, sentences, rng):
+    """生成文章和对应的评估报告，评估时间分布在最近90天内"""
+    word_lists = [f"list{i}" for i in range(20)]
+    for article in range(reports // 10 + 1):
+        (articles_dir / f"{rng.choice(word_lists)}-Article_{article}-{article}.md").write_text(
+            f"# Article {article}\n\n**单词列表**: x\n\nText.\n", encoding='utf-8')
+
+    now = time.time()
+    for report in range(reports):
+        article = rng.randrange(reports // 10 + 1)
+        evaluated_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now - rng.random() * 90 * 86400))
+        sections = []
+        for number in range(1, sentences + 1):
+            bold = " ".join(f"**{word}**" for word in rng.sample(WORDS, 2))
+            sections.append(f"## **SENTENCE {number}**\n\n**原文**: The {bold} sentence.  \n"
+                            f"**用户翻译**: 译文  \n**标准翻译**: 译文  \n***流畅翻译***: 译文  \n"
+                            f"**评分**: {rng.randint(1, 10)}  \n**评价**: 评价")
+        (results_dir / f"AI_translation_evaluation_{report:06d}.md").write_text(
+            f"# AI翻译评估报告\n\n## 基本信息\n- **原文章标题**: Article {article}\n"
+            f"- **翻译文件**: translation_{report % 500}.txt\n- **评估时间**: {evaluated_at}\n"
+            f"- **评估模型**: m\n\n## 详细评估结果\n\n" + "\n\n".join(sections), encoding='utf-8')
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="评分分析基准测试")
+    parser.add_argument('--reports', type=int, default=5000, help="报告数量")
+    parser.add_argument('--sentences', type=int, default=20, help="每个报告的句子数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        results_dir, articles_dir = Path(tmp) / 'results', Path(tmp) / 'articles'
+        results_dir.mkdir()
+        articles_dir.mkdir()
+        write_reports(results_dir, articles_dir, args.reports, args.sentences, rng)
+
+        analytics = ScoreAnalytics(results_dir, articles_dir)
+        _, cold_ms = timed(analytics.refresh)
+        _, load_ms = timed(lambda: ScoreAnalytics(results_dir, articles_dir))
+        _, warm_ms = timed(analytics.refresh)
+
+        # 修改1%的报告后增量刷新
+        for path in sorted(results_dir.glob('*.md'))[::100]:
+            path.write_text(path.read_text(encoding='utf-8').replace('**评分**: 1 ', '**评分**: 2 '),
+                            encoding='utf-8')
+        _, incremental_ms = timed(analytics.refresh)
+
+        queries = {
+            'summary_by_article': lambda: analytics.summary_by('article'),
+            'summary_by_word_list': lambda: analytics.summary_by('word_list'),
+            'summary_by_translation': lambda: analytics.summary_by('translation'),
+            'weakest_words': lambda: analytics.weakest_words(20),
+            'score_over_time': lambda: analytics.score_over_time('day'),
+        }
+        query_ms = {name: timed(query)[1] for name, query in queries.items()}
+
+        report = {
+            'reports': args.reports,
+            'sentences': int(len(analytics.columns['sentence_score'])),
+            'cold_refresh_ms': cold_ms,
+            'load_cache_ms': load_ms,
+            'warm_refresh_ms': warm_ms,
+            'incremental_refresh_ms': incremental_ms,
+            'query_ms': query_ms,
+        }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
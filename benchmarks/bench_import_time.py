@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+导入耗时基准测试
+在全新的子进程中测量各场景的启动耗时（扣除空解释器的基线），并检查只做文件操作时没有加载 openai，
+超过阈值时返回非零退出码，可用于防止导入耗时回退
+
+用法: python benchmarks/bench_import_time.py --repeat 7 --max-ms 100 --output import_time.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 场景名 -> (代码, 是否允许加载openai)
+SCENARIOS = {
+    'import_package': ("import modules", False),
+    'file_operations': (
+        "from modules import check_project_structure, get_available_word_lists\n"
+        "from modules.article_generator import check_word_coverage", False
+    ),
+    'catalog_queries': ("from modules import get_available_articles, get_catalog", False),
+    'client_init_deferred': ("from modules import init_openai_client, generate_articles_with_ai", False),
+    'openai_sdk': ("import openai", True),
+}
+
+CHECK_OPENAI = "\nimport sys\nif 'openai' in sys.modules:\n    sys.exit(3)\n"
+
+
+def run_once(code):
+    """在新进程中运行一段代码，返回耗时（毫秒）和退出码"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT)
+    return (time.perf_counter() - start) * 1000, result.returncode
+
+
+def measure(code, repeat):
+    """多次运行取中位数"""
+    timings, codes = [], set()
+    for _ in range(repeat):
+        elapsed, returncode = run_once(code)
+        timings.append(elapsed)
+        codes.add(returncode)
+    return statistics.median(timings), codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时基准测试")
+    parser.add_argument('--repeat', type=int, default=7, help="每个场景运行次数（取中位数）")
+    parser.add_argument('--max-ms', type=float, default=100.0, help="不加载openai的场景允许的最大耗时（毫秒，已扣除基线）")
+    parser.add_argument('--output', help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    baseline, _ = measure("pass", args.repeat)
+    report = {'baseline_ms': baseline, 'max_ms': args.max_ms, 'scenarios': {}}
+    failures = []
+
+    for name, (code, allow_openai) in SCENARIOS.items():
+        elapsed, codes = measure(code + CHECK_OPENAI, args.repeat)
+        net = max(0.0, elapsed - baseline)
+        loaded_openai = 3 in codes
+        report['scenarios'][name] = {'total_ms': elapsed, 'net_ms': net, 'loaded_openai': loaded_openai}
+
+        if codes - {0, 3}:
+            failures.append(f"{name}: 运行出错")
+        elif not allow_openai and loaded_openai:
+            failures.append(f"{name}: 加载了openai")
+        elif not allow_openai and net > args.max_ms:
+            failures.append(f"{name}: {net:.1f}ms 超过 {args.max_ms:.0f}ms")
+
+    report['failures'] = failures
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
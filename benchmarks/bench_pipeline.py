@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+端到端流水线基准测试（离线）
+启动本地模拟服务，依次运行 文章生成 -> 解析保存 -> 单词覆盖检查 和 正文提取 -> 翻译评估 -> 生成报告，
+输出吞吐量、p50/p99延迟和内存峰值，可保存为JSON用于回归对比
+
+用法: python benchmarks/bench_pipeline.py --iterations 20 --concurrency 4 --output bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_openai_server import FakeOpenAIServer  # noqa: E402
+from modules.article_generator import (  # noqa: E402
+    generate_articles_with_ai, parse_and_save_articles, check_word_coverage
+)
+from modules.config_manager import init_openai_client  # noqa: E402
+from modules.metrics import percentile  # noqa: E402
+from modules.translation_evaluator import (  # noqa: E402
+    extract_article_content, evaluate_translation_with_ai, generate_evaluation_report
+)
+from modules.word_manager import read_word_list  # noqa: E402
+
+
+def summarize(latencies, elapsed, failures):
+    """汇总某个阶段的延迟和吞吐量"""
+    return {
+        'count': len(latencies),
+        'failures': failures,
+        'throughput_per_sec': len(latencies) / elapsed if elapsed else None,
+        'p50_sec': percentile(latencies, 50),
+        'p99_sec': percentile(latencies, 99),
+        'mean_sec': statistics.mean(latencies) if latencies else None,
+    }
+
+
+def run_generation(client, model, words, articles_dir):
+    """生成 -> 解析保存 -> 覆盖检查，返回保存的文章"""
+    ai_output = generate_articles_with_ai(client, model, words, 2, "任意", "说明文", "简单")
+    if not ai_output:
+        raise RuntimeError("文章生成失败")
+    saved_articles = parse_and_save_articles(ai_output, 'bench', articles_dir)
+    if not saved_articles:
+        raise RuntimeError("文章解析失败")
+    check_word_coverage(saved_articles, words)
+    return saved_articles
+
+
+def run_evaluation(client, model, article, results_dir):
+    """正文提取 -> 翻译评估 -> 生成报告"""
+    english_sentences = extract_article_content(article['path'])
+    # 模拟用户翻译：每句一行
+    user_translations = [f"模拟翻译第{i}句" for i in range(1, len(english_sentences) + 1)]
+    evaluation_result = evaluate_translation_with_ai(client, model, english_sentences, user_translations)
+    generate_evaluation_report(evaluation_result, article['title'], 'bench.txt', model, results_dir)
+
+
+def run_stage(name, func, items, concurrency):
+    """并发运行某个阶段，返回 (结果列表, 统计)"""
+    latencies, results, failures = [], [], 0
+
+    def timed(item):
+        start = time.perf_counter()
+        result = func(item)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(timed, item) for item in items]:
+            try:
+                latency, result = future.result()
+                latencies.append(latency)
+                results.append(result)
+            except Exception as e:
+                failures += 1
+                print(f"[{name}] 失败: {e}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    return results, summarize(latencies, elapsed, failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线端到端流水线基准测试")
+    parser.add_argument('--iterations', type=int, default=20, help="每个阶段运行次数")
+    parser.add_argument('--concurrency', type=int, default=4, help="并发数")
+    parser.add_argument('--latency', type=float, default=0.05, help="模拟服务的请求延迟（秒）")
+    parser.add_argument('--token-rate', type=float, default=0, help="模拟服务输出速率（token/秒），0表示不限速")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="模拟服务错误率")
+    parser.add_argument('--word-list', default=str(ROOT / 'word_lists' / 'list1.txt'), help="使用的单词列表")
+    parser.add_argument('--output', help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    words = read_word_list(args.word_list)
+
+    with FakeOpenAIServer(latency=args.latency, token_rate=args.token_rate,
+                          error_rate=args.error_rate) as server, \
+            tempfile.TemporaryDirectory() as workdir:
+        articles_dir = os.path.join(workdir, 'articles')
+        results_dir = os.path.join(workdir, 'translation_results')
+        os.makedirs(articles_dir)
+        os.makedirs(results_dir)
+
+        config = {'openai': {'api_key': 'fake-key', 'model': 'fake-model', 'base_url': server.base_url}}
+        client, model = init_openai_client(config)
+
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            saved, generation_stats = run_stage(
+                'generation', lambda _: run_generation(client, model, words, articles_dir),
+                range(args.iterations), args.concurrency
+            )
+            articles = [article for batch in saved for article in batch][:args.iterations]
+            _, evaluation_stats = run_stage(
+                'evaluation', lambda article: run_evaluation(client, model, article, results_dir),
+                articles, args.concurrency
+            )
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        report = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'settings': vars(args),
+            'server_requests': server.request_count,
+            'server_errors': server.error_count,
+            'generation': generation_stats,
+            'evaluation': evaluation_stats,
+            'peak_memory_mb': peak_bytes / 1024 / 1024,
+        }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+模型路由基准测试
+启动多个本地模拟端点（一个有长尾延迟、一个较慢但稳定、一个持续出错），对比开启和关闭对冲请求时的p50/p99延迟，
+并检查出错端点被暂停、请求自动切换到其他端点
+
+用法: python benchmarks/bench_router.py --requests 200 --concurrency 8
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_openai_server import FakeOpenAIServer  # noqa: E402
+from modules.metrics import percentile  # noqa: E402
+from modules.model_router import init_model_router  # noqa: E402
+
+REQUEST = {'messages': [{'role': 'user', 'content': 'ping'}], 'max_tokens': 20}
+
+
+def run(router, requests, concurrency, hedge):
+    """并发发送请求，返回延迟列表（秒）和失败数"""
+    def call(_):
+        start = time.perf_counter()
+        try:
+            router.chat.completions.create(model='router', hedge=hedge, **REQUEST)
+            return time.perf_counter() - start, True
+        except Exception:
+            return time.perf_counter() - start, False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(requests)))
+    return [elapsed for elapsed, ok in results if ok], sum(1 for _, ok in results if not ok)
+
+
+def summarize(latencies, failures):
+    latencies = sorted(latencies)
+    return {
+        'ok': len(latencies),
+        'failed': failures,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型路由基准测试")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--output', help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    report = {}
+    with FakeOpenAIServer(latency=0.05, token_rate=0, tail_rate=0.03, tail_latency=2.0, seed=1) as fast, \
+            FakeOpenAIServer(latency=0.15, token_rate=0, seed=2) as steady, \
+            FakeOpenAIServer(latency=0.01, token_rate=0, error_rate=1.0, seed=3) as broken:
+        endpoints = [
+            {'name': 'broken', 'model': 'broken-model', 'base_url': broken.base_url, 'client': {'max_retries': 0}},
+            {'name': 'fast', 'model': 'fast-model', 'base_url': fast.base_url},
+            {'name': 'steady', 'model': 'steady-model', 'base_url': steady.base_url},
+        ]
+        for hedge in (False, True):
+            config = {
+                'openai': {'api_key': 'k', 'model': 'unused'},
+                'router': {'enabled': True, 'endpoints': endpoints, 'hedge': hedge, 'cooldown': 60},
+            }
+            router, _ = init_model_router(config)
+            latencies, failures = run(router, args.requests, args.concurrency, hedge)
+            name = 'hedged' if hedge else 'no_hedge'
+            report[name] = dict(summarize(latencies, failures), endpoints=router.status())
+            print(f"\n[{name}]")
+            router.display_status()
+
+    print(json.dumps({name: {k: v for k, v in result.items() if k != 'endpoints'}
+                      for name, result in report.items()}, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
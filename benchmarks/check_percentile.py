@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+百分位数回归检查
+检查 metrics.percentile 使用最近秩法（第 ceil(q/100*n) 个值），指标汇总、基准测试和对冲阈值都依赖它，有错误时返回非零退出码
+
+用法: python benchmarks/check_percentile.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.metrics import percentile  # noqa: E402
+
+# (数据, 百分位, 期望值)
+CASES = [
+    ([1, 2], 50, 1),
+    ([1, 2, 3], 50, 2),
+    ([1, 2, 3, 4], 50, 2),
+    (list(range(1, 21)), 95, 19),
+    (list(range(1, 101)), 95, 95),
+    (list(range(1, 101)), 99, 99),
+    (list(range(1, 101)), 100, 100),
+    (list(range(1, 101)), 0, 1),
+    ([5], 95, 5),
+    ([3, 1, 2], 50, 2),
+    ([], 50, None),
+]
+
+
+def main():
+    failures = []
+    for values, q, expected in CASES:
+        result = percentile(values, q)
+        if result != expected:
+            failures.append(f"p{q}({values if len(values) <= 5 else f'{len(values)} 个值'}) = {result}，应为 {expected}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    print(f"检查 {len(CASES)} 个百分位数用例，失败 {len(failures)} 项")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
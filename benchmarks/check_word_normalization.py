@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+词形归一回归检查
+检查同一单词的不同词形归一为相同结果、不同单词不会互相混淆（单词覆盖统计依赖这一点），有错误时返回非零退出码
+
+用法: python benchmarks/check_word_normalization.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.word_index import normalize_word  # noqa: E402
+
+# 每组中的词形必须归一为相同结果
+SAME = [
+    ['need', 'needs', 'needed', 'needing'],
+    ['see', 'sees', 'seeing'],
+    ['feed', 'feeds', 'feeding'],
+    ['proceed', 'proceeds', 'proceeding', 'Proceedings'],
+    ['bare', 'bared'],
+    ['bar', 'bars', 'barred'],
+    ['owe', 'owes', 'owed', 'owing'],
+    ['hope', 'hopes', 'hoped', 'hoping'],
+    ['hop', 'hops', 'hopped', 'hopping'],
+    ['cause', 'causes', 'caused', 'causing'],
+    ['create', 'created', 'creating'],
+    ['study', 'studies', 'studied', 'studying'],
+    ['watch', 'watches', 'watched'],
+    ['tie', 'ties', 'tied'],
+    ['use', 'uses', 'used', 'using'],
+]
+
+# 每对单词不能归一为相同结果
+DIFFERENT = [
+    ('see', 'seed'), ('fee', 'feed'), ('bare', 'bar'), ('need', 'ne'), ('hope', 'hop'),
+    ('lower', 'low'), ('power', 'pow'), ('bring', 'br'), ('proceed', 'proc'),
+]
+
+
+def main():
+    failures = []
+    for forms in SAME:
+        results = {form: normalize_word(form) for form in forms}
+        if len(set(results.values())) != 1:
+            failures.append(f"应相同: {results}")
+    for a, b in DIFFERENT:
+        if normalize_word(a) == normalize_word(b):
+            failures.append(f"应不同: {a} / {b} -> {normalize_word(a)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    print(f"检查 {len(SAME)} 组相同词形、{len(DIFFERENT)} 对不同单词，失败 {len(failures)} 项")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟的 chat completions 服务
+支持设置延迟、输出速率、错误率和固定输出，按请求内容返回 === ARTICLE === 或 ## **SENTENCE N** 格式的结果
+
+用法: python benchmarks/fake_openai_server.py --port 8765 --latency 0.5
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.text_utils import estimate_tokens  # noqa: E402
+
+TARGET_WORDS_PATTERN = re.compile(r'Target words that MUST be included:\s*(.*)')
+ARTICLE_COUNT_PATTERN = re.compile(r'Please write (\d+) English articles|Number of articles:\s*(\d+)')
+SENTENCE_PAIR_PATTERN = re.compile(r'句子 (\d+):\s*\n英文原文:\s*(.*)\n用户翻译:\s*(.*)')
+
+
+def build_article_output(prompt, rng):
+    """根据提示词中的目标单词生成 === ARTICLE === 格式的文章"""
+    words_match = TARGET_WORDS_PATTERN.search(prompt)
+    words = [w.strip() for w in words_match.group(1).split(',')] if words_match else ['example']
+    count_match = ARTICLE_COUNT_PATTERN.search(prompt)
+    count = int(count_match.group(1) or count_match.group(2)) if count_match else 2
+
+    articles = []
+    for n in range(1, count + 1):
+        sentences = []
+        for word in rng.sample(words, len(words)):
+            sentences.append(f"Students often discuss how the word **{word}** is used in daily life.")
+            sentences.append(f"A clear example of **{word}** helps readers remember it.")
+        articles.append(
+            f"=== ARTICLE {n} ===\n"
+            f"Title: Practice Article {n} {rng.randint(1000, 9999)}\n"
+            f"Abstract: A generated practice article that uses the target vocabulary.\n"
+            f"---\n"
+            + ' '.join(sentences) + "\n"
+            f"=== END ARTICLE {n} ==="
+        )
+    return '\n\n'.join(articles)
+
+
+def build_structured_evaluation_output(prompt, rng):
+    """根据提示词中的句对生成符合评估JSON Schema的结构化结果"""
+    sentences = [{
+        'index': int(number),
+        'reference': translation,
+        'fluent': translation,
+        'score': rng.randint(4, 10),
+        'comment': "翻译基本准确，注意***词汇***选择和*流畅度*。"
+    } for number, english, translation in SENTENCE_PAIR_PATTERN.findall(prompt)]
+    return json.dumps({'sentences': sentences}, ensure_ascii=False)
+
+
+def build_evaluation_output(prompt, rng):
+    """根据提示词中的句对生成 ## **SENTENCE N** 格式的评估结果"""
+    sections = []
+    scores = []
+    for number, english, translation in SENTENCE_PAIR_PATTERN.findall(prompt):
+        score = rng.randint(4, 10)
+        scores.append(score)
+        sections.append(
+            f"## **SENTENCE {number}**\n\n"
+            f"**原文**: {english}  \n"
+            f"**用户翻译**: {translation}  \n"
+            f"**标准翻译**: {translation}  \n"
+            f"***流畅翻译***: {translation}  \n"
+            f"**评分**: {score}  \n"
+            f"**评价**: 翻译基本准确，注意***词汇***选择和*流畅度*。"
+        )
+    if '## **整体评估**' in prompt and '不需要提供整体评估' not in prompt:
+        average = round(sum(scores) / len(scores)) if scores else 0
+        sections.append(
+            "## **整体评估**\n\n"
+            f"**整体评分**: {average}  \n"
+            "**总体评价**: 模拟评估结果。  \n"
+            "***主要优点***: 大意准确。  \n"
+            "~~主要问题~~: 部分词汇不够精确。  \n"
+            "***改进建议***: 多积累专业词汇。"
+        )
+    return '\n\n'.join(sections)
+
+
+class FakeOpenAIServer:
+    """在后台线程中运行的模拟 OpenAI chat completions 服务"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.2, token_rate=500.0, error_rate=0.0,
+                 article_output=None, evaluation_output=None, seed=0, error_status=500, retry_after=None,
+                 tail_rate=0.0, tail_latency=0.0):
+        self.latency = latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.article_output = article_output
+        self.evaluation_output = evaluation_output
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.seen_prefixes = set()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """启动服务，返回 base_url"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        """停止服务"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def cached_prefix_tokens(self, body):
+        """模拟服务端前缀缓存：首条消息与之前的请求完全相同时，其token计为缓存命中"""
+        messages = body.get('messages') or [{}]
+        prefix = str(messages[0].get('content', ''))
+        with self.rng_lock:
+            hit = prefix in self.seen_prefixes
+            self.seen_prefixes.add(prefix)
+        return estimate_tokens(prefix) if hit else 0
+
+    def build_output(self, body):
+        """根据请求内容生成模拟输出"""
+        prompt = '\n'.join(str(m.get('content', '')) for m in body.get('messages', []))
+        with self.rng_lock:
+            rng = random.Random(self.rng.random())
+        if (body.get('response_format') or {}).get('type') == 'json_schema':
+            return build_structured_evaluation_output(prompt, rng)
+        if '=== ARTICLE' in prompt:
+            return self.article_output or build_article_output(prompt, rng)
+        if 'SENTENCE' in prompt:
+            return self.evaluation_output or build_evaluation_output(prompt, rng)
+        return "OK"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': 'not found', 'type': 'invalid_request_error'}})
+                    return
+
+                with server.rng_lock:
+                    server.request_count += 1
+                    failed = server.rng.random() < server.error_rate
+                    if failed:
+                        server.error_count += 1
+                    # 以 tail_rate 的概率额外延迟，模拟长尾延迟
+                    delay = server.latency + (server.tail_latency if server.rng.random() < server.tail_rate else 0)
+                time.sleep(delay)
+                if failed:
+                    headers = {'Retry-After': str(server.retry_after)} if server.retry_after is not None else None
+                    self._send_json(server.error_status,
+                                    {'error': {'message': 'simulated error', 'type': 'server_error'}}, headers)
+                    return
+
+                content = server.build_output(body)
+                prompt_tokens = sum(estimate_tokens(str(m.get('content', ''))) for m in body.get('messages', []))
+                completion_tokens = estimate_tokens(content)
+                usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                         'total_tokens': prompt_tokens + completion_tokens,
+                         'prompt_tokens_details': {'cached_tokens': server.cached_prefix_tokens(body)}}
+                model = body.get('model', 'fake-model')
+
+                if body.get('stream'):
+                    self._stream(content, model, usage)
+                    return
+
+                if server.token_rate:
+                    time.sleep(completion_tokens / server.token_rate)
+                self._send_json(200, {
+                    'id': f"chatcmpl-fake-{server.request_count}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': usage
+                })
+
+            def _stream(self, content, model, usage):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                pieces = re.findall(r'\S+\s*|\s+', content)
+                for i, piece in enumerate(pieces):
+                    chunk = {
+                        'id': 'chatcmpl-fake-stream', 'object': 'chat.completion.chunk',
+                        'created': int(time.time()), 'model': model,
+                        'choices': [{'index': 0, 'delta': {'content': piece},
+                                     'finish_reason': 'stop' if i == len(pieces) - 1 else None}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    if server.token_rate:
+                        time.sleep(estimate_tokens(piece) / server.token_rate)
+                final = {'id': 'chatcmpl-fake-stream', 'object': 'chat.completion.chunk',
+                         'created': int(time.time()), 'model': model, 'choices': [], 'usage': usage}
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的 OpenAI chat completions 服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help="每个请求的固定延迟（秒）")
+    parser.add_argument('--token-rate', type=float, default=500.0, help="输出速率（token/秒），0表示不限速")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回错误的概率")
+    parser.add_argument('--error-status', type=int, default=500, help="错误响应的状态码，例如429")
+    parser.add_argument('--retry-after', type=float, help="错误响应中的Retry-After（秒）")
+    parser.add_argument('--tail-rate', type=float, default=0.0, help="出现长尾延迟的概率")
+    parser.add_argument('--tail-latency', type=float, default=0.0, help="长尾请求额外的延迟（秒）")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency, args.token_rate, args.error_rate,
+                              error_status=args.error_status, retry_after=args.retry_after,
+                              tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+    print(f"模拟服务已启动: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,26 +8,109 @@ English2 学习系统模块包
 - article_generator: AI文章生成
 - translation_evaluator: AI翻译评估
 - file_manager: 文件管理工具
+- llm_cache: LLM响应磁盘缓存
+- chunked_evaluator: 分块并行翻译评估
+- text_utils: 文本工具
+- sentence_aligner: 原文句子与翻译行的本地对齐
+- word_index: 文章单词倒排索引
+- catalog: 文章、翻译和报告的SQLite目录索引
+- metrics: LLM调用与流水线阶段的性能指标
+- managed_client: 共享连接池、重试和限流的托管客户端
+- batch_jobs: 批量离线生成与评估任务
+- article_repair: 针对覆盖不足单词的文章修补
+- word_sharding: 大型单词列表分片并发生成
+- atomic_store: 原子写入与不冲突的文件ID
+- corpus_store: 压缩分段存储的打包语料库
+- watch_daemon: 监控翻译目录并自动评估
+- pair_cache: 句对评估缓存与增量评估
+- structured_evaluation: JSON结构化输出评估与紧凑记录
+- score_analytics: 评估报告评分的列式缓存与统计分析
+- prescreen: 评估前的本地预筛
+- model_router: 多模型端点路由与对冲请求
+- prompt_templates: 带版本号、静态前缀的提示词模板
+- job_journal: 可断点续跑的批量任务日志
 """
 
 __version__ = "1.0.0"
 __author__ = "English2 Learning System"
 
-# 导入主要模块
-from .config_manager import load_config, init_openai_client, setup_environment
-from .word_manager import get_available_word_lists, display_word_lists, select_word_list
-from .article_generator import generate_articles_with_ai, parse_and_save_articles, display_generated_articles
-from .translation_evaluator import (
-    get_available_articles, get_available_translations, 
-    evaluate_translation_with_ai, generate_evaluation_report
-)
-from .file_manager import ensure_directory, check_project_structure, display_project_status
+import importlib
+
+# 属性名 -> 所在子模块；首次访问属性时才导入对应子模块（PEP 562），
+# 这样只做文件操作的脚本不会加载 openai 等依赖
+_LAZY_ATTRIBUTES = {
+    'config_manager': ['load_config', 'init_openai_client', 'setup_environment'],
+    'word_manager': ['get_available_word_lists', 'display_word_lists', 'select_word_list'],
+    'article_generator': [
+        'generate_articles_with_ai', 'parse_and_save_articles', 'display_generated_articles',
+        'generate_articles_batch', 'stream_generate_articles'
+    ],
+    'translation_evaluator': [
+        'get_available_articles', 'get_available_translations',
+        'evaluate_translation_with_ai', 'generate_evaluation_report', 'stream_evaluation_with_ai'
+    ],
+    'file_manager': ['ensure_directory', 'check_project_structure', 'display_project_status'],
+    'llm_cache': ['LLMCache', 'CachedClient', 'wrap_client_with_cache'],
+    'chunked_evaluator': ['evaluate_translation_chunked', 'plan_evaluation_chunks'],
+    'sentence_aligner': ['align_sentences'],
+    'word_index': ['WordIndex', 'get_word_index'],
+    'catalog': ['Catalog', 'get_catalog'],
+    'metrics': ['configure_metrics', 'summarize_metrics', 'display_metrics_summary'],
+    'managed_client': ['ManagedClient', 'RateLimiter', 'RetryPolicy', 'init_managed_client'],
+    'batch_jobs': ['BatchBuilder', 'submit_batch', 'wait_for_batch', 'run_batch_locally', 'apply_batch_results'],
+    'article_repair': ['repair_word_coverage', 'repair_article'],
+    'word_sharding': ['plan_word_shards', 'generate_sharded_articles'],
+    'atomic_store': ['AtomicStore', 'get_store', 'new_id'],
+    'corpus_store': ['CorpusStore', 'RecordRef', 'get_corpus_store'],
+    'watch_daemon': ['TranslationWatcher'],
+    'pair_cache': ['PairCache', 'get_pair_cache', 'evaluate_translation_incremental'],
+    'structured_evaluation': [
+        'EvaluationResult', 'evaluate_translation_structured', 'generate_structured_report', 'load_report_scores'
+    ],
+    'score_analytics': ['ScoreAnalytics', 'get_score_analytics'],
+    'prescreen': ['prescreen_pairs', 'evaluate_translation_prescreened'],
+    'model_router': ['ModelRouter', 'init_model_router'],
+    'prompt_templates': ['PromptTemplate'],
+    'job_journal': ['JobJournal', 'generate_articles_resumable', 'evaluate_translations_resumable'],
+}
+_ATTRIBUTE_MODULES = {name: module for module, names in _LAZY_ATTRIBUTES.items() for name in names}
+_SUBMODULES = set(_LAZY_ATTRIBUTES) | {'text_utils'}
+
+
+def __getattr__(name):
+    if name in _ATTRIBUTE_MODULES:
+        value = getattr(importlib.import_module(f".{_ATTRIBUTE_MODULES[name]}", __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
+
 
 __all__ = [
     'load_config', 'init_openai_client', 'setup_environment',
     'get_available_word_lists', 'display_word_lists', 'select_word_list', 
     'generate_articles_with_ai', 'parse_and_save_articles', 'display_generated_articles',
+    'generate_articles_batch', 'stream_generate_articles',
     'get_available_articles', 'get_available_translations',
-    'evaluate_translation_with_ai', 'generate_evaluation_report',
-    'ensure_directory', 'check_project_structure', 'display_project_status'
+    'evaluate_translation_with_ai', 'generate_evaluation_report', 'stream_evaluation_with_ai',
+    'ensure_directory', 'check_project_structure', 'display_project_status',
+    'LLMCache', 'CachedClient', 'wrap_client_with_cache',
+    'evaluate_translation_chunked', 'plan_evaluation_chunks',
+    'align_sentences', 'WordIndex', 'get_word_index', 'Catalog', 'get_catalog',
+    'configure_metrics', 'summarize_metrics', 'display_metrics_summary',
+    'ManagedClient', 'RateLimiter', 'RetryPolicy', 'init_managed_client',
+    'BatchBuilder', 'submit_batch', 'wait_for_batch', 'run_batch_locally', 'apply_batch_results',
+    'repair_word_coverage', 'repair_article', 'plan_word_shards', 'generate_sharded_articles',
+    'AtomicStore', 'get_store', 'new_id', 'CorpusStore', 'RecordRef', 'get_corpus_store',
+    'TranslationWatcher', 'PairCache', 'get_pair_cache', 'evaluate_translation_incremental',
+    'EvaluationResult', 'evaluate_translation_structured', 'generate_structured_report', 'load_report_scores',
+    'ScoreAnalytics', 'get_score_analytics', 'prescreen_pairs', 'evaluate_translation_prescreened',
+    'ModelRouter', 'init_model_router', 'PromptTemplate',
+    'JobJournal', 'generate_articles_resumable', 'evaluate_translations_resumable'
 ]
@@ -6,61 +6,142 @@
 
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+from .metrics import (
+    get_metrics_recorder, timed_completion, record_stream_call,
+    STAGE_PROMPT_BUILD, STAGE_PARSE, STAGE_FILE_WRITE
+)
+from .atomic_store import get_store, new_id
+from .prompt_templates import ARTICLE_TEMPLATE
+from .word_index import get_word_index
+from .word_manager import read_word_list
 
-def generate_articles_with_ai(client, model, words, count, topic, genre, difficulty, min_occurrences=2):
-    """使用AI生成文章，支持单词标粗和最小出现次数设置"""
-    
-    prompt = f"""Please write {count} English articles based on the following requirements:
+# 预编译解析用的正则表达式
+ARTICLE_BLOCK_PATTERN = re.compile(r'=== ARTICLE (\d+) ===(.*?)=== END ARTICLE \1 ===', re.DOTALL | re.IGNORECASE)
+ARTICLE_START_PATTERN = re.compile(r'^\s*=== ARTICLE (\d+) ===\s*$', re.IGNORECASE)
+ARTICLE_END_PATTERN = re.compile(r'^\s*=== END ARTICLE (\d+) ===\s*$', re.IGNORECASE)
+TITLE_PATTERN = re.compile(r'Title:\s*(.*?)(?:\n|Abstract:)', re.IGNORECASE)
+ABSTRACT_PATTERN = re.compile(r'Abstract:\s*(.*?)(?:\n|---)', re.IGNORECASE | re.DOTALL)
+BODY_PATTERN = re.compile(r'---\s*(.*)', re.DOTALL)
+TITLE_LINE_PATTERN = re.compile(r'Title:.*?\n', re.IGNORECASE)
+ABSTRACT_LINE_PATTERN = re.compile(r'Abstract:.*?\n', re.IGNORECASE)
+SEPARATOR_PATTERN = re.compile(r'---+')
+UNSAFE_TITLE_CHARS_PATTERN = re.compile(r'[^\w\s-]')
+TITLE_SEPARATOR_PATTERN = re.compile(r'[-\s]+')
 
+
+def build_article_request(model, words, count, topic, genre, difficulty, min_occurrences=2, max_tokens=3000):
+    """构建文章生成的请求参数，格式要求位于模板的静态前缀中，本次的单词和主题放在最后"""
+    
+    data = f"""Number of articles: {count}
 Target words that MUST be included: {', '.join(words)}
 Topic: {topic}
 Genre: {genre}
 Difficulty: {difficulty}
+Minimum occurrences per target word across all articles: {min_occurrences}"""
 
-Requirements:
-1. Across ALL {count} articles, each target word must appear at least {min_occurrences} times total
-2. Write in clear, educational English
-3. Make the target words BOLD using **word** format in the content
-4. Ensure incorporating all target words
+    return {
+        'model': model,
+        'messages': ARTICLE_TEMPLATE.build_messages(data),
+        'max_tokens': max_tokens,
+        'temperature': 0.6
+    }
 
-Output format (VERY IMPORTANT):
-Please use this EXACT format for each article:
 
-=== ARTICLE 1 ===
-Title: [Article title here]
-Abstract: [Brief summary in 30-50 words]
----
-[Article content here with **target words** in bold]
-=== END ARTICLE 1 ===
-
-=== ARTICLE 2 ===
-Title: [Article title here] 
-Abstract: [Brief summary in 30-50 words]
----
-[Article content here with **target words** in bold]
-=== END ARTICLE 2 ===
+def _request_articles(client, request):
+    """发送文章生成请求，出错时直接抛出异常"""
+    response = timed_completion(client, 'generate', request)
+    return response.choices[0].message.content
 
-Make sure to use **bold** formatting for all target words when they appear in the content."""
 
+def generate_articles_with_ai(client, model, words, count, topic, genre, difficulty, min_occurrences=2):
+    """使用AI生成文章，支持单词标粗和最小出现次数设置"""
+    
+    with get_metrics_recorder().stage('generate', STAGE_PROMPT_BUILD):
+        request = build_article_request(model, words, count, topic, genre, difficulty, min_occurrences)
+    
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert English teacher. Create educational articles that naturally incorporate the specified vocabulary words with bold formatting. Follow the exact format requested."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=3000,
-            temperature=0.6
-        )
-        
-        return response.choices[0].message.content
+        return _request_articles(client, request)
     except Exception as e:
         print(f"生成文章时出错: {e}")
         return None
 
 
+def validate_article_job(job):
+    """检查批量生成任务的必要字段，返回错误信息（没有问题时返回None）"""
+    if not job.get('words') and not job.get('word_list'):
+        return "缺少 word_list 或 words"
+    if not job.get('word_list_name') and not job.get('word_list'):
+        return "使用 words 时必须提供 word_list_name"
+    missing = [field for field in ('topic', 'genre', 'difficulty') if not job.get(field)]
+    if missing:
+        return f"缺少必要字段: {', '.join(missing)}"
+    return None
+
+
+def article_job_name(job):
+    """批量生成任务对应的单词列表名称"""
+    return job.get('word_list_name') or Path(job['word_list']).stem
+
+
+def generate_articles_batch(client, model, jobs, max_workers=4, articles_dir='articles'):
+    """并发批量生成文章
+
+    jobs 中每一项为字典，包含 word_list（单词列表文件路径）或 words + word_list_name，
+    以及 topic、genre、difficulty，可选 count（默认3）、min_occurrences（默认2）和 max_tokens（默认3000）。
+    每个任务完成后立即交给 parse_and_save_articles 保存，返回 (results, failures)；缺少必要字段的任务不会调用API，直接记为失败。
+    """
+    
+    results = [None] * len(jobs)
+    valid = []
+    for i, job in enumerate(jobs):
+        error = validate_article_job(job)
+        if error:
+            name = job.get('word_list_name') or (Path(job['word_list']).stem if job.get('word_list') else f"任务{i + 1}")
+            results[i] = {'job': job, 'word_list_name': name, 'articles': [], 'error': error}
+            print(f"❌ {name}: {error}")
+        else:
+            valid.append(i)
+    
+    def run_job(job):
+        words = job.get('words') or read_word_list(job['word_list'])
+        with get_metrics_recorder().stage('generate', STAGE_PROMPT_BUILD):
+            request = build_article_request(
+                model, words, job.get('count', 3), job['topic'], job['genre'],
+                job['difficulty'], job.get('min_occurrences', 2), job.get('max_tokens', 3000)
+            )
+        return _request_articles(client, request)
+    
+    print(f"开始批量生成: {len(valid)} 个任务, 并发数 {max_workers}")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_job, jobs[i]): i for i in valid}
+        
+        # 按完成顺序逐个解析保存，无需等待全部任务结束
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            job = jobs[i]
+            word_list_name = article_job_name(job)
+            result = {'job': job, 'word_list_name': word_list_name, 'articles': [], 'error': None}
+            
+            try:
+                ai_output = future.result()
+                result['articles'] = parse_and_save_articles(ai_output, word_list_name, articles_dir)
+                if not result['articles']:
+                    result['error'] = "没有解析到文章"
+            except Exception as e:
+                result['error'] = str(e)
+            
+            status = "✅" if not result['error'] else f"❌ {result['error']}"
+            print(f"[{done}/{len(valid)}] {word_list_name}: {status}")
+            results[i] = result
+    
+    failures = [r for r in results if r['error']]
+    print(f"批量生成完成: 成功 {len(results) - len(failures)} 个, 失败 {len(failures)} 个")
+    return results, failures
+
+
 def parse_and_save_articles(ai_output, word_list_name, articles_dir='articles'):
     """解析AI输出并保存为独立的markdown文件"""
     
@@ -76,8 +157,7 @@ def parse_and_save_articles(ai_output, word_list_name, articles_dir='articles'):
     saved_articles = []
     
     # 方法1: 使用=== ARTICLE X ===格式
-    pattern1 = r'=== ARTICLE (\d+) ===(.*?)=== END ARTICLE \1 ==='
-    matches1 = re.findall(pattern1, ai_output, re.DOTALL | re.IGNORECASE)
+    matches1 = ARTICLE_BLOCK_PATTERN.findall(ai_output)
     
     if matches1:
         print(f"使用格式1解析到 {len(matches1)} 篇文章")
@@ -91,32 +171,42 @@ def parse_and_save_articles(ai_output, word_list_name, articles_dir='articles'):
         print("格式1解析失败，尝试备用方法...")
         saved_articles = _fallback_parse_articles(ai_output, word_list_name, articles_dir)
     
+    # 增量更新单词索引
+    get_word_index(articles_dir).add_articles(article['path'] for article in saved_articles)
+    
     return saved_articles
 
 
-def _parse_single_article(content, num, word_list_name, articles_dir):
-    """解析单篇文章"""
+def _extract_article_fields(content, num):
+    """从单篇文章的原始输出中提取标题、摘要和正文"""
     # 解析标题和摘要
-    title_match = re.search(r'Title:\s*(.*?)(?:\n|Abstract:)', content, re.IGNORECASE)
-    abstract_match = re.search(r'Abstract:\s*(.*?)(?:\n|---)', content, re.IGNORECASE | re.DOTALL)
+    title_match = TITLE_PATTERN.search(content)
+    abstract_match = ABSTRACT_PATTERN.search(content)
     
     title = title_match.group(1).strip() if title_match else f"Article {num}"
     abstract = abstract_match.group(1).strip() if abstract_match else "AI generated article"
     
     # 提取正文（---后的内容）
-    content_match = re.search(r'---\s*(.*)', content, re.DOTALL)
+    content_match = BODY_PATTERN.search(content)
     article_content = content_match.group(1).strip() if content_match else content.strip()
     
     # 清理内容
-    article_content = re.sub(r'Title:.*?\n', '', article_content, flags=re.IGNORECASE)
-    article_content = re.sub(r'Abstract:.*?\n', '', article_content, flags=re.IGNORECASE)
-    article_content = re.sub(r'---+', '', article_content).strip()
+    article_content = TITLE_LINE_PATTERN.sub('', article_content)
+    article_content = ABSTRACT_LINE_PATTERN.sub('', article_content)
+    article_content = SEPARATOR_PATTERN.sub('', article_content).strip()
+    
+    return title, abstract, article_content
+
+
+def _parse_single_article(content, num, word_list_name, articles_dir):
+    """解析单篇文章"""
+    with get_metrics_recorder().stage('generate', STAGE_PARSE):
+        title, abstract, article_content = _extract_article_fields(content, num)
     
     # 保存文章
-    safe_title = re.sub(r'[^\w\s-]', '', title).strip()
-    safe_title = re.sub(r'[-\s]+', '-', safe_title)[:50]  # 限制长度
-    timestamp = time.strftime('%Y%m%d_%H%M%S')
-    filename = f"{word_list_name}-{safe_title}-{timestamp}.md"
+    safe_title = UNSAFE_TITLE_CHARS_PATTERN.sub('', title).strip()
+    safe_title = TITLE_SEPARATOR_PATTERN.sub('-', safe_title)[:50]  # 限制长度
+    filename = f"{word_list_name}-{safe_title}-{new_id()}.md"
     
     markdown_content = f"""# {title}
 
@@ -131,8 +221,8 @@ def _parse_single_article(content, num, word_list_name, articles_dir):
 """
     
     file_path = Path(articles_dir) / filename
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
+    with get_metrics_recorder().stage('generate', STAGE_FILE_WRITE):
+        get_store().write_text(file_path, markdown_content)
     
     print(f"已保存文章: {filename}")
     
@@ -159,10 +249,9 @@ def _fallback_parse_articles(ai_output, word_list_name, articles_dir):
         ]
         
         for i, (content, title) in enumerate(article_groups, 1):
-            safe_title = re.sub(r'[^\w\s-]', '', title).strip()
-            safe_title = re.sub(r'[-\s]+', '-', safe_title)
-            timestamp = time.strftime('%Y%m%d_%H%M%S')
-            filename = f"{word_list_name}-{safe_title}-{timestamp}.md"
+            safe_title = UNSAFE_TITLE_CHARS_PATTERN.sub('', title).strip()
+            safe_title = TITLE_SEPARATOR_PATTERN.sub('-', safe_title)
+            filename = f"{word_list_name}-{safe_title}-{new_id()}.md"
             
             markdown_content = f"""# {title}
 
@@ -177,8 +266,8 @@ AI生成的关于技术创新的文章
 """
             
             file_path = Path(articles_dir) / filename
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
+            with get_metrics_recorder().stage('generate', STAGE_FILE_WRITE):
+                get_store().write_text(file_path, markdown_content)
             
             saved_articles.append({
                 'title': title,
@@ -192,6 +281,131 @@ AI生成的关于技术创新的文章
     return saved_articles
 
 
+class ArticleStreamParser:
+    """增量解析 === ARTICLE N === / === END ARTICLE N === 标记的状态机
+
+    每次 feed 一段流式文本，返回本次新完成的 (编号, 文章内容) 列表。
+    """
+    
+    def __init__(self):
+        self.pending_line = ""
+        self.current_number = None
+        self.current_lines = []
+    
+    def feed(self, text):
+        """输入一段文本，返回已完整接收的文章"""
+        completed = []
+        lines = (self.pending_line + text).split('\n')
+        # 最后一行可能尚未接收完整，留到下次处理
+        self.pending_line = lines.pop()
+        for line in lines:
+            article = self._process_line(line)
+            if article:
+                completed.append(article)
+        return completed
+    
+    def close(self):
+        """流结束时调用，返回未遇到结束标记但已有内容的文章"""
+        completed = []
+        if self.pending_line:
+            article = self._process_line(self.pending_line)
+            self.pending_line = ""
+            if article:
+                completed.append(article)
+        if self.current_number is not None and any(line.strip() for line in self.current_lines):
+            completed.append((self.current_number, '\n'.join(self.current_lines)))
+        self.current_number = None
+        self.current_lines = []
+        return completed
+    
+    def _process_line(self, line):
+        start_match = ARTICLE_START_PATTERN.match(line)
+        if start_match:
+            # 缺少结束标记时，新的开始标记视为上一篇结束
+            previous = None
+            if self.current_number is not None and any(l.strip() for l in self.current_lines):
+                previous = (self.current_number, '\n'.join(self.current_lines))
+            self.current_number = start_match.group(1)
+            self.current_lines = []
+            return previous
+        
+        if self.current_number is None:
+            return None
+        
+        end_match = ARTICLE_END_PATTERN.match(line)
+        if end_match and end_match.group(1) == self.current_number:
+            article = (self.current_number, '\n'.join(self.current_lines))
+            self.current_number = None
+            self.current_lines = []
+            return article
+        
+        self.current_lines.append(line)
+        return None
+
+
+def stream_generate_articles(client, model, words, count, topic, genre, difficulty, word_list_name,
+                             min_occurrences=2, articles_dir='articles'):
+    """流式生成文章，每篇文章的结束标记到达后立即保存并 yield 文章信息"""
+    
+    with get_metrics_recorder().stage('generate', STAGE_PROMPT_BUILD):
+        request = build_article_request(model, words, count, topic, genre, difficulty, min_occurrences)
+    start = time.perf_counter()
+    try:
+        stream = client.chat.completions.create(stream=True, stream_options={'include_usage': True}, **request)
+    except Exception as e:
+        record_stream_call('generate', model, time.perf_counter() - start, request=request,
+                           ok=False, error=e.__class__.__name__)
+        print(f"生成文章时出错: {e}")
+        return
+    first_token_sec = None
+    usage = None
+    stream_error = None
+    
+    parser = ArticleStreamParser()
+    received = []
+    saved_count = 0
+    index = get_word_index(articles_dir)
+    
+    def save(completed):
+        for num, content in completed:
+            article_info = _parse_single_article(content, num, word_list_name, articles_dir)
+            if article_info:
+                index.add_article(article_info['path'])
+                yield article_info
+    
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, 'usage', None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if first_token_sec is None:
+                first_token_sec = time.perf_counter() - start
+            received.append(delta)
+            for article_info in save(parser.feed(delta)):
+                saved_count += 1
+                yield article_info
+    except Exception as e:
+        stream_error = e
+        print(f"接收流式输出时出错: {e}")
+    record_stream_call('generate', model, time.perf_counter() - start, first_token_sec, usage, request,
+                       ok=stream_error is None,
+                       error=stream_error.__class__.__name__ if stream_error is not None else None)
+    
+    for article_info in save(parser.close()):
+        saved_count += 1
+        yield article_info
+    
+    # 没有解析到任何标记时，使用备用方法处理完整输出
+    if not saved_count and received:
+        print("格式1解析失败，尝试备用方法...")
+        for article_info in _fallback_parse_articles(''.join(received), word_list_name, articles_dir):
+            index.add_article(article_info['path'])
+            yield article_info
+
+
 def display_generated_articles(saved_articles):
     """显示生成的文章预览"""
     if not saved_articles:
@@ -206,20 +420,38 @@ def display_generated_articles(saved_articles):
         print("-" * 50)
 
 
-def check_word_coverage(saved_articles, target_words, min_occurrences=2):
-    """检查目标单词的覆盖情况"""
-    print("\n=== 单词覆盖检查 ===")
+def count_word_coverage(saved_articles, target_words):
+    """统计目标单词在已保存文章中的出现次数（基于倒排索引），返回 {单词: 次数}"""
     word_counts = {word.lower(): 0 for word in target_words}
     
+    # 按文章所在目录分组，使用对应目录的索引统计
+    filenames_by_dir = {}
     for article in saved_articles:
+        path = Path(article['path'])
+        filenames_by_dir.setdefault(path.parent, []).append(path.name)
+    
+    for articles_dir, filenames in filenames_by_dir.items():
         try:
-            with open(article['path'], 'r', encoding='utf-8') as f:
-                content = f.read().lower()
-                for word in target_words:
-                    count = content.count(word.lower())
-                    word_counts[word.lower()] += count
+            index = get_word_index(articles_dir)
+            index.refresh()
+            for word, count in index.word_counts(target_words, filenames).items():
+                word_counts[word] += count
         except Exception as e:
-            print(f"检查文章 {article['filename']} 时出错: {e}")
+            print(f"检查目录 {articles_dir} 中的文章时出错: {e}")
+    
+    return word_counts
+
+
+def find_insufficient_words(saved_articles, target_words, min_occurrences=2):
+    """返回出现次数不足的单词及其缺少的次数 {单词: 缺少次数}"""
+    word_counts = count_word_coverage(saved_articles, target_words)
+    return {word: min_occurrences - count for word, count in word_counts.items() if count < min_occurrences}
+
+
+def check_word_coverage(saved_articles, target_words, min_occurrences=2):
+    """检查目标单词的覆盖情况（基于倒排索引，按完整单词及其屈折形式计数）"""
+    print("\n=== 单词覆盖检查 ===")
+    word_counts = count_word_coverage(saved_articles, target_words)
     
     print(f"目标出现次数: {min_occurrences}")
     print("单词覆盖情况:")
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+文章修补模块
+单词覆盖不足时只针对缺少的单词请求一段补充段落，或改写一篇已有文章的正文，合并回markdown后增量重新检查覆盖
+"""
+
+import re
+from pathlib import Path
+
+from .article_generator import find_insufficient_words, check_word_coverage
+from .atomic_store import get_store
+from .metrics import get_metrics_recorder, timed_completion, STAGE_PROMPT_BUILD, STAGE_FILE_WRITE
+from .text_utils import estimate_tokens
+from .word_index import get_word_index
+
+REPAIR_MODES = ('supplement', 'revise')
+SUPPLEMENT_HEADER = "## 补充段落"
+BODY_HEADER = "## 正文"
+FOOTER_PATTERN = re.compile(r'\n---\n\*本文基于单词列表')
+BODY_SECTION_PATTERN = re.compile(r'(## 正文\n)(.*?)(?=\n## |\n---\n\*本文基于单词列表|\Z)', re.DOTALL)
+CODE_FENCE_PATTERN = re.compile(r'^```\w*\n|\n```$')
+
+# 每个缺少的单词出现一次大约需要的输出token数
+TOKENS_PER_MISSING_OCCURRENCE = 40
+REPAIR_BASE_TOKENS = 100
+REPAIR_MAX_TOKENS = 3000
+
+
+def _format_missing_words(missing_words):
+    return '\n'.join(f"- {word}: at least {count} more time(s)" for word, count in missing_words.items())
+
+
+def build_supplement_request(model, missing_words, topic=None):
+    """构建补充段落请求，max_tokens 按缺少的单词出现次数计算"""
+    occurrences = sum(missing_words.values())
+    topic_line = f"Topic: {topic}\n" if topic else ""
+    prompt = f"""Write a short supplementary English passage for vocabulary practice.
+{topic_line}
+Words to use (each the given number of times):
+{_format_missing_words(missing_words)}
+
+Requirements:
+1. Keep it short: about {max(2, occurrences)} sentences
+2. Make the target words BOLD using **word** format
+3. Output only the passage text, without title or any other formatting"""
+
+    return {
+        'model': model,
+        'messages': [
+            {"role": "system", "content": "You are an expert English teacher. Write concise passages that naturally use the specified vocabulary words with bold formatting."},
+            {"role": "user", "content": prompt}
+        ],
+        'max_tokens': min(REPAIR_MAX_TOKENS, REPAIR_BASE_TOKENS + TOKENS_PER_MISSING_OCCURRENCE * occurrences),
+        'temperature': 0.6
+    }
+
+
+def build_revision_request(model, missing_words, article_body):
+    """构建改写已有文章正文的请求，max_tokens 为正文长度加上缺少单词所需的增量"""
+    occurrences = sum(missing_words.values())
+    prompt = f"""Revise the following English article so that it also uses these words:
+{_format_missing_words(missing_words)}
+
+Requirements:
+1. Change as little as possible; add or rewrite only the sentences needed
+2. Keep all existing **bold** words and make the new target words BOLD using **word** format
+3. Output only the revised article text, without title or any other formatting
+
+Article:
+{article_body}"""
+
+    return {
+        'model': model,
+        'messages': [
+            {"role": "system", "content": "You are an expert English teacher. Revise articles minimally to incorporate the specified vocabulary words with bold formatting."},
+            {"role": "user", "content": prompt}
+        ],
+        'max_tokens': min(REPAIR_MAX_TOKENS, estimate_tokens(article_body) + REPAIR_BASE_TOKENS
+                          + TOKENS_PER_MISSING_OCCURRENCE * occurrences),
+        'temperature': 0.4
+    }
+
+
+def _clean_output(text):
+    return CODE_FENCE_PATTERN.sub('', (text or '').strip()).strip()
+
+
+def merge_supplement(article_path, passage):
+    """将补充段落插入到文章页脚之前，已有补充段落时追加到该部分末尾"""
+    with open(article_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    footer = FOOTER_PATTERN.search(content)
+    position = footer.start() if footer else len(content.rstrip('\n'))
+    if SUPPLEMENT_HEADER in content[:position]:
+        addition = f"\n\n{passage}"
+    else:
+        addition = f"\n\n{SUPPLEMENT_HEADER}\n{passage}"
+    content = content[:position].rstrip('\n') + addition + "\n" + content[position:]
+    get_store().write_text(article_path, content)
+
+
+def read_article_body(article_path):
+    """读取文章的正文部分"""
+    with open(article_path, 'r', encoding='utf-8') as f:
+        match = BODY_SECTION_PATTERN.search(f.read())
+    return match.group(2).strip() if match else ''
+
+
+def replace_article_body(article_path, new_body):
+    """用改写后的内容替换文章的正文部分"""
+    with open(article_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if not BODY_SECTION_PATTERN.search(content):
+        raise Exception(f"文章中没有找到正文部分: {article_path}")
+    content = BODY_SECTION_PATTERN.sub(lambda m: f"{m.group(1)}{new_body}\n", content, count=1)
+    get_store().write_text(article_path, content)
+
+
+def _pick_article(saved_articles, mode):
+    """补充模式选最后一篇文章，改写模式选正文最短的一篇（输入token最少）"""
+    if mode == 'supplement':
+        return saved_articles[-1]
+    return min(saved_articles, key=lambda article: len(read_article_body(article['path'])))
+
+
+def repair_article(client, model, article, missing_words, mode='supplement', topic=None):
+    """针对缺少的单词修补一篇文章，并增量更新该文章的单词索引"""
+    path = Path(article['path'])
+    with get_metrics_recorder().stage('repair', STAGE_PROMPT_BUILD, mode=mode):
+        if mode == 'supplement':
+            request = build_supplement_request(model, missing_words, topic)
+        else:
+            request = build_revision_request(model, missing_words, read_article_body(path))
+
+    response = timed_completion(client, 'repair', request, mode=mode, missing_words=len(missing_words))
+    text = _clean_output(response.choices[0].message.content)
+    if not text:
+        raise Exception("修补结果为空")
+
+    with get_metrics_recorder().stage('repair', STAGE_FILE_WRITE, mode=mode):
+        if mode == 'supplement':
+            merge_supplement(path, text)
+        else:
+            replace_article_body(path, text)
+
+    index = get_word_index(path.parent)
+    index.add_article(path)
+    index.save()
+    print(f"已修补文章: {path.name}（{len(missing_words)} 个单词）")
+
+
+def repair_word_coverage(client, model, saved_articles, target_words, min_occurrences=2,
+                         mode='supplement', max_rounds=2, topic=None):
+    """修补单词覆盖不足的文章，直到全部满足或达到最大轮数，返回最终是否全部满足"""
+    if mode not in REPAIR_MODES:
+        raise ValueError(f"未知的修补模式: {mode}，可选: {', '.join(REPAIR_MODES)}")
+    if not saved_articles:
+        print("暂无可修补的文章")
+        return False
+
+    for round_number in range(1, max_rounds + 1):
+        missing_words = find_insufficient_words(saved_articles, target_words, min_occurrences)
+        if not missing_words:
+            break
+        article = _pick_article(saved_articles, mode)
+        print(f"\n🔧 第 {round_number} 轮修补: {len(missing_words)} 个单词不足，修补文章 {article['filename']}")
+        try:
+            repair_article(client, model, article, missing_words, mode, topic)
+        except Exception as e:
+            print(f"修补文章时出错: {e}")
+            break
+
+    return check_word_coverage(saved_articles, target_words, min_occurrences)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+原子存储模块
+为文章和报告生成不冲突的单调递增ID，先写隐藏临时文件再原子重命名，并批量执行fsync，支持多进程同时写入同一目录
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+FSYNC_MODES = ('always', 'batch', 'never')
+
+_id_lock = threading.Lock()
+_last_id_time = 0
+_id_sequence = 0
+
+
+def new_id():
+    """生成不冲突的ID：时间戳_微秒_进程号_序号
+
+    以 %Y%m%d_%H%M%S 开头，按字典序大致等于时间顺序；同一进程内严格单调递增（系统时间回拨时沿用上一个时间），
+    不同进程通过进程号区分。
+    """
+    global _last_id_time, _id_sequence
+    with _id_lock:
+        now = time.time_ns() // 1000
+        if now > _last_id_time:
+            _last_id_time = now
+            _id_sequence = 0
+        else:
+            _id_sequence += 1
+        seconds, micros = divmod(_last_id_time, 1_000_000)
+        sequence = _id_sequence
+    timestamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(seconds))
+    return f"{timestamp}_{micros:06d}_{os.getpid()}_{sequence:04d}"
+
+
+def temp_path_for(path):
+    """目标文件对应的隐藏临时文件路径（目录扫描会忽略以 . 开头的文件）"""
+    path = Path(path)
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # 部分平台（如Windows）不支持打开目录
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicStore:
+    """原子写入文件并按批次fsync
+
+    fsync 模式:
+    - always: 每次写入都fsync文件和目录
+    - batch: 写入后立即原子可见，累计 batch_size 个文件或距上次同步超过 batch_interval 秒时统一fsync，
+      进程退出时也会同步剩余文件
+    - never: 不主动fsync
+    """
+
+    def __init__(self, fsync='batch', batch_size=32, batch_interval=1.0):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"未知的fsync模式: {fsync}，可选: {', '.join(FSYNC_MODES)}")
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._pending = []
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @contextmanager
+    def open(self, path, mode='w', encoding='utf-8', tmp_path=None, keep_partial=False):
+        """打开临时文件写入，正常退出时原子替换为目标文件，出错时删除临时文件
+
+        tmp_path 可指定可见的临时文件（例如 .partial.md）；keep_partial=True 时出错或提前结束会保留临时文件中已写入的内容。
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_path or temp_path_for(path)
+        try:
+            with open(tmp_path, mode, encoding=encoding) as f:
+                yield f
+                if self.fsync == 'always':
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if not keep_partial:
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+            raise
+        self._committed(path)
+
+    def write_text(self, path, content, encoding='utf-8'):
+        """原子写入文本文件"""
+        with self.open(path, 'w', encoding) as f:
+            f.write(content)
+        return Path(path)
+
+    def _committed(self, path):
+        if self.fsync == 'always':
+            _fsync_directory(path.parent)
+        elif self.fsync == 'batch':
+            with self._lock:
+                self._pending.append(path)
+                due = (len(self._pending) >= self.batch_size
+                       or time.monotonic() - self._last_sync >= self.batch_interval)
+            if due:
+                self.flush()
+
+    def flush(self):
+        """fsync所有待同步的文件及其所在目录"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_sync = time.monotonic()
+        directories = set()
+        for path in pending:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue  # 文件已被删除或替换
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            directories.add(path.parent)
+        for directory in directories:
+            _fsync_directory(directory)
+
+
+_default_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """获取进程级共享的原子存储"""
+    global _default_store
+    with _store_lock:
+        if _default_store is None:
+            _default_store = AtomicStore()
+        return _default_store
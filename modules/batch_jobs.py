@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+批量离线任务模块
+将大量文章生成 / 翻译评估请求写入JSONL批量请求文件，提交到Batch接口（或在本地执行），
+完成后将结果映射回 parse_and_save_articles / generate_evaluation_report 的输出
+"""
+
+import hashlib
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .article_generator import build_article_request, parse_and_save_articles
+from .file_manager import ensure_directory, extract_title_from_article
+from .translation_evaluator import (
+    _pair_sentences, build_evaluation_request_for_pairs, extract_article_content,
+    read_user_translation, generate_evaluation_report
+)
+from .word_manager import read_word_list
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+FINAL_BATCH_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+
+def make_custom_id(kind, index, source):
+    """由任务类型、批内序号和来源（单词列表名或翻译文件名）生成 custom_id，同一批次内唯一"""
+    source = re.sub(r'[^A-Za-z0-9_.-]+', '_', source)[:40]
+    return f"{kind}-{index:05d}-{source}"
+
+
+def make_content_hash(request):
+    """请求内容的哈希，只用于识别内容相同的请求"""
+    raw = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def manifest_path_for(batch_path):
+    """批量请求文件对应的清单文件路径"""
+    batch_path = Path(batch_path)
+    return batch_path.with_name(batch_path.stem + '.manifest.json')
+
+
+class BatchBuilder:
+    """收集生成和评估请求，写出批量请求JSONL文件和记录元数据的清单文件"""
+
+    def __init__(self, model):
+        self.model = model
+        self.requests = {}
+        self.manifest = {}
+
+    def _add(self, kind, request, metadata, source):
+        custom_id = make_custom_id(kind, len(self.requests), source)
+        self.requests[custom_id] = request
+        self.manifest[custom_id] = dict(metadata, kind=kind, model=self.model,
+                                        content_hash=make_content_hash(request))
+        return custom_id
+
+    def add_generation(self, word_list_name, words, count, topic, genre, difficulty, min_occurrences=2):
+        """添加一个文章生成请求"""
+        request = build_article_request(self.model, words, count, topic, genre, difficulty, min_occurrences)
+        return self._add('generate', request, {'word_list_name': word_list_name}, word_list_name)
+
+    def add_generation_from_file(self, word_list_path, count, topic, genre, difficulty, min_occurrences=2):
+        """根据单词列表文件添加文章生成请求"""
+        words = read_word_list(word_list_path)
+        return self.add_generation(Path(word_list_path).stem, words, count, topic, genre, difficulty,
+                                   min_occurrences)
+
+    def add_evaluation(self, english_sentences, user_translations, article_title, translation_filename):
+        """添加一个翻译评估请求"""
+        pairs = _pair_sentences(english_sentences, user_translations)
+        request = build_evaluation_request_for_pairs(self.model, pairs)
+        return self._add('evaluate', request, {
+            'article_title': article_title,
+            'translation_filename': translation_filename
+        }, translation_filename)
+
+    def add_evaluation_from_files(self, article_path, translation_path):
+        """根据文章文件和翻译文件添加翻译评估请求"""
+        return self.add_evaluation(
+            extract_article_content(article_path), read_user_translation(translation_path),
+            extract_title_from_article(article_path), Path(translation_path).name
+        )
+
+    def write(self, batch_path):
+        """写出批量请求文件和清单文件，返回请求数量"""
+        batch_path = Path(batch_path)
+        batch_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(batch_path, 'w', encoding='utf-8') as f:
+            for custom_id, request in self.requests.items():
+                line = {'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': request}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        with open(manifest_path_for(batch_path), 'w', encoding='utf-8') as f:
+            json.dump({'requests': self.manifest}, f, ensure_ascii=False, indent=2)
+        print(f"已写出 {len(self.requests)} 个批量请求: {batch_path}")
+        return len(self.requests)
+
+
+def _update_manifest(batch_path, **fields):
+    path = manifest_path_for(batch_path)
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest.update(fields)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def submit_batch(client, batch_path, completion_window='24h'):
+    """上传批量请求文件并创建Batch任务，返回batch id"""
+    with open(batch_path, 'rb') as f:
+        input_file = client.files.create(file=f, purpose='batch')
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=completion_window
+    )
+    _update_manifest(batch_path, batch_id=batch.id, input_file_id=input_file.id)
+    print(f"已提交批量任务: {batch.id}")
+    return batch.id
+
+
+def wait_for_batch(client, batch_id, poll_interval=30, timeout=None):
+    """轮询Batch任务直到结束，返回输出JSONL文本
+
+    任务中失败的请求只出现在错误文件（error_file_id）中，这里将其合并到输出文本里，由 apply_batch_results 记为失败。
+    """
+    start = time.time()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, 'request_counts', None)
+        if counts:
+            print(f"批量任务 {batch_id}: {batch.status} ({counts.completed}/{counts.total})")
+        else:
+            print(f"批量任务 {batch_id}: {batch.status}")
+
+        if batch.status in FINAL_BATCH_STATUSES:
+            break
+        if timeout and time.time() - start > timeout:
+            raise TimeoutError(f"等待批量任务 {batch_id} 超时")
+        time.sleep(poll_interval)
+
+    output_file_id = getattr(batch, 'output_file_id', None)
+    error_file_id = getattr(batch, 'error_file_id', None)
+    if batch.status != 'completed' or not (output_file_id or error_file_id):
+        raise Exception(f"批量任务 {batch_id} 未成功完成: {batch.status}")
+    texts = [client.files.content(file_id).text for file_id in (output_file_id, error_file_id) if file_id]
+    return "\n".join(text.rstrip("\n") for text in texts) + "\n"
+
+
+def run_batch_locally(client, batch_path, max_workers=4):
+    """本地执行批量请求文件（Batch接口的替代），返回与Batch输出格式一致的JSONL文本
+
+    内容相同的评估请求（例如两个学生提交了相同的翻译）只调用一次，结果分别写给各自的 custom_id；
+    生成请求即使内容相同也各自调用，以得到不同的文章。
+    """
+    with open(batch_path, 'r', encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+
+    # custom_id -> 实际执行的请求行
+    runs = {}
+    first_by_hash = {}
+    for line in lines:
+        if line['custom_id'].startswith('evaluate-'):
+            runs[line['custom_id']] = first_by_hash.setdefault(make_content_hash(line['body']), line)
+        else:
+            runs[line['custom_id']] = line
+    unique_runs = {line['custom_id']: line for line in runs.values()}
+
+    def run(line):
+        try:
+            response = client.chat.completions.create(**line['body'])
+            usage = getattr(response, 'usage', None)
+            body = {
+                'model': getattr(response, 'model', None) or line['body'].get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant',
+                                                     'content': response.choices[0].message.content}}],
+                'usage': {
+                    'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+                    'completion_tokens': getattr(usage, 'completion_tokens', None)
+                } if usage else None
+            }
+            return {'response': {'status_code': 200, 'body': body}, 'error': None}
+        except Exception as e:
+            return {'response': None, 'error': {'message': str(e)}}
+
+    print(f"本地执行 {len(lines)} 个批量请求（内容相同的评估合并后 {len(unique_runs)} 次调用），并发数 {max_workers}")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = dict(zip(unique_runs, executor.map(run, unique_runs.values())))
+
+    output = [json.dumps(dict(outcomes[runs[line['custom_id']]['custom_id']], custom_id=line['custom_id']),
+                         ensure_ascii=False) for line in lines]
+    return "\n".join(output) + "\n"
+
+
+def apply_batch_results(output_text, batch_path, articles_dir='articles', results_dir='translation_results'):
+    """将批量输出映射回文章文件和评估报告，返回 {custom_id: 结果} 字典
+
+    生成请求的结果为保存的文章列表，评估请求的结果为 (report_path, report_content)，
+    失败的请求结果为 {'error': 错误信息}；清单中有但输出里没有的 custom_id 记为 {'error': 'missing from batch output'}。
+    """
+    with open(manifest_path_for(batch_path), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)['requests']
+    ensure_directory(articles_dir)
+    ensure_directory(results_dir)
+
+    results = {}
+    for line in output_text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        custom_id = item['custom_id']
+        metadata = manifest.get(custom_id)
+        if metadata is None:
+            print(f"未知的 custom_id: {custom_id}")
+            continue
+
+        response = item.get('response') or {}
+        if item.get('error') or response.get('status_code') != 200:
+            body_error = (response.get('body') or {}).get('error') or {}
+            results[custom_id] = {'error': (item.get('error') or {}).get('message') or body_error.get('message')
+                                  or response.get('status_code')}
+            continue
+
+        content = response['body']['choices'][0]['message']['content']
+        try:
+            if metadata['kind'] == 'generate':
+                results[custom_id] = parse_and_save_articles(content, metadata['word_list_name'], articles_dir)
+            else:
+                results[custom_id] = generate_evaluation_report(
+                    content, metadata['article_title'], metadata['translation_filename'],
+                    metadata['model'], results_dir
+                )
+        except Exception as e:
+            results[custom_id] = {'error': str(e)}
+
+    missing = [custom_id for custom_id in manifest if custom_id not in results]
+    for custom_id in missing:
+        results[custom_id] = {'error': 'missing from batch output'}
+
+    failed = sum(1 for result in results.values() if isinstance(result, dict) and 'error' in result)
+    print(f"批量结果处理完成: 成功 {len(results) - failed} 个, 失败 {failed} 个（其中输出中缺失 {len(missing)} 个）")
+    return results
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+文件目录索引模块
+使用SQLite记录文章、翻译和评估报告的路径、修改时间、标题及相互关联，按stat结果增量刷新
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+CATALOG_FILENAME = '.catalog.sqlite'
+
+# 文件类型 -> 文件后缀
+KIND_SUFFIXES = {
+    'article': '.md',
+    'translation': '.txt',
+    'report': '.md',
+}
+
+WORD_LIST_PATTERN = re.compile(r'本文基于单词列表 "(.*?)" 生成')
+REPORT_TITLE_PATTERN = re.compile(r'\*\*原文章标题\*\*:\s*(.*)')
+REPORT_TRANSLATION_PATTERN = re.compile(r'\*\*翻译文件\*\*:\s*(.*)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT,
+    word_list TEXT,
+    article_title TEXT,
+    translation_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_dir_kind ON files (directory, kind, name);
+CREATE INDEX IF NOT EXISTS idx_files_key ON files (kind, key);
+CREATE INDEX IF NOT EXISTS idx_files_translation_name ON files (kind, translation_name);
+"""
+
+
+def make_key(text):
+    """将标题或文件名归一化为匹配用的键，例如 "The Role of Governance" -> "the-role-of-governance" """
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def _read_header(path, max_lines=12):
+    """读取文件开头若干行"""
+    lines = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for _ in range(max_lines):
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line)
+    return lines
+
+
+def read_article_metadata(path):
+    """读取文章的标题和单词列表名称"""
+    title = None
+    for line in _read_header(path):
+        if line.strip().startswith('#'):
+            title = line.strip().lstrip('#').strip()
+            break
+
+    # 单词列表信息位于文章末尾
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 300))
+        tail = f.read().decode('utf-8', errors='ignore')
+    word_list_match = WORD_LIST_PATTERN.search(tail)
+    word_list = word_list_match.group(1) if word_list_match else None
+
+    return title or Path(path).stem, word_list
+
+
+def read_report_metadata(path):
+    """读取评估报告中记录的原文章标题和翻译文件名"""
+    header = ''.join(_read_header(path))
+    title_match = REPORT_TITLE_PATTERN.search(header)
+    translation_match = REPORT_TRANSLATION_PATTERN.search(header)
+    return (title_match.group(1).strip() if title_match else None,
+            translation_match.group(1).strip() if translation_match else None)
+
+
+class Catalog:
+    """文章、翻译和报告的SQLite目录索引"""
+
+    def __init__(self, db_path=CATALOG_FILENAME):
+        self.db_path = str(db_path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def refresh(self, kind, directory, force=False):
+        """增量刷新某个目录，返回变化的文件数
+
+        每次用 scandir 比较各文件的修改时间和大小（原地修改的文件也能发现），只重新读取有变化的文件；
+        force=True 时重新读取全部文件。
+        """
+        directory = str(Path(directory))
+        suffix = KIND_SUFFIXES[kind]
+        if not os.path.isdir(directory):
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM files WHERE directory = ? AND kind = ?", (directory, kind))
+            return 0
+
+        with self._lock:
+            known = {
+                path: (mtime_ns, size) for path, mtime_ns, size in self._conn.execute(
+                    "SELECT path, mtime_ns, size FROM files WHERE directory = ? AND kind = ?", (directory, kind)
+                )
+            }
+
+        seen = set()
+        changed = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(suffix) or entry.name.startswith('.') or not entry.is_file():
+                    continue
+                path = str(Path(directory) / entry.name)
+                seen.add(path)
+                stat = entry.stat()
+                if force or known.get(path) != (stat.st_mtime_ns, stat.st_size):
+                    changed.append(self._build_row(kind, directory, path, stat))
+
+        removed = [(path,) for path in known if path not in seen]
+        if changed or removed:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", changed
+                )
+                self._conn.executemany("DELETE FROM files WHERE path = ?", removed)
+        return len(changed) + len(removed)
+
+    def _build_row(self, kind, directory, path, stat):
+        """读取文件元数据，构建数据库记录"""
+        name = Path(path).name
+        title = word_list = article_title = translation_name = None
+        try:
+            if kind == 'article':
+                title, word_list = read_article_metadata(path)
+            elif kind == 'report':
+                article_title, translation_name = read_report_metadata(path)
+        except (OSError, UnicodeDecodeError):
+            pass
+
+        if kind == 'article':
+            key = make_key(title or Path(path).stem)
+        else:
+            key = make_key(Path(path).stem)
+        return (path, directory, kind, name, key, stat.st_mtime_ns, stat.st_size,
+                title, word_list, article_title, translation_name)
+
+    def list_files(self, kind, directory):
+        """列出目录中某类文件，按文件名排序"""
+        self.refresh(kind, directory)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM files WHERE directory = ? AND kind = ? ORDER BY name",
+                (str(Path(directory)), kind)
+            ).fetchall()
+        return [Path(path) for path, in rows]
+
+    def get_title(self, article_path):
+        """获取文章标题，文件修改过时重新读取"""
+        path = str(Path(article_path))
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, mtime_ns, size FROM files WHERE path = ? AND kind = 'article'", (path,)
+            ).fetchone()
+        if row and row[1] == stat.st_mtime_ns and row[2] == stat.st_size and row[0]:
+            return row[0]
+
+        record = self._build_row('article', str(Path(path).parent), path, stat)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", record)
+        return record[7]
+
+    def find_file(self, kind, directory, keyword):
+        """按关键词查找文件：优先精确匹配文件名或标题键，其次为文件名包含关系"""
+        directory = str(Path(directory))
+        self.refresh(kind, directory)
+        keyword_lower = keyword.lower()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path FROM files WHERE directory = ? AND kind = ? AND (lower(name) = ? OR key = ?) "
+                "ORDER BY name LIMIT 1",
+                (directory, kind, keyword_lower, make_key(Path(keyword).stem))
+            ).fetchone()
+            if not row:
+                row = self._conn.execute(
+                    "SELECT path FROM files WHERE directory = ? AND kind = ? "
+                    "AND (instr(lower(name), ?) > 0 OR instr(?, lower(name)) > 0) ORDER BY name LIMIT 1",
+                    (directory, kind, keyword_lower, keyword_lower)
+                ).fetchone()
+        return Path(row[0]) if row else None
+
+    def find_translation_for_article(self, article_path, translations_dir):
+        """查找与文章关联的翻译文件：翻译文件名与文章标题相同，或包含文章文件名"""
+        article_path = Path(article_path)
+        directory = str(Path(translations_dir))
+        self.refresh('translation', directory)
+        title_key = make_key(self.get_title(article_path))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path FROM files WHERE directory = ? AND kind = 'translation' AND key = ? "
+                "ORDER BY name LIMIT 1",
+                (directory, title_key)
+            ).fetchone()
+            if not row:
+                row = self._conn.execute(
+                    "SELECT path FROM files WHERE directory = ? AND kind = 'translation' "
+                    "AND instr(lower(name), ?) > 0 ORDER BY name LIMIT 1",
+                    (directory, article_path.stem.lower())
+                ).fetchone()
+        return Path(row[0]) if row else None
+
+    def find_article_for_translation(self, translation_path, articles_dir):
+        """查找与翻译文件关联的文章：文章标题键与翻译文件名相同，同名时取最新的文章"""
+        directory = str(Path(articles_dir))
+        self.refresh('article', directory)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path FROM files WHERE directory = ? AND kind = 'article' AND key = ? "
+                "ORDER BY name DESC LIMIT 1",
+                (directory, make_key(Path(translation_path).stem))
+            ).fetchone()
+        return Path(row[0]) if row else None
+
+    def get_article_word_lists(self, articles_dir):
+        """返回 {文章标题: 单词列表名称}，同名文章取最新的一篇"""
+        directory = str(Path(articles_dir))
+        self.refresh('article', directory)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, word_list FROM files WHERE directory = ? AND kind = 'article' ORDER BY name",
+                (directory,)
+            ).fetchall()
+        return {title: word_list for title, word_list in rows}
+
+    def find_reports_for_translation(self, translation_name, results_dir):
+        """查找某个翻译文件的全部评估报告，按文件名排序"""
+        directory = str(Path(results_dir))
+        self.refresh('report', directory)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM files WHERE directory = ? AND kind = 'report' AND translation_name = ? "
+                "ORDER BY name",
+                (directory, Path(translation_name).name)
+            ).fetchall()
+        return [Path(path) for path, in rows]
+
+    def get_links(self, results_dir, articles_dir='articles', translations_dir='translations'):
+        """列出评估报告与对应文章、翻译文件之间的关联"""
+        for kind, directory in (('report', results_dir), ('article', articles_dir),
+                                ('translation', translations_dir)):
+            self.refresh(kind, directory)
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT r.path, a.path, t.path
+                FROM files r
+                LEFT JOIN files a ON a.kind = 'article' AND a.directory = ? AND a.title = r.article_title
+                LEFT JOIN files t ON t.kind = 'translation' AND t.directory = ? AND t.name = r.translation_name
+                WHERE r.kind = 'report' AND r.directory = ?
+                GROUP BY r.path
+                ORDER BY r.name
+                """,
+                (str(Path(articles_dir)), str(Path(translations_dir)), str(Path(results_dir)))
+            ).fetchall()
+        return [{'report': Path(report),
+                 'article': Path(article) if article else None,
+                 'translation': Path(translation) if translation else None}
+                for report, article, translation in rows]
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(db_path=CATALOG_FILENAME):
+    """获取（并缓存）目录索引实例"""
+    key = str(Path(db_path).resolve())
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = Catalog(db_path)
+        return _catalogs[key]
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+分块翻译评估模块
+按token预算将句对分批并行评估，再合并为一份完整的评估结果
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .llm_cache import CachedClient
+from .metrics import timed_completion
+from .text_utils import estimate_tokens
+from .translation_evaluator import (
+    _pair_sentences, build_evaluation_request_for_pairs, split_evaluation_sections,
+    parse_sentence_section, renumber_sentence_sections, build_overall_section,
+    SENTENCE_HEADER_PATTERN
+)
+
+# 每句评估输出（标题、字段名、评价）的大致token开销
+SECTION_OVERHEAD_TOKENS = 180
+# 分块返回的段落缺少、重复或多出句子时的最大请求次数
+CHUNK_ATTEMPTS = 2
+
+
+def estimate_section_tokens(eng, trans):
+    """估算单个句子评估段落的输出token数"""
+    # 输出中会复述原文、用户翻译，并给出标准翻译和流畅翻译
+    return SECTION_OVERHEAD_TOKENS + estimate_tokens(eng) + 3 * estimate_tokens(trans)
+
+
+def plan_evaluation_chunks(pairs, token_budget=2500):
+    """按输出token预算将句对分组，每组的预计输出不超过token_budget（单句超出时单独成组）"""
+    chunks = []
+    current, current_tokens = [], 0
+    for eng, trans in pairs:
+        cost = estimate_section_tokens(eng, trans)
+        if current and current_tokens + cost > token_budget:
+            chunks.append((current, current_tokens))
+            current, current_tokens = [], 0
+        current.append((eng, trans))
+        current_tokens += cost
+    if current:
+        chunks.append((current, current_tokens))
+    return chunks
+
+
+def order_chunk_sections(chunk_pairs, sections):
+    """按段落编号将分块返回的段落与句对一一对应，编号缺少、重复或超出范围时抛出 ValueError"""
+    by_number = {}
+    for section in sections:
+        number = parse_sentence_section(section)['number']
+        if number in by_number:
+            raise ValueError(f"评估结果重复第 {number} 句")
+        if not number or number > len(chunk_pairs):
+            raise ValueError(f"评估结果多出第 {number} 句")
+        by_number[number] = section
+    for number in range(1, len(chunk_pairs) + 1):
+        if number not in by_number:
+            raise ValueError(f"评估结果缺少第 {number} 句")
+    return [by_number[number] for number in range(1, len(chunk_pairs) + 1)]
+
+
+def _evaluate_chunk(client, model, chunk_pairs, estimated_tokens):
+    """评估单个分块，返回与块内句对一一对应的段落列表；段落与句对对应不上时重新请求，仍失败则抛出异常"""
+    # 预留50%余量，避免预估偏小导致输出被截断
+    max_tokens = min(4000, int(estimated_tokens * 1.5) + 200)
+    request = build_evaluation_request_for_pairs(model, chunk_pairs, max_tokens=max_tokens, include_overall=False)
+    for attempt in range(CHUNK_ATTEMPTS):
+        if attempt and isinstance(client, CachedClient):
+            # 不完整的结果已被缓存，重试时跳过缓存
+            request = dict(request, cache_bypass=True)
+        response = timed_completion(client, 'evaluate', request, sentences=len(chunk_pairs))
+        content = response.choices[0].message.content or ""
+        sections = [section for section in split_evaluation_sections(content)
+                    if SENTENCE_HEADER_PATTERN.match(section)]
+        try:
+            return order_chunk_sections(chunk_pairs, sections)
+        except ValueError as e:
+            if attempt + 1 == CHUNK_ATTEMPTS:
+                raise
+            print(f"分块评估结果与句子对应不上（{e}），重新请求")
+
+
+def evaluate_translation_chunked(client, model, english_sentences, user_translations,
+                                 token_budget=2500, max_workers=4):
+    """分块并行评估翻译质量
+
+    返回与 evaluate_translation_with_ai 相同格式的评估文本：各句段落按顺序重新编号，
+    整体评分由各句评分在本地计算，可直接传给 generate_evaluation_report。
+    """
+    
+    print(f"原文句数: {len(english_sentences)}")
+    print(f"翻译句数: {len(user_translations)}")
+    
+    pairs = _pair_sentences(english_sentences, user_translations)
+    chunks = plan_evaluation_chunks(pairs, token_budget)
+    print(f"分为 {len(chunks)} 个分块并行评估，并发数 {max_workers}")
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_evaluate_chunk, client, model, chunk_pairs, tokens)
+                       for chunk_pairs, tokens in chunks]
+            chunk_sections = [future.result() for future in futures]
+    except Exception as e:
+        raise Exception(f"评估翻译时出错: {e}")
+    
+    sections = [section for sections in chunk_sections for section in sections]
+    scores = [parse_sentence_section(section)['score'] for section in sections]
+    
+    return renumber_sentence_sections(sections) + "\n\n" + build_overall_section(scores)
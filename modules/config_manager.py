@@ -6,7 +6,6 @@
 
 import json
 import os
-from openai import OpenAI
 
 
 def load_config(config_path='config.json'):
@@ -22,14 +21,34 @@ def load_config(config_path='config.json'):
 
 
 def init_openai_client(config):
-    """初始化OpenAI客户端"""
+    """初始化OpenAI客户端
+
+    返回共享连接池、带重试和限流的客户端（由 client 配置控制），启用router时返回在多个端点间路由的客户端，
+    配置中启用cache时外层再加磁盘缓存，启用metrics时记录性能指标。
+    """
+    # 客户端相关模块会带入 concurrent.futures、email 等标准库，只在真正创建客户端时导入
+    from .llm_cache import wrap_client_with_cache
+    from .managed_client import init_managed_client
+    from .model_router import init_model_router
+    from .metrics import configure_metrics
+
     try:
-        client = OpenAI(api_key=config['openai']['api_key'])
-        model = config['openai']['model']
-        return client, model
+        if config.get('router', {}).get('enabled'):
+            client, model = init_model_router(config)
+        else:
+            client = init_managed_client(config)
+            model = config['openai']['model']
     except KeyError as e:
         raise KeyError(f"配置文件缺少必要字段: {e}")
 
+    configure_metrics(config.get('metrics'))
+
+    cache_config = config.get('cache', {})
+    if cache_config.get('enabled'):
+        client = wrap_client_with_cache(client, cache_config)
+
+    return client, model
+
 
 def setup_environment():
     """设置项目环境，创建必要的文件夹"""
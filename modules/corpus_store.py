@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+打包语料库模块
+将文章、翻译和评估报告压缩后追加写入分段文件，用SQLite记录每条记录的偏移，按ID随机读取，并可按需导出为原有的markdown目录结构
+"""
+
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from .atomic_store import get_store
+
+DEFAULT_CORPUS_DIR = 'corpus'
+INDEX_FILENAME = 'index.sqlite'
+SEGMENT_PATTERN = 'segment-{:06d}.seg'
+MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+COMPRESSION_LEVEL = 6
+# 索引版本：2 起记录ID默认为 "类型/文件名"（此前为文件名去掉后缀，同名的文章和翻译会互相覆盖）
+SCHEMA_VERSION = 2
+
+# 每条记录: 头部(压缩后长度, crc32) + zlib压缩的 "ID\0类型\0文件名\0标题\0正文"
+RECORD_HEADER = struct.Struct('>II')
+RECORD_KINDS = ('article', 'translation', 'report')
+ARTICLE_TITLE_PATTERN = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+REPORT_TITLE_PATTERN = re.compile(r'\*\*原文章标题\*\*:\s*(.*)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    title TEXT,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_kind_name ON records (kind, name);
+"""
+
+
+def make_record_id(kind, name):
+    """默认记录ID："类型/文件名"，同名不同类型或不同后缀的文件不会互相覆盖"""
+    return f"{kind}/{name}"
+
+
+def extract_record_title(kind, content):
+    """从记录内容中提取标题：文章取一级标题，报告取原文章标题"""
+    pattern = ARTICLE_TITLE_PATTERN if kind == 'article' else REPORT_TITLE_PATTERN if kind == 'report' else None
+    match = pattern.search(content) if pattern else None
+    return match.group(1).strip() if match else None
+
+
+class RecordRef:
+    """语料库记录的引用，提供与 Path 相同的 name / stem / read_text，可直接传给文章和翻译读取函数"""
+
+    def __init__(self, store, record_id, kind, name, title):
+        self.store = store
+        self.id = record_id
+        self.kind = kind
+        self.name = name
+        self.title = title
+
+    @property
+    def stem(self):
+        return Path(self.name).stem
+
+    @property
+    def suffix(self):
+        return Path(self.name).suffix
+
+    def read_text(self, encoding='utf-8'):
+        """读取记录内容"""
+        return self.store.get(self.id)
+
+    def export(self, directory):
+        """导出为markdown目录中的文件，返回文件路径"""
+        return self.store.export_record(self.id, directory)
+
+    def __repr__(self):
+        return f"RecordRef({self.kind}:{self.name})"
+
+    def __str__(self):
+        return self.name
+
+
+class CorpusStore:
+    """追加写入的压缩分段文件 + SQLite偏移索引
+
+    写入时先获取数据库写锁（BEGIN IMMEDIATE），因此多个进程可以同时向同一个语料库追加记录。
+    同一ID再次写入时追加新记录并更新索引，旧记录保留在分段文件中；写入索引失败时截断分段文件中刚追加的内容。
+    """
+
+    def __init__(self, corpus_dir=DEFAULT_CORPUS_DIR, max_segment_bytes=MAX_SEGMENT_BYTES):
+        self.corpus_dir = Path(corpus_dir)
+        self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.corpus_dir / INDEX_FILENAME), timeout=30,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """旧版本索引的记录ID可能互相覆盖，从分段文件重建索引（被覆盖的记录仍保留在分段文件中）"""
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+            if self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]:
+                print(f"语料库索引版本 {version} 已过期，正在从分段文件重建...")
+                self.rebuild_index()
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """关闭索引数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def _segment_path(self, segment):
+        return self.corpus_dir / SEGMENT_PATTERN.format(segment)
+
+    def _current_segment(self):
+        segments = sorted(self.corpus_dir.glob('segment-*.seg'))
+        if not segments:
+            return 1
+        segment = int(segments[-1].stem.split('-')[1])
+        if segments[-1].stat().st_size >= self.max_segment_bytes:
+            segment += 1
+        return segment
+
+    @staticmethod
+    def _encode(record_id, kind, name, title, content):
+        payload = '\0'.join([record_id, kind, name, title or '', content]).encode('utf-8')
+        data = zlib.compress(payload, COMPRESSION_LEVEL)
+        return RECORD_HEADER.pack(len(data), zlib.crc32(data)) + data
+
+    @staticmethod
+    def _decode(data):
+        record_id, kind, name, title, content = zlib.decompress(data).decode('utf-8').split('\0', 4)
+        return record_id, kind, name, title or None, content
+
+    def put(self, kind, name, content, record_id=None, title=None):
+        """追加一条记录，返回 RecordRef；记录ID默认为 make_record_id(kind, name)，即 类型/文件名"""
+        if kind not in RECORD_KINDS:
+            raise ValueError(f"未知的记录类型: {kind}，可选: {', '.join(RECORD_KINDS)}")
+        record_id = record_id or make_record_id(kind, name)
+        title = title or extract_record_title(kind, content)
+        record = self._encode(record_id, kind, name, title, content)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            segment_path = offset = None
+            try:
+                segment = self._current_segment()
+                segment_path = self._segment_path(segment)
+                with open(segment_path, 'ab') as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(record)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record_id, kind, name, title, segment, offset, len(record), time.time())
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                # 仍持有写锁，其他写入者不会在此之后追加；截断未提交的记录，避免重建索引时被恢复
+                if offset is not None:
+                    with open(segment_path, 'r+b') as f:
+                        f.truncate(offset)
+                raise
+        return RecordRef(self, record_id, kind, name, title)
+
+    def get(self, record_id):
+        """按ID读取记录内容"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT segment, offset, length FROM records WHERE id = ?", (record_id,)
+            ).fetchone()
+        if not row:
+            raise KeyError(f"语料库中没有记录: {record_id}")
+        segment, offset, length = row
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        size, crc = RECORD_HEADER.unpack_from(data)
+        body = data[RECORD_HEADER.size:RECORD_HEADER.size + size]
+        if zlib.crc32(body) != crc:
+            raise Exception(f"记录 {record_id} 校验失败")
+        return self._decode(body)[4]
+
+    def ref(self, record_id):
+        """获取记录引用"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, name, title FROM records WHERE id = ?", (record_id,)
+            ).fetchone()
+        if not row:
+            raise KeyError(f"语料库中没有记录: {record_id}")
+        return RecordRef(self, *row)
+
+    def list_records(self, kind):
+        """按文件名顺序列出某种类型的全部记录"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, name, title FROM records WHERE kind = ? ORDER BY name", (kind,)
+            ).fetchall()
+        return [RecordRef(self, *row) for row in rows]
+
+    def count(self, kind=None):
+        """记录数量"""
+        with self._lock:
+            if kind:
+                return self._conn.execute("SELECT COUNT(*) FROM records WHERE kind = ?", (kind,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def import_directory(self, kind, directory, pattern=None):
+        """将目录中的文件打包写入语料库（已存在的同名记录跳过），返回新增记录数"""
+        pattern = pattern or ('*.txt' if kind == 'translation' else '*.md')
+        with self._lock:
+            existing = {name for name, in self._conn.execute("SELECT name FROM records WHERE kind = ?", (kind,))}
+        imported = 0
+        for path in sorted(Path(directory).glob(pattern)):
+            if path.name in existing or path.name.startswith('.'):
+                continue
+            self.put(kind, path.name, path.read_text(encoding='utf-8'))
+            imported += 1
+        print(f"已导入 {imported} 条{kind}记录: {directory}")
+        return imported
+
+    def export_record(self, record_id, directory):
+        """将记录导出到目录中，文件已存在且内容相同时不重复写入"""
+        ref = self.ref(record_id)
+        content = self.get(record_id)
+        path = Path(directory) / ref.name
+        try:
+            if path.stat().st_size == len(content.encode('utf-8')) and path.read_text(encoding='utf-8') == content:
+                return path
+        except FileNotFoundError:
+            pass
+        return get_store().write_text(path, content)
+
+    def export_markdown(self, kind, directory):
+        """将某种类型的全部记录导出为原有的目录结构（如 articles/、translation_results/）"""
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        paths = [self.export_record(ref.id, directory) for ref in self.list_records(kind)]
+        print(f"已导出 {len(paths)} 条{kind}记录到 {directory}")
+        return paths
+
+    def rebuild_index(self):
+        """扫描全部分段文件重建索引（用于索引损坏或丢失时），返回记录数"""
+        rows = {}
+        for segment_path in sorted(self.corpus_dir.glob('segment-*.seg')):
+            segment = int(segment_path.stem.split('-')[1])
+            with open(segment_path, 'rb') as f:
+                data = f.read()
+            offset = 0
+            while offset + RECORD_HEADER.size <= len(data):
+                size, crc = RECORD_HEADER.unpack_from(data, offset)
+                body = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + size]
+                if len(body) < size or zlib.crc32(body) != crc:
+                    print(f"分段 {segment_path.name} 在偏移 {offset} 处损坏，跳过其余内容")
+                    break
+                record_id, kind, name, title, _ = self._decode(body)
+                if record_id == Path(name).stem:
+                    # 旧版本默认ID（文件名去掉后缀）
+                    record_id = make_record_id(kind, name)
+                rows[record_id] = (record_id, kind, name, title, segment, offset,
+                                   RECORD_HEADER.size + size, time.time())
+                offset += RECORD_HEADER.size + size
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM records")
+            self._conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows.values())
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_corpus_store(corpus_dir=DEFAULT_CORPUS_DIR):
+    """获取（并缓存）语料库实例"""
+    key = str(Path(corpus_dir).resolve())
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = CorpusStore(corpus_dir)
+        return _stores[key]
@@ -8,6 +8,9 @@ import shutil
 import time
 from pathlib import Path
 
+from .catalog import get_catalog
+from .corpus_store import RecordRef
+
 
 def clean_directory(directory_path):
     """清空指定目录"""
@@ -95,19 +98,10 @@ def list_files_in_directory(directory_path, pattern='*'):
 
 
 def extract_title_from_article(article_path):
-    """从文章文件中提取标题"""
+    """从文章文件中提取标题（通过目录索引缓存，文件未修改时不重复读取；语料库记录直接使用索引中的标题）"""
+    if isinstance(article_path, RecordRef):
+        return article_path.title or article_path.stem
     try:
-        with open(article_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 提取第一行的标题（去掉#标记）
-        lines = content.split('\n')
-        for line in lines:
-            if line.strip().startswith('#'):
-                title = line.strip().lstrip('#').strip()
-                return title
-        
-        # 如果没有找到标题，使用文件名
-        return article_path.stem
+        return get_catalog().get_title(article_path)
     except Exception:
-        return article_path.stem
+        return Path(article_path).stem
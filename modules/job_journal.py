@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+任务日志模块
+批量生成和评估的追加式JSONL日志，按输入内容哈希记录每次完成的API调用和保存的文件；
+中断后重新运行时跳过已完成的任务，已返回但未保存的结果直接重新保存，只重试失败的任务，并显示进度和预计剩余时间
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from .article_generator import (
+    build_article_request, parse_and_save_articles, validate_article_job, article_job_name, _request_articles
+)
+from .file_manager import extract_title_from_article
+from .metrics import get_metrics_recorder, STAGE_PROMPT_BUILD
+from .translation_evaluator import (
+    extract_article_content, read_user_translation, evaluate_translation_with_ai, generate_evaluation_report
+)
+from .word_manager import read_word_list
+
+DEFAULT_JOURNAL_FILE = '.job_journal.jsonl'
+MAX_ATTEMPTS = 3
+
+# 日志事件
+EVENT_CALL = 'call'        # API调用完成，记录返回内容
+EVENT_SAVED = 'saved'      # 结果已保存，记录输出文件
+EVENT_FAILED = 'failed'    # 调用或保存失败
+
+
+def job_key(kind, payload):
+    """任务键：任务类型与输入内容的哈希，输入相同的任务对应同一个键"""
+    raw = json.dumps([kind, payload], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class JobJournal:
+    """追加式任务日志，每行一个事件；加载时同一个键以最后的事件为准"""
+
+    def __init__(self, path=DEFAULT_JOURNAL_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # 中断时可能留下不完整的最后一行
+                continue
+            entry = self.entries.setdefault(event['key'], {'attempts': 0})
+            if event['event'] == EVENT_CALL:
+                entry['content'] = event['content']
+            elif event['event'] == EVENT_SAVED:
+                # 已保存的任务不再需要返回内容，避免把整个语料读入内存
+                entry.pop('content', None)
+                entry['outputs'] = event['outputs']
+            elif event['event'] == EVENT_FAILED:
+                entry['attempts'] += 1
+                entry['error'] = event.get('error')
+            entry['status'] = event['event']
+
+    def _append(self, event):
+        event['ts'] = time.time()
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def record_call(self, key, content):
+        """记录一次完成的API调用及其返回内容"""
+        self._append({'key': key, 'event': EVENT_CALL, 'content': content})
+        with self._lock:
+            entry = self.entries.setdefault(key, {'attempts': 0})
+            entry.update(status=EVENT_CALL, content=content)
+
+    def record_saved(self, key, outputs):
+        """记录任务结果已保存到的文件"""
+        outputs = [str(path) for path in outputs]
+        self._append({'key': key, 'event': EVENT_SAVED, 'outputs': outputs})
+        with self._lock:
+            entry = self.entries.setdefault(key, {'attempts': 0})
+            entry.pop('content', None)
+            entry.update(status=EVENT_SAVED, outputs=outputs)
+
+    def record_failed(self, key, error):
+        """记录任务失败"""
+        self._append({'key': key, 'event': EVENT_FAILED, 'error': str(error)})
+        with self._lock:
+            entry = self.entries.setdefault(key, {'attempts': 0})
+            entry['attempts'] += 1
+            entry.update(status=EVENT_FAILED, error=str(error))
+
+    def is_done(self, key):
+        """任务已保存且输出文件仍然存在"""
+        entry = self.entries.get(key)
+        return bool(entry and entry.get('outputs') is not None
+                    and all(Path(path).exists() for path in entry['outputs']))
+
+    def cached_content(self, key):
+        """已完成的API调用返回的内容（没有时为None）"""
+        entry = self.entries.get(key)
+        return entry.get('content') if entry else None
+
+    def attempts(self, key):
+        """该任务累计失败次数"""
+        entry = self.entries.get(key)
+        return entry['attempts'] if entry else 0
+
+
+class ProgressReporter:
+    """按本次运行的完成速度估算剩余时间"""
+
+    def __init__(self, total, skipped=0, interval=5.0):
+        self.total = total
+        self.completed = skipped
+        self.skipped = skipped
+        self.failed = 0
+        self.interval = interval
+        self.start = time.monotonic()
+        self.last_report = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, ok, label=""):
+        with self._lock:
+            self.completed += 1
+            self.failed += 0 if ok else 1
+            now = time.monotonic()
+            if not ok or now - self.last_report >= self.interval or self.completed == self.total:
+                self.last_report = now
+                print(self.format(label))
+
+    def format(self, label=""):
+        done_this_run = self.completed - self.skipped
+        elapsed = time.monotonic() - self.start
+        remaining = self.total - self.completed
+        eta = elapsed / done_this_run * remaining if done_this_run else None
+        eta_text = _format_seconds(eta) if eta is not None else "未知"
+        percent = self.completed / self.total * 100 if self.total else 100.0
+        return (f"[{self.completed}/{self.total} {percent:.1f}%] 失败 {self.failed}，"
+                f"已用 {_format_seconds(elapsed)}，预计剩余 {eta_text} {label}").rstrip()
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}小时{minutes}分{seconds}秒" if hours else f"{minutes}分{seconds}秒"
+
+
+def run_journaled(journal, tasks, call, save, max_workers=4, max_attempts=MAX_ATTEMPTS):
+    """按日志运行任务
+
+    tasks 为 [(key, 名称, 任务参数)]；call(任务参数) 调用API并返回文本，save(任务参数, 文本) 保存结果并返回输出文件列表。
+    已保存且输出文件仍在的任务直接跳过；API已返回但未保存的任务不再调用API；累计失败 max_attempts 次的任务不再重试。
+    返回 {'done': [...], 'skipped': [...], 'failed': [...], 'given_up': [...]}，元素为任务名称。
+    """
+    summary = {'done': [], 'skipped': [], 'failed': [], 'given_up': []}
+    pending = []
+    seen = set()
+    for key, name, params in tasks:
+        if key in seen or journal.is_done(key):
+            summary['skipped'].append(name)
+        elif journal.attempts(key) >= max_attempts:
+            summary['given_up'].append(name)
+        else:
+            pending.append((key, name, params))
+        seen.add(key)
+
+    print(f"共 {len(tasks)} 个任务：已完成 {len(summary['skipped'])} 个，"
+          f"放弃 {len(summary['given_up'])} 个（已失败 {max_attempts} 次），本次运行 {len(pending)} 个")
+    progress = ProgressReporter(len(tasks) - len(summary['given_up']), len(summary['skipped']))
+
+    def run_task(key, params):
+        content = journal.cached_content(key)
+        if content is None:
+            content = call(params)
+            journal.record_call(key, content)
+        outputs = save(params, content)
+        if not outputs:
+            raise ValueError("没有保存任何结果")
+        journal.record_saved(key, outputs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_task, key, params): (key, name) for key, name, params in pending}
+        for future in as_completed(futures):
+            key, name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                journal.record_failed(key, e)
+                summary['failed'].append(name)
+                progress.update(False, f"❌ {name}: {e}")
+                continue
+            summary['done'].append(name)
+            progress.update(True, f"✅ {name}")
+
+    print(f"运行结束: 本次完成 {len(summary['done'])} 个，失败 {len(summary['failed'])} 个，"
+          f"跳过 {len(summary['skipped'])} 个；重新运行即可只重试失败的任务")
+    return summary
+
+
+def generate_articles_resumable(client, model, jobs, journal_path=DEFAULT_JOURNAL_FILE, max_workers=4,
+                                articles_dir='articles', max_attempts=MAX_ATTEMPTS):
+    """可断点续跑的批量文章生成，jobs 格式与 generate_articles_batch 相同"""
+    # 开始前检查全部任务，避免运行到一半才因缺少字段中断
+    errors = [f"任务{i + 1}: {error}" for i, error in enumerate(map(validate_article_job, jobs)) if error]
+    if errors:
+        raise ValueError("批量生成任务配置错误: " + "；".join(errors))
+    journal = JobJournal(journal_path)
+    tasks = []
+    repeats = Counter()
+    for job in jobs:
+        words = job.get('words') or read_word_list(job['word_list'])
+        word_list_name = article_job_name(job)
+        params = {
+            'model': model, 'words': words, 'word_list_name': word_list_name,
+            'count': job.get('count', 3), 'topic': job['topic'], 'genre': job['genre'],
+            'difficulty': job['difficulty'], 'min_occurrences': job.get('min_occurrences', 2),
+            'max_tokens': job.get('max_tokens', 3000),
+        }
+        # 同一任务重复出现时用序号区分，使其各自生成一组文章
+        canonical = json.dumps(job, ensure_ascii=False, sort_keys=True, default=str)
+        key = job_key('generate', dict(params, repeat=repeats[canonical]))
+        repeats[canonical] += 1
+        tasks.append((key, f"{word_list_name}/{job['topic']}", params))
+
+    def call(params):
+        with get_metrics_recorder().stage('generate', STAGE_PROMPT_BUILD):
+            request = build_article_request(
+                params['model'], params['words'], params['count'], params['topic'], params['genre'],
+                params['difficulty'], params['min_occurrences'], params['max_tokens']
+            )
+        return _request_articles(client, request)
+
+    def save(params, content):
+        return [article['path'] for article in parse_and_save_articles(content, params['word_list_name'], articles_dir)]
+
+    return run_journaled(journal, tasks, call, save, max_workers, max_attempts)
+
+
+def evaluate_translations_resumable(client, model, pairs, journal_path=DEFAULT_JOURNAL_FILE, max_workers=4,
+                                    results_dir='translation_results', max_attempts=MAX_ATTEMPTS):
+    """可断点续跑的批量翻译评估，pairs 为 [(文章路径, 翻译文件路径)]
+
+    任务键由翻译文件名以及文章和翻译的内容哈希得到：内容相同但文件名不同的翻译（不同学生或重新提交）各自生成报告。
+    """
+    journal = JobJournal(journal_path)
+    tasks = []
+    for article_path, translation_path in pairs:
+        article_path, translation_path = Path(article_path), Path(translation_path)
+        key = job_key('evaluate', {'model': model, 'article': _file_digest(article_path),
+                                   'translation': _file_digest(translation_path),
+                                   'translation_filename': translation_path.name})
+        tasks.append((key, translation_path.name, (article_path, translation_path)))
+
+    def call(params):
+        article_path, translation_path = params
+        return evaluate_translation_with_ai(
+            client, model, extract_article_content(article_path), read_user_translation(translation_path)
+        )
+
+    def save(params, content):
+        article_path, translation_path = params
+        report_path, _ = generate_evaluation_report(
+            content, extract_title_from_article(article_path), translation_path.name, model, results_dir
+        )
+        return [report_path]
+
+    return run_journaled(journal, tasks, call, save, max_workers, max_attempts)
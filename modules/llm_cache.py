@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存模块
+按 (model, messages, temperature, max_tokens) 的哈希值将响应缓存到磁盘，支持LRU淘汰
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+
+class LLMCache:
+    """基于文件的内容寻址缓存，按条目数、总大小和存活时间进行LRU淘汰
+
+    存活时间统一按条目的创建时间（entry['created']，写入时同时设为文件的修改时间）计算，
+    最近使用时间记录在文件的访问时间中，只用于LRU排序。
+    """
+
+    def __init__(self, cache_dir='.llm_cache', max_entries=2000, max_size_mb=100,
+                 max_age_days=30, evict_interval=20):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age = max_age_days * 86400
+        self.evict_interval = evict_interval
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self.evict()
+
+    @staticmethod
+    def make_key(request):
+        """根据请求参数计算缓存键"""
+        key_data = {
+            'model': request.get('model'),
+            'messages': request.get('messages'),
+            'temperature': request.get('temperature'),
+            'max_tokens': request.get('max_tokens')
+        }
+        if request.get('response_format'):
+            key_data['response_format'] = request['response_format']
+        raw = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """读取缓存条目，过期或不存在时返回None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entry = None
+
+        if entry is not None and time.time() - entry.get('created', 0) > self.max_age:
+            path.unlink(missing_ok=True)
+            entry = None
+
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # 更新访问时间作为LRU依据，修改时间保持为创建时间
+        try:
+            os.utime(path, (time.time(), entry.get('created', 0)))
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """写入缓存条目"""
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        created = entry.get('created', time.time())
+        os.utime(tmp_path, (time.time(), created))
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._puts += 1
+            should_evict = self._puts % self.evict_interval == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """删除创建时间超过 max_age 的条目，并按最近使用时间淘汰超出限制的条目"""
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            # 修改时间即创建时间，与 get() 的过期判断一致
+            if now - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """清空缓存"""
+        for path in self.cache_dir.glob('*.json'):
+            path.unlink(missing_ok=True)
+
+    def stats(self):
+        """返回命中统计"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(list(self.cache_dir.glob('*.json')))
+        }
+
+
+def _response_to_entry(response):
+    """将API响应转换为可缓存的字典"""
+    choice = response.choices[0]
+    usage = getattr(response, 'usage', None)
+    return {
+        'content': choice.message.content,
+        'finish_reason': getattr(choice, 'finish_reason', None),
+        'model': getattr(response, 'model', None),
+        'usage': {
+            'prompt_tokens': getattr(usage, 'prompt_tokens', 0),
+            'completion_tokens': getattr(usage, 'completion_tokens', 0),
+            'total_tokens': getattr(usage, 'total_tokens', 0)
+        } if usage else None,
+        'created': time.time()
+    }
+
+
+def _entry_to_response(entry):
+    """将缓存条目还原为与API响应结构一致的对象"""
+    message = SimpleNamespace(role='assistant', content=entry['content'])
+    choice = SimpleNamespace(index=0, message=message, finish_reason=entry.get('finish_reason'))
+    usage = SimpleNamespace(**entry['usage']) if entry.get('usage') else None
+    return SimpleNamespace(choices=[choice], usage=usage, model=entry.get('model'), cache_hit=True)
+
+
+class CachedClient:
+    """OpenAI客户端的缓存包装器，接口与 client.chat.completions.create 保持一致
+
+    bypass=True 时全部请求跳过缓存；单次调用可传入 cache_bypass=True 强制重新请求。
+    流式请求不经过缓存；其余参数（如模型路由的 hedge）原样传给内层客户端。
+    """
+
+    def __init__(self, client, cache, bypass=False):
+        self.client = client
+        self.cache = cache
+        self.bypass = bypass
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _create(self, cache_bypass=False, **kwargs):
+        if self.bypass or kwargs.get('stream'):
+            return self.client.chat.completions.create(**kwargs)
+
+        key = self.cache.make_key(kwargs)
+        if not cache_bypass:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return _entry_to_response(entry)
+
+        response = self.client.chat.completions.create(**kwargs)
+        # 模型路由切换到其他端点回答时，按实际回答的模型保存，避免以后当作默认模型的结果返回
+        routed_model = getattr(response, 'routed_model', None)
+        if routed_model and routed_model != kwargs.get('model'):
+            key = self.cache.make_key(dict(kwargs, model=routed_model))
+        if response.choices and response.choices[0].message.content:
+            self.cache.put(key, _response_to_entry(response))
+        return response
+
+    def stats(self):
+        """返回缓存命中统计"""
+        return self.cache.stats()
+
+
+def wrap_client_with_cache(client, cache_config):
+    """根据配置为客户端添加缓存"""
+    cache = LLMCache(
+        cache_dir=cache_config.get('dir', '.llm_cache'),
+        max_entries=cache_config.get('max_entries', 2000),
+        max_size_mb=cache_config.get('max_size_mb', 100),
+        max_age_days=cache_config.get('max_age_days', 30)
+    )
+    return CachedClient(client, cache, bypass=cache_config.get('bypass', False))
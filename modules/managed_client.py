@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+托管客户端模块
+共享HTTP连接池的OpenAI客户端，带超时、指数退避重试（遵循Retry-After）和进程级令牌桶限流
+"""
+
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from .text_utils import estimate_tokens
+
+DEFAULT_CLIENT_CONFIG = {
+    'timeout': 60.0,
+    'connect_timeout': 10.0,
+    'max_connections': 20,
+    'max_keepalive_connections': 10,
+    'keepalive_expiry': 30.0,
+    'max_retries': 5,
+    'backoff_base': 1.0,
+    'backoff_max': 60.0,
+    'retry_after_max': 300.0,   # 服务端要求的 Retry-After 超过该值时不再重试
+    'requests_per_minute': 0,
+    'tokens_per_minute': 0,
+}
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class TokenBucket:
+    """令牌桶：按每分钟速率补充，容量默认为一分钟的额度"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """取出指定数量的令牌，不足时阻塞等待；超过容量的请求按容量计"""
+        amount = min(amount, self.capacity)
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                self._cond.wait((amount - self.tokens) / self.rate)
+
+    def refund(self, amount):
+        """归还多扣的令牌（例如实际token用量小于预估时）"""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+            self._cond.notify_all()
+
+
+class RateLimiter:
+    """同时限制每分钟请求数和每分钟token数，0表示不限制"""
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, estimated_tokens):
+        """发送请求前调用，必要时阻塞"""
+        if self.request_bucket:
+            self.request_bucket.acquire(1)
+        if self.token_bucket:
+            self.token_bucket.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """请求完成后按实际用量归还多扣的token额度"""
+        if self.token_bucket and actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.token_bucket.refund(estimated_tokens - actual_tokens)
+
+
+class RetryPolicy:
+    """指数退避（full jitter）重试策略，服务端返回Retry-After时至少等待该时长
+
+    Retry-After 不受 backoff_max 限制；超过 retry_after_max 时放弃重试，而不是提前重试。
+    """
+
+    def __init__(self, max_retries=5, backoff_base=1.0, backoff_max=60.0, retry_after_max=300.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+
+    def delay(self, attempt, retry_after=None):
+        """计算第 attempt 次重试前的等待时间（秒），服务端要求的等待时间超过 retry_after_max 时返回None"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            if retry_after > self.retry_after_max:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+
+def is_retryable_error(error):
+    """判断异常是否值得重试：连接错误、超时、429和5xx"""
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    status_code = getattr(error, 'status_code', None)
+    return status_code is not None and (status_code in RETRYABLE_STATUS_CODES or status_code >= 500)
+
+
+def get_retry_after(error):
+    """从错误响应头中读取Retry-After（秒），支持 retry-after-ms、秒数和HTTP日期格式"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    import email.utils  # 只有HTTP日期格式才需要，避免每次导入都加载email包
+
+    # 格式错误的HTTP日期在 Python 3.10+ 会抛出异常，不能掩盖原始的API错误
+    try:
+        parsed = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+class ManagedClient:
+    """为 client.chat.completions.create 增加限流和重试，其余属性透传给原客户端"""
+
+    def __init__(self, client, rate_limiter=None, retry_policy=None):
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _create(self, **kwargs):
+        estimated_tokens = sum(estimate_tokens(str(m.get('content', ''))) for m in kwargs.get('messages', []))
+        estimated_tokens += kwargs.get('max_tokens') or 0
+
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt >= self.retry_policy.max_retries or not is_retryable_error(e):
+                    raise
+                retry_after = get_retry_after(e)
+                delay = self.retry_policy.delay(attempt, retry_after)
+                if delay is None:
+                    print(f"请求失败（{e.__class__.__name__}），服务端要求等待 {retry_after:.0f} 秒，"
+                          f"超过 retry_after_max（{self.retry_policy.retry_after_max:.0f} 秒），不再重试")
+                    raise
+                attempt += 1
+                print(f"请求失败（{e.__class__.__name__}），{delay:.1f} 秒后进行第 {attempt} 次重试")
+                time.sleep(delay)
+                continue
+
+            if self.rate_limiter and not kwargs.get('stream'):
+                usage = getattr(response, 'usage', None)
+                self.rate_limiter.settle(estimated_tokens, getattr(usage, 'total_tokens', None))
+            return response
+
+
+_shared_clients = {}
+_rate_limiters = {}
+_shared_lock = threading.Lock()
+
+
+def get_client_config(config):
+    """合并 config.json 中的 client 配置与默认值"""
+    client_config = dict(DEFAULT_CLIENT_CONFIG)
+    client_config.update(config.get('client', {}))
+    return client_config
+
+
+def get_shared_openai_client(config):
+    """获取共享连接池的OpenAI客户端，相同的 api_key / base_url / 连接配置只创建一次"""
+    from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI, Timeout
+
+    client_config = get_client_config(config)
+    api_key = config['openai']['api_key']
+    base_url = config['openai'].get('base_url')
+    key = (api_key, base_url, client_config['timeout'], client_config['connect_timeout'],
+           client_config['max_connections'], client_config['max_keepalive_connections'],
+           client_config['keepalive_expiry'])
+
+    with _shared_lock:
+        if key not in _shared_clients:
+            # 使用与openai所依赖的HTTP库一致的Limits类型
+            limits = type(DEFAULT_CONNECTION_LIMITS)(
+                max_connections=client_config['max_connections'],
+                max_keepalive_connections=client_config['max_keepalive_connections'],
+                keepalive_expiry=client_config['keepalive_expiry']
+            )
+            timeout = Timeout(client_config['timeout'], connect=client_config['connect_timeout'])
+            _shared_clients[key] = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                max_retries=0,  # 重试由 ManagedClient 负责
+                http_client=DefaultHttpxClient(limits=limits, timeout=timeout)
+            )
+        return _shared_clients[key]
+
+
+def get_rate_limiter(config):
+    """获取进程级共享的限流器"""
+    client_config = get_client_config(config)
+    key = (client_config['requests_per_minute'], client_config['tokens_per_minute'])
+    if not any(key):
+        return None
+    with _shared_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(*key)
+        return _rate_limiters[key]
+
+
+def init_managed_client(config):
+    """根据配置创建带连接池、限流和重试的客户端"""
+    client_config = get_client_config(config)
+    retry_policy = RetryPolicy(
+        max_retries=client_config['max_retries'],
+        backoff_base=client_config['backoff_base'],
+        backoff_max=client_config['backoff_max'],
+        retry_after_max=client_config['retry_after_max']
+    )
+    return ManagedClient(get_shared_openai_client(config), get_rate_limiter(config), retry_policy)
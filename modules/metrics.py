@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+性能指标模块
+记录每次LLM调用和每个流水线阶段的耗时、token用量、模型和缓存命中情况，写入追加式JSONL文件
+"""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .prompt_templates import template_id_for_messages
+
+DEFAULT_METRICS_PATH = 'metrics/llm_metrics.jsonl'
+
+# 流水线阶段名称
+STAGE_PROMPT_BUILD = 'prompt_build'
+STAGE_API_CALL = 'api_call'
+STAGE_PARSE = 'parse'
+STAGE_FILE_WRITE = 'file_write'
+
+
+class MetricsRecorder:
+    """将指标事件逐行追加到JSONL文件"""
+
+    def __init__(self, path=DEFAULT_METRICS_PATH, enabled=True):
+        self.path = Path(path)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    def record(self, pipeline, stage, elapsed_sec, **fields):
+        """记录一条指标事件"""
+        if not self.enabled:
+            return
+        event = {'ts': time.time(), 'pipeline': pipeline, 'stage': stage, 'elapsed_sec': round(elapsed_sec, 6)}
+        event.update(fields)
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    @contextmanager
+    def stage(self, pipeline, stage, **fields):
+        """计时上下文，退出时记录该阶段耗时；可在返回的字典中补充字段"""
+        extra = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.record(pipeline, stage, time.perf_counter() - start, **extra)
+
+
+_recorder = MetricsRecorder(enabled=False)
+
+
+def configure_metrics(metrics_config=None):
+    """根据配置启用或关闭指标记录，返回全局记录器"""
+    global _recorder
+    metrics_config = metrics_config or {}
+    _recorder = MetricsRecorder(
+        path=metrics_config.get('path', DEFAULT_METRICS_PATH),
+        enabled=metrics_config.get('enabled', False)
+    )
+    return _recorder
+
+
+def get_metrics_recorder():
+    """获取全局指标记录器"""
+    return _recorder
+
+
+def usage_fields(usage):
+    """从 response.usage 中提取token用量，包括服务端前缀缓存命中的输入token数"""
+    if not usage:
+        return {'prompt_tokens': None, 'completion_tokens': None, 'cached_tokens': None}
+    details = getattr(usage, 'prompt_tokens_details', None)
+    if isinstance(details, dict):
+        cached_tokens = details.get('cached_tokens')
+    else:
+        cached_tokens = getattr(details, 'cached_tokens', None)
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+        'completion_tokens': getattr(usage, 'completion_tokens', None),
+        'cached_tokens': cached_tokens
+    }
+
+
+def timed_completion(client, pipeline, request, hedge=False, **fields):
+    """调用 chat completions 并记录耗时、token用量、模型和缓存命中情况
+
+    hedge=True 时请求模型路由发送对冲请求（只用于交互式调用；客户端不是模型路由时忽略）。
+    """
+    if hedge and getattr(client, 'supports_hedge', False):
+        request = dict(request, hedge=True)
+    response = None
+    error = None
+    start = time.perf_counter()
+    try:
+        response = client.chat.completions.create(**request)
+        return response
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        # 失败的调用同样记录（ok=False 和错误类型），便于统计错误率
+        elapsed = time.perf_counter() - start
+        _recorder.record(
+            pipeline, STAGE_API_CALL, elapsed,
+            model=getattr(response, 'model', None) or request.get('model'),
+            prompt=template_id_for_messages(request.get('messages')),
+            cache_hit=bool(getattr(response, 'cache_hit', False)),
+            ok=error is None,
+            error=error.__class__.__name__ if error is not None else None,
+            **usage_fields(getattr(response, 'usage', None)),
+            **fields
+        )
+
+
+def record_stream_call(pipeline, model, elapsed_sec, first_token_sec=None, usage=None, request=None, **fields):
+    """记录一次流式调用（首个token延迟和总耗时）"""
+    _recorder.record(
+        pipeline, STAGE_API_CALL, elapsed_sec,
+        model=model, prompt=template_id_for_messages((request or {}).get('messages')),
+        cache_hit=False, stream=True, first_token_sec=first_token_sec,
+        **usage_fields(usage), **fields
+    )
+
+
+def load_metrics(path=DEFAULT_METRICS_PATH):
+    """读取全部指标事件"""
+    events = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    except FileNotFoundError:
+        pass
+    return events
+
+
+def percentile(values, q):
+    """最近秩法计算百分位数：排序后第 ceil(q/100*n) 个值（没有数据时返回None）
+
+    指标汇总、基准测试和模型路由的对冲阈值都使用这一定义。
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize_metrics(path=DEFAULT_METRICS_PATH, since=None):
+    """汇总指标：各阶段p50/p95耗时、失败次数、token用量、缓存命中率，以及每篇文章/每个评估句子的token数"""
+    events = [e for e in load_metrics(path) if since is None or e.get('ts', 0) >= since]
+
+    stages = {}
+    for event in events:
+        stages.setdefault(f"{event['pipeline']}.{event['stage']}", []).append(event)
+
+    summary = {'stages': {}}
+    for key, items in sorted(stages.items()):
+        # 延迟分位数只统计成功的调用，失败和被调用方取消（ok 为 None）的次数单独统计
+        latencies = [e['elapsed_sec'] for e in items if e.get('ok', True)]
+        stats = {
+            'count': len(items),
+            'errors': sum(1 for e in items if e.get('ok') is False),
+            'cancelled': sum(1 for e in items if e.get('status') == 'cancelled'),
+            'p50_sec': percentile(latencies, 50),
+            'p95_sec': percentile(latencies, 95),
+            'total_sec': sum(latencies)
+        }
+        if key.endswith('.' + STAGE_API_CALL):
+            stats['prompt_tokens'] = sum(e.get('prompt_tokens') or 0 for e in items)
+            stats['completion_tokens'] = sum(e.get('completion_tokens') or 0 for e in items)
+            stats['cache_hits'] = sum(1 for e in items if e.get('cache_hit'))
+            stats['cached_tokens'] = sum(e.get('cached_tokens') or 0 for e in items)
+            # 按是否命中服务端前缀缓存分别统计流式调用的首个token延迟
+            for name, hit in (('first_token_p50_cached', True), ('first_token_p50_uncached', False)):
+                first_tokens = [e['first_token_sec'] for e in items
+                                if e.get('first_token_sec') is not None and bool(e.get('cached_tokens')) == hit]
+                stats[name] = percentile(first_tokens, 50)
+        summary['stages'][key] = stats
+
+    def total_tokens(pipeline):
+        stats = summary['stages'].get(f"{pipeline}.{STAGE_API_CALL}", {})
+        return stats.get('prompt_tokens', 0) + stats.get('completion_tokens', 0)
+
+    article_count = summary['stages'].get(f"generate.{STAGE_FILE_WRITE}", {}).get('count', 0)
+    sentence_count = sum(e.get('sentences') or 0 for e in stages.get(f"evaluate.{STAGE_API_CALL}", [])
+                         if e.get('ok', True))
+    summary['tokens_per_article'] = total_tokens('generate') / article_count if article_count else None
+    summary['tokens_per_sentence'] = total_tokens('evaluate') / sentence_count if sentence_count else None
+    return summary
+
+
+def display_metrics_summary(summary):
+    """显示指标汇总"""
+    print("📈 性能指标汇总:")
+    for key, stats in summary['stages'].items():
+        line = f"   {key}: {stats['count']} 次"
+        if stats['p50_sec'] is not None:
+            line += f", p50 {stats['p50_sec']:.3f}s, p95 {stats['p95_sec']:.3f}s"
+        if stats['errors']:
+            line += f", 失败 {stats['errors']} 次（错误率 {stats['errors'] / stats['count']:.1%}）"
+        if stats['cancelled']:
+            line += f", 取消 {stats['cancelled']} 次"
+        if 'prompt_tokens' in stats:
+            line += (f", 输入 {stats['prompt_tokens']} tokens（前缀缓存 {stats['cached_tokens']}）"
+                     f", 输出 {stats['completion_tokens']} tokens, 缓存命中 {stats['cache_hits']} 次")
+            for name, label in (('first_token_p50_cached', '前缀缓存命中'), ('first_token_p50_uncached', '未命中')):
+                if stats[name] is not None:
+                    line += f", 首个token p50（{label}）{stats[name]:.3f}s"
+        print(line)
+    if summary['tokens_per_article'] is not None:
+        print(f"   每篇文章平均token: {summary['tokens_per_article']:.0f}")
+    if summary['tokens_per_sentence'] is not None:
+        print(f"   每个评估句子平均token: {summary['tokens_per_sentence']:.0f}")
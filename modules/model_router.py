@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+模型路由模块
+按 config.json 中 router 配置的多个模型/服务端点路由请求：记录各端点滚动窗口内的延迟和错误率，请求发往最快的健康端点，
+失败时自动切换到下一个端点；传入 hedge=True 的请求超过p95延迟仍未返回时向另一端点发送对冲请求，先返回的结果胜出
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from types import SimpleNamespace
+
+from .managed_client import init_managed_client
+from .metrics import percentile
+
+DEFAULT_ROUTER_CONFIG = {
+    'enabled': False,
+    'endpoints': [],
+    'window': 50,               # 每个端点保留最近多少次请求的统计
+    'max_error_rate': 0.5,      # 窗口内错误率超过该值时暂停使用该端点
+    'min_samples': 5,           # 计算错误率和p95前至少需要的样本数
+    'cooldown': 30.0,           # 端点被暂停后多少秒再尝试
+    'hedge': True,              # 是否允许对冲请求（只对传入 hedge=True 的非流式请求生效）
+    'hedge_percentile': 95,
+    'hedge_delay': 5.0,         # 样本不足时的对冲等待时间（秒）
+    'hedge_min_delay': 0.5,
+    'max_workers': 16,
+}
+
+
+class EndpointStats:
+    """单个端点的滚动延迟与成败记录"""
+
+    def __init__(self, window=50):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.down_until = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, ok):
+        with self._lock:
+            if ok:
+                self.latencies.append(elapsed)
+            self.outcomes.append(ok)
+
+    def error_rate(self):
+        with self._lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def percentile(self, q):
+        """成功请求延迟的分位数（秒，与指标汇总相同的最近秩法），没有样本时为None"""
+        with self._lock:
+            values = list(self.latencies)
+        return percentile(values, q)
+
+    def mean_latency(self):
+        with self._lock:
+            return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def expected_latency(self):
+        """考虑失败重发后得到一次成功响应的预期耗时：平均延迟 / 成功率"""
+        error_rate = self.error_rate()
+        return self.mean_latency() / (1 - error_rate) if error_rate < 1 else float('inf')
+
+    def sample_count(self):
+        with self._lock:
+            return len(self.outcomes)
+
+
+class Endpoint:
+    """一个模型/服务端点：名称、模型名和带重试限流的客户端"""
+
+    def __init__(self, name, model, client, window=50):
+        self.name = name
+        self.model = model
+        self.client = client
+        self.stats = EndpointStats(window)
+
+
+class ModelRouter:
+    """在多个端点之间路由 chat.completions.create，接口与OpenAI客户端相同
+
+    请求中的 model 会被替换为所选端点的模型名，返回的响应带有 routed_model（实际回答的端点模型名）。
+    只有传入 hedge=True 的请求（交互式评估等）才发送对冲请求，批量任务不传，只在失败时切换端点。
+    """
+
+    supports_hedge = True
+
+    def __init__(self, endpoints, router_config=None):
+        if not endpoints:
+            raise ValueError("模型路由至少需要一个端点")
+        self.endpoints = endpoints
+        self.config = dict(DEFAULT_ROUTER_CONFIG)
+        self.config.update(router_config or {})
+        self.executor = ThreadPoolExecutor(max_workers=self.config['max_workers'])
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self.endpoints[0].client, name)
+
+    def is_healthy(self, endpoint):
+        """端点不在暂停期内即视为健康"""
+        return time.monotonic() >= endpoint.stats.down_until
+
+    def ranked_endpoints(self):
+        """按健康状态和预期延迟排序：健康端点在前，其中没有样本的优先（便于收集数据），其余按预期延迟从低到高"""
+        def sort_key(endpoint):
+            stats = endpoint.stats
+            return (not self.is_healthy(endpoint), stats.sample_count() > 0, stats.expected_latency(),
+                    stats.in_flight)
+        return sorted(self.endpoints, key=sort_key)
+
+    def hedge_delay(self, endpoint):
+        """对冲等待时间：该端点延迟的p95（样本不足时用默认值）"""
+        stats = endpoint.stats
+        if stats.sample_count() < self.config['min_samples']:
+            return self.config['hedge_delay']
+        p95 = stats.percentile(self.config['hedge_percentile'])
+        return max(self.config['hedge_min_delay'], p95 or self.config['hedge_delay'])
+
+    def _call(self, endpoint, kwargs):
+        """调用一个端点并记录延迟和成败"""
+        stats = endpoint.stats
+        with stats._lock:
+            stats.in_flight += 1
+        start = time.perf_counter()
+        try:
+            response = endpoint.client.chat.completions.create(**dict(kwargs, model=endpoint.model))
+        except Exception:
+            self._record(endpoint, time.perf_counter() - start, False)
+            raise
+        finally:
+            with stats._lock:
+                stats.in_flight -= 1
+        self._record(endpoint, time.perf_counter() - start, True)
+        return response
+
+    def _record(self, endpoint, elapsed, ok):
+        stats = endpoint.stats
+        stats.record(elapsed, ok)
+        if (not ok and stats.sample_count() >= self.config['min_samples']
+                and stats.error_rate() > self.config['max_error_rate']):
+            stats.down_until = time.monotonic() + self.config['cooldown']
+            print(f"⚠️ 端点 {endpoint.name} 错误率 {stats.error_rate():.0%}，暂停 {self.config['cooldown']:.0f} 秒")
+
+    def _create(self, hedge=False, **kwargs):
+        candidates = self.ranked_endpoints()
+        if hedge and self.config['hedge'] and not kwargs.get('stream'):
+            endpoint, response = self._create_hedged(candidates, kwargs)
+        else:
+            endpoint, response = self._create_with_fallback(candidates, kwargs)
+        response.routed_model = endpoint.model
+        return response
+
+    def _create_with_fallback(self, candidates, kwargs):
+        """依次尝试各端点，直到有一个成功"""
+        last_error = None
+        for endpoint in candidates:
+            try:
+                return endpoint, self._call(endpoint, kwargs)
+            except Exception as e:
+                last_error = e
+                print(f"端点 {endpoint.name} 请求失败（{e.__class__.__name__}），切换到下一个端点")
+        raise last_error
+
+    def _create_hedged(self, candidates, kwargs):
+        """先发往最快的端点，超过其p95仍未返回时向下一个端点发送对冲请求，取先成功的结果；失败时立即切换
+
+        对冲等待时间从首个请求真正开始执行时计算，请求在线程池中排队的时间不计入。
+        """
+        pending = {}
+        queue = list(candidates)
+        last_error = None
+
+        def launch(started=None):
+            endpoint = queue.pop(0)
+
+            def run():
+                if started is not None:
+                    started.append(time.monotonic())
+                return self._call(endpoint, kwargs)
+
+            pending[self.executor.submit(run)] = endpoint
+            return endpoint
+
+        started = []
+        hedge_after = self.hedge_delay(launch(started))
+        hedged = False
+        while pending:
+            timeout = None
+            if not hedged and queue:
+                # 首个请求尚未开始时只等待其开始，不发送对冲请求
+                timeout = max(0.0, started[0] + hedge_after - time.monotonic()) if started else hedge_after
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if not started or time.monotonic() - started[0] < hedge_after:
+                    continue
+                # 首个请求开始执行后超过p95仍未返回，发送对冲请求
+                hedged = True
+                endpoint = launch()
+                print(f"请求超过 {hedge_after:.1f} 秒未返回，向端点 {endpoint.name} 发送对冲请求")
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    print(f"端点 {endpoint.name} 请求失败（{e.__class__.__name__}），切换到下一个端点")
+                    continue
+                # 取消未开始的请求；已发出的请求无法中断，其结果被丢弃但仍计入统计
+                for loser in pending:
+                    loser.cancel()
+                return endpoint, response
+            if not pending and queue:
+                started = []
+                hedge_after = self.hedge_delay(launch(started))
+        raise last_error
+
+    def status(self):
+        """各端点当前的统计信息"""
+        rows = []
+        for endpoint in self.endpoints:
+            stats = endpoint.stats
+            rows.append({
+                'name': endpoint.name,
+                'model': endpoint.model,
+                'healthy': self.is_healthy(endpoint),
+                'samples': stats.sample_count(),
+                'error_rate': stats.error_rate(),
+                'mean_sec': stats.mean_latency(),
+                'p95_sec': stats.percentile(95),
+            })
+        return rows
+
+    def display_status(self):
+        """打印各端点的统计信息"""
+        for row in self.status():
+            p95 = f"{row['p95_sec']:.2f}s" if row['p95_sec'] is not None else "-"
+            print(f"{'✅' if row['healthy'] else '⏸️'} {row['name']} ({row['model']}): "
+                  f"{row['samples']} 次请求，错误率 {row['error_rate']:.0%}，平均 {row['mean_sec']:.2f}s，p95 {p95}")
+
+
+def get_router_config(config):
+    """合并 config.json 中的 router 配置与默认值"""
+    router_config = dict(DEFAULT_ROUTER_CONFIG)
+    router_config.update(config.get('router', {}))
+    return router_config
+
+
+def init_model_router(config):
+    """根据配置创建模型路由，返回 (router, 默认模型名)
+
+    每个端点可单独设置 model、api_key、base_url 和 client（覆盖全局 client 配置），
+    未设置的 api_key / base_url 使用 openai 配置中的值。端点内的重试次数默认为1，失败后尽快切换端点。
+    """
+    router_config = get_router_config(config)
+    endpoints = []
+    for i, entry in enumerate(router_config['endpoints']):
+        try:
+            openai_config = dict(config.get('openai', {}))
+            openai_config.update({key: entry[key] for key in ('api_key', 'base_url') if entry.get(key)})
+            client_config = dict(config.get('client', {}), max_retries=1)
+            client_config.update(entry.get('client', {}))
+            client = init_managed_client({'openai': openai_config, 'client': client_config})
+            endpoints.append(Endpoint(entry.get('name') or f"{entry['model']}-{i}", entry['model'], client,
+                                      router_config['window']))
+        except KeyError as e:
+            raise KeyError(f"router 端点 {i} 缺少必要字段: {e}")
+    router = ModelRouter(endpoints, router_config)
+    return router, endpoints[0].model if endpoints else None
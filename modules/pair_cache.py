@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+句对评估缓存模块
+按 (原文句子, 翻译句子, 模型) 缓存每句的评估段落，重新提交时只评估修改过或新增的句子，整体评分在本地重新计算
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .chunked_evaluator import plan_evaluation_chunks, _evaluate_chunk
+from .text_utils import normalize_for_comparison, minhash_signature
+from .translation_evaluator import (
+    _pair_sentences, parse_sentence_section, renumber_sentence_sections, build_overall_section
+)
+
+PAIR_CACHE_FILENAME = '.pair_cache.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pairs (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    section TEXT NOT NULL,
+    score REAL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pair_texts (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    english_key TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    reference TEXT,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pair_texts_english ON pair_texts (english_key, model);
+"""
+
+
+def make_english_key(english):
+    """原文句子的规范化键，同一句原文（忽略加粗、大小写和标点）对应同一个键"""
+    return hashlib.sha256(normalize_for_comparison(english).encode('utf-8')).hexdigest()
+
+
+def make_pair_key(model, english, translation):
+    """句对缓存键"""
+    raw = '\0'.join([model, english.strip(), translation.strip()])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class PairCache:
+    """句子评估段落的SQLite缓存"""
+
+    def __init__(self, db_path=PAIR_CACHE_FILENAME):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def get_many(self, keys):
+        """批量读取，返回 {key: 段落文本}"""
+        keys = list(set(keys))
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, section FROM pairs WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, entries):
+        """批量写入 [(key, model, 段落文本)]"""
+        now = time.time()
+        rows, texts = [], []
+        for key, model, section in entries:
+            parsed = parse_sentence_section(section)
+            rows.append((key, model, section, parsed['score'], now))
+            if parsed['original'] and parsed['user_translation']:
+                # 同时记录原文键、翻译和MinHash签名，供预筛查找近似重复的翻译
+                signature = array('Q', minhash_signature(parsed['user_translation'])).tobytes()
+                texts.append((key, model, make_english_key(parsed['original']), parsed['user_translation'],
+                              parsed['reference'], signature))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.executemany("INSERT OR REPLACE INTO pair_texts VALUES (?, ?, ?, ?, ?, ?)", texts)
+
+    def find_by_english(self, english, model):
+        """查找同一句原文此前评估过的翻译，返回 [(key, 翻译, 标准翻译, MinHash签名)]"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, translation, reference, signature FROM pair_texts WHERE english_key = ? AND model = ?",
+                (make_english_key(english), model)
+            ).fetchall()
+        return [(key, translation, reference, tuple(array('Q', signature)))
+                for key, translation, reference, signature in rows]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pairs")
+            self._conn.execute("DELETE FROM pair_texts")
+
+    def count(self):
+        """缓存条目数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pairs").fetchone()[0]
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_pair_cache(db_path=PAIR_CACHE_FILENAME):
+    """获取（并缓存）句对缓存实例"""
+    key = str(Path(db_path).resolve())
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = PairCache(db_path)
+        return _caches[key]
+
+
+def _evaluate_pairs(client, model, pairs, token_budget, max_workers):
+    """分块评估句对，返回与 pairs 一一对应的段落列表"""
+    chunks = plan_evaluation_chunks(pairs, token_budget)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_evaluate_chunk, client, model, chunk_pairs, tokens)
+                   for chunk_pairs, tokens in chunks]
+        chunk_sections = [future.result() for future in futures]
+
+    # _evaluate_chunk 已按段落编号将结果与分块内的句对一一对应
+    return [section for sections in chunk_sections for section in sections]
+
+
+def evaluate_translation_incremental(client, model, english_sentences, user_translations, cache=None,
+                                     token_budget=2500, max_workers=4):
+    """增量评估翻译质量
+
+    已缓存的句对直接复用评估段落，只将修改过或新增的句对发送给模型（按token预算分块并行），
+    返回与 evaluate_translation_with_ai 相同格式的评估文本，整体评分由各句评分在本地计算。
+    """
+    cache = cache or get_pair_cache()
+
+    print(f"原文句数: {len(english_sentences)}")
+    print(f"翻译句数: {len(user_translations)}")
+
+    pairs = _pair_sentences(english_sentences, user_translations)
+    keys = [make_pair_key(model, eng, trans) for eng, trans in pairs]
+    cached = cache.get_many(keys)
+
+    # 相同的句对只评估一次
+    missing = {}
+    for key, pair in zip(keys, pairs):
+        if key not in cached and key not in missing:
+            missing[key] = pair
+    print(f"缓存命中 {len(pairs) - sum(1 for key in keys if key in missing)}/{len(pairs)} 句，"
+          f"需要评估 {len(missing)} 句")
+
+    if missing:
+        try:
+            new_sections = _evaluate_pairs(client, model, list(missing.values()), token_budget, max_workers)
+        except Exception as e:
+            raise Exception(f"评估翻译时出错: {e}")
+        cache.put_many([(key, model, section) for key, section in zip(missing, new_sections)])
+        cached.update(zip(missing, new_sections))
+
+    sections = [cached[key] for key in keys]
+    scores = [parse_sentence_section(section)['score'] for section in sections]
+    return renumber_sentence_sections(sections) + "\n\n" + build_overall_section(scores)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+翻译预筛模块
+评估前在本地按长度比、中文比例、与已评估翻译的近似重复（MinHash）以及与标准翻译的字符n-gram重合度预筛句对，
+能确定结果的句子直接给出评分或复用此前的评估，只把真正需要审阅的句子发送给模型
+"""
+
+import re
+
+from .pair_cache import get_pair_cache, make_pair_key, _evaluate_pairs
+from .structured_evaluation import SentenceEvaluation, MISSING_FIELD
+from .text_utils import cjk_ratio, normalize_for_comparison, ngram_overlap, minhash_signature, minhash_similarity
+from .translation_evaluator import (
+    _pair_sentences, renumber_sentence_sections, build_overall_section, parse_sentence_section,
+    MISSING_ENGLISH, MISSING_TRANSLATION
+)
+
+MIN_CJK_RATIO = 0.2          # 中文字符比例低于该值视为未翻译（例如直接复制原文）
+MIN_LENGTH_RATIO = 0.3       # 中文字符数 / 英文单词数 低于该值视为明显未译完
+MIN_WORDS_FOR_LENGTH = 6     # 原文至少有这么多单词时才检查长度比
+NEAR_DUPLICATE = 0.9         # MinHash相似度不低于该值时复用已有评估
+REFERENCE_MATCH = 0.9        # 与标准翻译的字符二元组Dice系数不低于该值时视为与标准翻译一致
+
+# 预筛结果类别
+CACHED = 'cached'
+NEAR_DUPLICATE_REUSED = 'near_duplicate'
+RULE = 'rule'
+REVIEW = 'review'
+
+USER_TRANSLATION_LINE = re.compile(r'(\*\*用户翻译\*\*:[ \t]*)[^\n]*?([ \t]*)$', re.MULTILINE)
+
+
+def _rule_section(eng, trans, score, comment, reference=None):
+    """按规则给出的评估段落（编号稍后统一重排）"""
+    return SentenceEvaluation(1, eng, trans, reference or MISSING_FIELD, MISSING_FIELD, score, comment).to_markdown()
+
+
+def check_pair_rules(eng, trans):
+    """按长度比和中文比例检查单个句对，能直接判定时返回 (评分, 评价)，否则返回None"""
+    if eng == MISSING_ENGLISH:
+        return None, "没有对应的英文原文，未评分。"
+    if trans == MISSING_TRANSLATION or not normalize_for_comparison(trans):
+        return 1, "未翻译该句。"
+    if normalize_for_comparison(trans) == normalize_for_comparison(eng) or cjk_ratio(trans) < MIN_CJK_RATIO:
+        return 1, "译文中几乎没有中文，可能直接复制了原文或尚未翻译。"
+
+    words = len(re.findall(r"[A-Za-z']+", eng))
+    cjk_chars = cjk_ratio(trans) * len(re.sub(r'\s', '', trans))
+    if words >= MIN_WORDS_FOR_LENGTH and cjk_chars < words * MIN_LENGTH_RATIO:
+        return 2, "译文明显短于原文，可能只翻译了一部分，请补全后重新提交。"
+    return None
+
+
+def _reuse_section(section, trans):
+    """复用相近翻译的评估段落，用户翻译替换为当前翻译"""
+    section = USER_TRANSLATION_LINE.sub(lambda m: m.group(1) + trans + m.group(2), section, count=1)
+    return section.rstrip() + "（与此前评估过的相近翻译一致，复用其评估结果）"
+
+
+def prescreen_pairs(pairs, model, cache=None):
+    """预筛句对，返回与 pairs 一一对应的 (类别, 评估段落)，类别为 REVIEW 的句对段落为None"""
+    cache = cache or get_pair_cache()
+    keys = [make_pair_key(model, eng, trans) for eng, trans in pairs]
+    cached = cache.get_many(keys)
+
+    decisions = []
+    for key, (eng, trans) in zip(keys, pairs):
+        if key in cached:
+            decisions.append((CACHED, cached[key]))
+            continue
+
+        rule = check_pair_rules(eng, trans)
+        if rule:
+            decisions.append((RULE, _rule_section(eng, trans, *rule)))
+            continue
+
+        candidates = cache.find_by_english(eng, model)
+        signature = minhash_signature(trans) if candidates else None
+        best = max(candidates, key=lambda c: minhash_similarity(signature, c[3]), default=None)
+        if best and minhash_similarity(signature, best[3]) >= NEAR_DUPLICATE:
+            section = cache.get_many([best[0]]).get(best[0])
+            if section:
+                decisions.append((NEAR_DUPLICATE_REUSED, _reuse_section(section, trans)))
+                continue
+
+        references = {reference for _, _, reference, _ in candidates if reference}
+        reference = max(references, key=lambda r: ngram_overlap(trans, r), default=None)
+        if reference and ngram_overlap(trans, reference) >= REFERENCE_MATCH:
+            decisions.append((RULE, _rule_section(eng, trans, 10, "与标准翻译基本一致。", reference)))
+            continue
+
+        decisions.append((REVIEW, None))
+    return decisions
+
+
+def evaluate_translation_prescreened(client, model, english_sentences, user_translations, cache=None,
+                                     token_budget=2500, max_workers=4):
+    """先本地预筛再评估翻译质量
+
+    缓存命中、近似重复和规则可判定的句子不调用模型，其余句子分块并行评估并写入句对缓存，
+    返回与 evaluate_translation_with_ai 相同格式的评估文本，整体评分由各句评分在本地计算。
+    """
+    cache = cache or get_pair_cache()
+
+    print(f"原文句数: {len(english_sentences)}")
+    print(f"翻译句数: {len(user_translations)}")
+
+    pairs = _pair_sentences(english_sentences, user_translations)
+    decisions = prescreen_pairs(pairs, model, cache)
+
+    # 相同的句对只评估一次
+    review = {}
+    for (eng, trans), (kind, _) in zip(pairs, decisions):
+        if kind == REVIEW:
+            review.setdefault(make_pair_key(model, eng, trans), (eng, trans))
+
+    counts = {kind: sum(1 for k, _ in decisions if k == kind)
+              for kind in (CACHED, NEAR_DUPLICATE_REUSED, RULE, REVIEW)}
+    print(f"预筛: 缓存命中 {counts[CACHED]} 句，近似重复 {counts[NEAR_DUPLICATE_REUSED]} 句，"
+          f"规则评分 {counts[RULE]} 句，需要模型评估 {len(review)} 句")
+
+    reviewed = {}
+    if review:
+        try:
+            new_sections = _evaluate_pairs(client, model, list(review.values()), token_budget, max_workers)
+        except Exception as e:
+            raise Exception(f"评估翻译时出错: {e}")
+        cache.put_many([(key, model, section) for key, section in zip(review, new_sections)])
+        reviewed = dict(zip(review, new_sections))
+
+    sections = [section if kind != REVIEW else reviewed[make_pair_key(model, eng, trans)]
+                for (eng, trans), (kind, section) in zip(pairs, decisions)]
+    scores = [parse_sentence_section(section)['score'] for section in sections]
+    return renumber_sentence_sections(sections) + "\n\n" + build_overall_section(scores)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+提示词模板模块
+带版本号的提示词模板：系统提示、评分标准和输出格式组成逐字节不变的静态前缀，每次请求的数据只追加在最后，便于服务端复用提示词前缀缓存
+"""
+
+
+class PromptTemplate:
+    """静态前缀放在系统消息中，变量数据作为用户消息追加在后面
+
+    修改 system 文本时必须同时提升 version，以便在指标中区分不同版本的提示词。
+    """
+
+    def __init__(self, name, version, system):
+        self.name = name
+        self.version = version
+        self.system = system
+        _TEMPLATES_BY_SYSTEM[system] = self
+
+    @property
+    def id(self):
+        return f"{self.name}@v{self.version}"
+
+    def build_messages(self, data):
+        """构建消息列表：静态前缀 + 变量数据"""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": data}
+        ]
+
+
+_TEMPLATES_BY_SYSTEM = {}
+
+
+def template_id_for_messages(messages):
+    """根据请求消息识别所用模板，返回模板ID（非模板请求返回None）"""
+    if messages and messages[0].get('role') == 'system':
+        template = _TEMPLATES_BY_SYSTEM.get(messages[0].get('content'))
+        return template.id if template else None
+    return None
+
+
+EVALUATION_TEMPLATE = PromptTemplate('evaluate', 2, """你是一位资深的英语翻译评估专家，具有丰富的翻译教学经验。请客观公正地评估翻译质量，并提供有建设性的改进建议。输出时请严格使用markdown格式对重点内容进行强调。
+
+用户会给出若干编号的英中句对，请严格按照以下格式对每个句子进行评估，并在重点内容使用markdown格式强调：
+
+## **SENTENCE 1**
+
+**原文**: [英文原文]
+**用户翻译**: [用户的中文翻译]
+**标准翻译**: [您认为的标准中文翻译]
+***流畅翻译***: [更加流畅自然的中文翻译]
+**评分**: [1-10分的评分]
+**评价**: [详细的评价和改进建议，包括***词汇***、~~语法~~、*流畅度*等方面]
+
+## **SENTENCE 2**
+
+[继续同样格式...]
+
+除非用户说明不需要，最后请提供整体评估：
+
+## **整体评估**
+
+**整体评分**: [1-10分]
+**总体评价**: [整体翻译质量的综合评价]
+***主要优点***: [列出翻译的主要优点]
+~~主要问题~~: [列出需要改进的主要问题]
+***改进建议***: [具体的改进建议]
+
+**评分标准**：
+- **9-10分**：翻译准确，语言流畅，完全符合中文表达习惯
+- **7-8分**：翻译基本准确，语言较流畅，有轻微不当之处
+- **5-6分**：翻译大意正确，但有明显的词汇或语法问题
+- **3-4分**：翻译部分正确，存在较多错误
+- **1-2分**：翻译错误较多，严重影响理解
+
+请确保使用markdown格式对重点内容进行强调：**粗体**、***斜体加粗***、~~删除线~~、*斜体*。""")
+
+STRUCTURED_EVALUATION_TEMPLATE = PromptTemplate('evaluate_structured', 1, """你是一位资深的英语翻译评估专家，请客观公正地评估翻译质量，并提供有建设性的改进建议。
+
+用户会给出若干编号的英中句对，请逐句评估。
+每句给出 index（句子编号）、reference（标准翻译）、fluent（更流畅自然的翻译）、score（1-10分）和 comment（评价与改进建议，可用markdown强调重点）。
+评分标准：9-10 准确流畅；7-8 基本准确、略有不当；5-6 大意正确但有明显问题；3-4 部分正确；1-2 错误较多。""")
+
+ARTICLE_TEMPLATE = PromptTemplate('generate', 2, """You are an expert English teacher. Create educational articles that naturally incorporate the specified vocabulary words with bold formatting. Follow the exact format requested.
+
+The user will give the number of articles, the target words, topic, genre, difficulty and the minimum number of occurrences per word.
+
+Requirements:
+1. Across ALL articles, each target word must appear at least the given minimum number of times in total
+2. Write in clear, educational English
+3. Make the target words BOLD using **word** format in the content
+4. Ensure incorporating all target words
+
+Output format (VERY IMPORTANT):
+Please use this EXACT format for each article:
+
+=== ARTICLE 1 ===
+Title: [Article title here]
+Abstract: [Brief summary in 30-50 words]
+---
+[Article content here with **target words** in bold]
+=== END ARTICLE 1 ===
+
+=== ARTICLE 2 ===
+Title: [Article title here]
+Abstract: [Brief summary in 30-50 words]
+---
+[Article content here with **target words** in bold]
+=== END ARTICLE 2 ===
+
+Make sure to use **bold** formatting for all target words when they appear in the content.""")
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+评分分析模块
+将评估报告解析为按列存储的NumPy数组（缓存为 .npz，按修改时间增量刷新），提供按文章/单词列表/翻译文件的均值与分位数、
+最弱目标单词和评分时间序列等向量化统计
+"""
+
+import json
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .atomic_store import get_store
+from .catalog import get_catalog
+from .translation_evaluator import split_evaluation_sections, parse_sentence_section, SENTENCE_HEADER_PATTERN
+
+ANALYTICS_FILENAME = '.score_analytics.npz'
+ANALYTICS_VERSION = 1
+DIMENSIONS = ('article', 'word_list', 'translation')
+
+BOLD_WORD_PATTERN = re.compile(r'\*\*([^*]+?)\*\*')
+EVALUATED_AT_PATTERN = re.compile(r'\*\*评估时间\*\*:\s*(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+REPORT_TITLE_PATTERN = re.compile(r'\*\*原文章标题\*\*:\s*(.*)')
+REPORT_TRANSLATION_PATTERN = re.compile(r'\*\*翻译文件\*\*:\s*(.*)')
+
+# 报告级数组、句子级数组、单词级数组和字典数组
+REPORT_COLUMNS = ('report_names', 'report_mtime_ns', 'report_size', 'report_time',
+                  'report_article', 'report_word_list', 'report_translation')
+SENTENCE_COLUMNS = ('sentence_report', 'sentence_score')
+WORD_COLUMNS = ('word_sentence', 'word_code')
+DICTIONARIES = ('article', 'word_list', 'translation', 'vocab')
+
+
+def parse_report(path):
+    """解析单个报告，返回元数据、各句评分和各句加粗的目标单词；存在JSON副本时直接读取副本"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    header = content[:1000]
+    title_match = REPORT_TITLE_PATTERN.search(header)
+    translation_match = REPORT_TRANSLATION_PATTERN.search(header)
+    time_match = EVALUATED_AT_PATTERN.search(header)
+    evaluated_at = time.mktime(time.strptime(time_match.group(1), '%Y-%m-%d %H:%M:%S')) if time_match else None
+
+    sidecar = Path(path).with_suffix('.json')
+    if sidecar.exists():
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        fields = data['fields']
+        rows = [(row[fields.index('score')], row[fields.index('original')]) for row in data['sentences']]
+    else:
+        rows = []
+        for section in split_evaluation_sections(content):
+            if SENTENCE_HEADER_PATTERN.match(section):
+                parsed = parse_sentence_section(section)
+                rows.append((parsed['score'], parsed['original'] or ''))
+
+    return {
+        'article_title': title_match.group(1).strip() if title_match else '',
+        'translation': translation_match.group(1).strip() if translation_match else '',
+        'evaluated_at': evaluated_at,
+        'scores': [score for score, _ in rows],
+        'words': [[word.strip().lower() for word in BOLD_WORD_PATTERN.findall(original or '')]
+                  for _, original in rows],
+    }
+
+
+def _empty_columns():
+    columns = {name: np.zeros(0, dtype=np.int64) for name in REPORT_COLUMNS + SENTENCE_COLUMNS + WORD_COLUMNS}
+    columns['report_names'] = np.zeros(0, dtype=str)
+    columns['report_time'] = np.zeros(0, dtype=np.float64)
+    columns['sentence_score'] = np.zeros(0, dtype=np.float32)
+    for name in ('report_article', 'report_word_list', 'report_translation', 'sentence_report',
+                 'word_sentence', 'word_code'):
+        columns[name] = np.zeros(0, dtype=np.int32)
+    for name in DICTIONARIES:
+        columns[f"dict_{name}"] = np.zeros(0, dtype=str)
+    return columns
+
+
+def _group_percentiles(codes, values, group_count, qs):
+    """按组计算分位数（线性插值），codes 与 values 等长，返回形状为 (len(qs), group_count) 的数组"""
+    order = np.lexsort((values, codes))
+    sorted_codes, sorted_values = codes[order], values[order]
+    starts = np.searchsorted(sorted_codes, np.arange(group_count), 'left')
+    counts = np.searchsorted(sorted_codes, np.arange(group_count), 'right') - starts
+    result = np.full((len(qs), group_count), np.nan)
+    has = counts > 0
+    for row, q in enumerate(qs):
+        position = starts[has] + (counts[has] - 1) * q / 100
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, starts[has] + counts[has] - 1)
+        fraction = position - lower
+        result[row, has] = sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+    return result
+
+
+class ScoreAnalytics:
+    """评估报告评分的列式存储与向量化查询"""
+
+    def __init__(self, results_dir='translation_results', articles_dir='articles', cache_path=None):
+        self.results_dir = Path(results_dir)
+        self.articles_dir = Path(articles_dir)
+        self.cache_path = Path(cache_path) if cache_path else self.results_dir / ANALYTICS_FILENAME
+        self.columns = self._load()
+
+    def _load(self):
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if int(data['version']) == ANALYTICS_VERSION:
+                    return {name: data[name] for name in data.files if name != 'version'}
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            pass
+        return _empty_columns()
+
+    def _save(self):
+        with get_store().open(self.cache_path, 'wb', encoding=None) as f:
+            np.savez(f, version=ANALYTICS_VERSION, **self.columns)
+
+    def refresh(self):
+        """增量刷新：只解析新增或修改过的报告，删除已不存在的报告，返回重新解析的报告数"""
+        current = {}
+        if self.results_dir.exists():
+            for path in self.results_dir.glob('*.md'):
+                if not path.name.startswith('.'):
+                    stat = path.stat()
+                    current[path.name] = (stat.st_mtime_ns, stat.st_size)
+
+        c = self.columns
+        names = c['report_names'].tolist()
+        keep_reports = np.array([current.get(name) == (int(mtime), int(size))
+                                 for name, mtime, size in zip(names, c['report_mtime_ns'], c['report_size'])],
+                                dtype=bool)
+        kept_names = {name for name, keep in zip(names, keep_reports) if keep}
+        changed = sorted(name for name in current if name not in kept_names)
+        if not changed and keep_reports.all():
+            return 0
+
+        # 保留未变化的行，重新映射下标
+        report_remap = np.cumsum(keep_reports) - 1
+        keep_sentences = keep_reports[c['sentence_report']]
+        sentence_remap = np.cumsum(keep_sentences) - 1
+        keep_words = keep_sentences[c['word_sentence']]
+        columns = {name: c[name][keep_reports] for name in REPORT_COLUMNS}
+        columns['sentence_report'] = report_remap[c['sentence_report'][keep_sentences]].astype(np.int32)
+        columns['sentence_score'] = c['sentence_score'][keep_sentences]
+        columns['word_sentence'] = sentence_remap[c['word_sentence'][keep_words]].astype(np.int32)
+        columns['word_code'] = c['word_code'][keep_words]
+
+        dictionaries = {name: c[f"dict_{name}"].tolist() for name in DICTIONARIES}
+        lookups = {name: {value: i for i, value in enumerate(values)} for name, values in dictionaries.items()}
+
+        def code(name, value):
+            value = value or ''
+            if value not in lookups[name]:
+                lookups[name][value] = len(dictionaries[name])
+                dictionaries[name].append(value)
+            return lookups[name][value]
+
+        word_lists = get_catalog().get_article_word_lists(self.articles_dir) if changed else {}
+        new = {name: [] for name in REPORT_COLUMNS + SENTENCE_COLUMNS + WORD_COLUMNS}
+        report_offset = len(columns['report_names'])
+        sentence_offset = len(columns['sentence_score'])
+        for name in changed:
+            path = self.results_dir / name
+            try:
+                report = parse_report(path)
+            except Exception as e:
+                print(f"解析报告 {name} 时出错: {e}")
+                continue
+            report_index = report_offset + len(new['report_names'])
+            mtime_ns, size = current[name]
+            new['report_names'].append(name)
+            new['report_mtime_ns'].append(mtime_ns)
+            new['report_size'].append(size)
+            new['report_time'].append(report['evaluated_at'] or mtime_ns / 1e9)
+            new['report_article'].append(code('article', report['article_title']))
+            new['report_word_list'].append(code('word_list', word_lists.get(report['article_title'])))
+            new['report_translation'].append(code('translation', report['translation']))
+            for score, words in zip(report['scores'], report['words']):
+                sentence_index = sentence_offset + len(new['sentence_score'])
+                new['sentence_report'].append(report_index)
+                new['sentence_score'].append(np.nan if score is None else score)
+                for word in words:
+                    new['word_sentence'].append(sentence_index)
+                    new['word_code'].append(code('vocab', word))
+
+        for name, values in new.items():
+            if values:
+                columns[name] = np.concatenate([columns[name], np.asarray(values, dtype=columns[name].dtype
+                                                                          if name != 'report_names' else str)])
+        for name, values in dictionaries.items():
+            columns[f"dict_{name}"] = np.asarray(values, dtype=str)
+
+        self.columns = columns
+        self._save()
+        print(f"评分分析已更新: 重新解析 {len(changed)} 个报告，共 {len(columns['report_names'])} 个报告、"
+              f"{len(columns['sentence_score'])} 句")
+        return len(changed)
+
+    def summary_by(self, dimension='article', percentiles=(10, 50, 90)):
+        """按文章 / 单词列表 / 翻译文件分组统计句子评分的数量、均值和分位数，按均值从低到高排序"""
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"未知的分组维度: {dimension}，可选: {', '.join(DIMENSIONS)}")
+        c = self.columns
+        labels = c[f"dict_{dimension}"]
+        scores = c['sentence_score'].astype(np.float64)
+        valid = ~np.isnan(scores)
+        codes = c[f"report_{dimension}"][c['sentence_report']][valid]
+        scores = scores[valid]
+
+        counts = np.bincount(codes, minlength=len(labels))
+        sums = np.bincount(codes, weights=scores, minlength=len(labels))
+        quantiles = _group_percentiles(codes, scores, len(labels), percentiles)
+        groups = np.flatnonzero(counts)
+        means = sums[groups] / counts[groups]
+        order = groups[np.argsort(means, kind='stable')]
+
+        return [dict({'key': str(labels[g]), 'count': int(counts[g]), 'mean': float(sums[g] / counts[g])},
+                     **{f"p{q}": float(quantiles[row, g]) for row, q in enumerate(percentiles)})
+                for g in order]
+
+    def weakest_words(self, top=10, min_count=2):
+        """平均评分最低的加粗目标单词（至少出现在 min_count 个已评分句子中）"""
+        c = self.columns
+        vocab = c['dict_vocab']
+        scores = c['sentence_score'][c['word_sentence']].astype(np.float64)
+        valid = ~np.isnan(scores)
+        codes = c['word_code'][valid]
+        counts = np.bincount(codes, minlength=len(vocab))
+        sums = np.bincount(codes, weights=scores[valid], minlength=len(vocab))
+        candidates = np.flatnonzero(counts >= min_count)
+        means = sums[candidates] / counts[candidates]
+        order = candidates[np.argsort(means, kind='stable')][:top]
+        return [{'word': str(vocab[w]), 'count': int(counts[w]), 'mean': float(sums[w] / counts[w])} for w in order]
+
+    def score_over_time(self, period='day', dimension=None, key=None):
+        """按天或周统计平均评分的时间序列，可用 dimension + key 筛选某篇文章/单词列表/翻译文件"""
+        seconds = {'day': 86400, 'week': 7 * 86400}[period]
+        c = self.columns
+        report_index = c['sentence_report']
+        scores = c['sentence_score'].astype(np.float64)
+        mask = ~np.isnan(scores)
+        if dimension:
+            labels = c[f"dict_{dimension}"].tolist()
+            if key not in labels:
+                return []
+            mask &= c[f"report_{dimension}"][report_index] == labels.index(key)
+
+        # 按本地时间划分日期
+        offset = time.localtime().tm_gmtoff
+        buckets = ((c['report_time'][report_index[mask]] + offset) // seconds).astype(np.int64)
+        unique, inverse = np.unique(buckets, return_inverse=True)
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=scores[mask])
+        return [{'period': time.strftime('%Y-%m-%d', time.gmtime(bucket * seconds)),
+                 'count': int(count), 'mean': float(total / count)}
+                for bucket, count, total in zip(unique, counts, sums)]
+
+
+def get_score_analytics(results_dir='translation_results', articles_dir='articles'):
+    """创建分析实例并增量刷新"""
+    analytics = ScoreAnalytics(results_dir, articles_dir)
+    analytics.refresh()
+    return analytics
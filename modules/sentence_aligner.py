@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+句子对齐模块
+在调用API之前，使用Gale-Church风格的长度比动态规划将英文句子与翻译行对齐
+"""
+
+from collections import namedtuple
+from math import erfc, log, sqrt
+
+AlignedPair = namedtuple('AlignedPair', ['english', 'translation', 'confidence',
+                                         'english_indices', 'translation_indices'])
+
+# (英文句数, 翻译行数) -> 先验概率，以Gale-Church论文为基础调整：
+# 学生漏译句子比平行语料中的删除常见得多（_pair_sentences 为此保留了 MISSING_TRANSLATION），
+# 因此 1:0 / 0:1 从 0.0099 提高到 0.045，1:2 / 2:1 从 0.089 降到 0.03，
+# 否则漏译的句子多被并入相邻句子的 2:1 匹配或整体错位（见 benchmarks/bench_alignment.py）
+BEAD_PRIORS = {
+    (1, 1): 0.85,
+    (1, 2): 0.03,
+    (2, 1): 0.03,
+    (1, 0): 0.045,
+    (0, 1): 0.045,
+}
+BEAD_COSTS = {bead: -log(prior) for bead, prior in BEAD_PRIORS.items()}
+
+# 每字符长度差的方差系数（Gale-Church 原文为6.8，这里按中英句对数据调小），会按文档长度比的平方缩放
+BASE_VARIANCE = 3.0
+MIN_BAND = 4
+MAX_MATCH_COST = -log(1e-12)
+INV_SQRT2 = 1 / sqrt(2)
+
+
+def _text_length(text):
+    """计算文本长度（按字符计，不计空格）"""
+    return len(text) - text.count(' ')
+
+
+def _match_cost(english_length, translation_length, ratio, variance):
+    """计算一组句子匹配的代价（-log概率）和置信度"""
+    mean = (english_length + translation_length / ratio) / 2
+    if mean <= 0:
+        return 0.0, 1.0
+    delta = (translation_length - english_length * ratio) / sqrt(mean * variance)
+    probability = erfc(abs(delta) / sqrt(2))
+    return -log(max(probability, 1e-12)), probability
+
+
+def align_sentences(english_sentences, translations, band=None):
+    """对齐英文句子与翻译行
+
+    允许 1:1、1:2、2:1、1:0 和 0:1 匹配，返回 AlignedPair 列表：
+    english / translation 为合并后的文本（缺失一侧为空字符串），confidence 为0-1之间的置信度，
+    english_indices / translation_indices 为对应的原始下标。
+    """
+    n, m = len(english_sentences), len(translations)
+    if n == 0 or m == 0:
+        return ([AlignedPair(e, '', 0.0, (i,), ()) for i, e in enumerate(english_sentences)] +
+                [AlignedPair('', t, 0.0, (), (j,)) for j, t in enumerate(translations)])
+
+    english_prefix = [0]
+    for sentence in english_sentences:
+        english_prefix.append(english_prefix[-1] + _text_length(sentence))
+    translation_prefix = [0]
+    for translation in translations:
+        translation_prefix.append(translation_prefix[-1] + _text_length(translation))
+    ratio = max(translation_prefix[-1], 1) / max(english_prefix[-1], 1)
+    variance = BASE_VARIANCE * ratio * ratio
+
+    # 只在对角线附近的带状区域内搜索
+    if band is None:
+        band = max(MIN_BAND, abs(n - m) + 3)
+    slope = m / n
+
+    inf = float('inf')
+    cost = [[inf] * (m + 1) for _ in range(n + 1)]
+    back = [[None] * (m + 1) for _ in range(n + 1)]
+    cost[0][0] = 0.0
+    beads = [(di, dj, prior_cost) for (di, dj), prior_cost in BEAD_COSTS.items()]
+
+    for i in range(n + 1):
+        center = i * slope
+        j_start = max(0, int(center - band))
+        j_end = min(m, int(center + band) + 1)
+        row = cost[i]
+        back_row = back[i]
+        for j in range(j_start, j_end + 1):
+            if i == 0 and j == 0:
+                continue
+            best, best_move = inf, None
+            for di, dj, prior_cost in beads:
+                pi, pj = i - di, j - dj
+                if pi < 0 or pj < 0:
+                    continue
+                previous = cost[pi][pj]
+                if previous == inf:
+                    continue
+                if not (di and dj):
+                    # 漏译或多出的行只计先验代价，长度差无意义
+                    total = previous + prior_cost
+                    if total < best:
+                        best, best_move = total, (di, dj)
+                    continue
+                # 内联 _match_cost 以减少函数调用开销
+                english_length = english_prefix[i] - english_prefix[pi]
+                translation_length = translation_prefix[j] - translation_prefix[pj]
+                mean = (english_length + translation_length / ratio) / 2
+                delta = abs(translation_length - english_length * ratio) / sqrt(mean * variance) if mean else 0.0
+                probability = erfc(delta * INV_SQRT2)
+                total = previous + prior_cost + (-log(probability) if probability > 1e-12 else MAX_MATCH_COST)
+                if total < best:
+                    best, best_move = total, (di, dj)
+            row[j] = best
+            back_row[j] = best_move
+
+    if back[n][m] is None:
+        # 带宽不足时退回到全量搜索
+        return align_sentences(english_sentences, translations, band=max(n, m))
+
+    pairs = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        di, dj = back[i][j]
+        english_indices = tuple(range(i - di, i))
+        translation_indices = tuple(range(j - dj, j))
+        if di and dj:
+            _, confidence = _match_cost(english_prefix[i] - english_prefix[i - di],
+                                        translation_prefix[j] - translation_prefix[j - dj],
+                                        ratio, variance)
+        else:
+            confidence = 0.0
+        pairs.append(AlignedPair(
+            '. '.join(english_sentences[k] for k in english_indices),
+            ''.join(translations[k] for k in translation_indices),
+            confidence, english_indices, translation_indices
+        ))
+        i, j = i - di, j - dj
+
+    pairs.reverse()
+    return pairs
+
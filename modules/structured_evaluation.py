@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+结构化评估模块
+使用JSON Schema结构化输出请求逐句评估，解析为紧凑的 __slots__ 记录，再由记录渲染markdown报告并保存JSON副本
+"""
+
+import json
+from pathlib import Path
+
+from .atomic_store import get_store
+from .metrics import get_metrics_recorder, timed_completion, STAGE_PROMPT_BUILD, STAGE_PARSE
+from .prompt_templates import STRUCTURED_EVALUATION_TEMPLATE
+from .translation_evaluator import (
+    _pair_sentences, build_overall_section, generate_evaluation_report
+)
+
+EVALUATION_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'sentences': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'index': {'type': 'integer'},
+                    'reference': {'type': 'string'},
+                    'fluent': {'type': 'string'},
+                    'score': {'type': 'number'},
+                    'comment': {'type': 'string'},
+                },
+                'required': ['index', 'reference', 'fluent', 'score', 'comment'],
+                'additionalProperties': False,
+            },
+        },
+    },
+    'required': ['sentences'],
+    'additionalProperties': False,
+}
+
+MISSING_FIELD = "（无）"
+MISSING_COMMENT = "（模型未返回该句的评估）"
+
+RESPONSE_FORMAT = {
+    'type': 'json_schema',
+    'json_schema': {'name': 'translation_evaluation', 'strict': True, 'schema': EVALUATION_SCHEMA},
+}
+
+
+class SentenceEvaluation:
+    """单句评估记录"""
+
+    __slots__ = ('number', 'original', 'user_translation', 'reference', 'fluent', 'score', 'comment')
+
+    def __init__(self, number, original, user_translation, reference, fluent, score, comment):
+        self.number = number
+        self.original = original
+        self.user_translation = user_translation
+        self.reference = reference
+        self.fluent = fluent
+        self.score = score
+        self.comment = comment
+
+    def to_markdown(self):
+        """渲染为与AI报告相同格式的 ## **SENTENCE N** 段落"""
+        score = f"{self.score:g}" if self.score is not None else "无"
+        return (f"## **SENTENCE {self.number}**\n\n"
+                f"**原文**: {self.original}  \n"
+                f"**用户翻译**: {self.user_translation}  \n"
+                f"**标准翻译**: {self.reference}  \n"
+                f"***流畅翻译***: {self.fluent}  \n"
+                f"**评分**: {score}  \n"
+                f"**评价**: {self.comment}")
+
+    def to_list(self):
+        return [self.number, self.original, self.user_translation, self.reference, self.fluent,
+                self.score, self.comment]
+
+
+class EvaluationResult:
+    """一次翻译评估的全部句子记录"""
+
+    __slots__ = ('sentences',)
+
+    def __init__(self, sentences):
+        self.sentences = sentences
+
+    def scores(self):
+        """各句评分"""
+        return [sentence.score for sentence in self.sentences]
+
+    def average(self):
+        """平均分（没有评分时为None）"""
+        values = [score for score in self.scores() if score is not None]
+        return sum(values) / len(values) if values else None
+
+    def to_markdown(self):
+        """渲染为评估文本，可直接传给 generate_evaluation_report"""
+        sections = [sentence.to_markdown() for sentence in self.sentences]
+        return "\n\n".join(sections + [build_overall_section(self.scores())])
+
+    def to_json(self):
+        """紧凑的JSON表示：字段名只保存一次，每句为一个数组"""
+        return {'fields': list(SentenceEvaluation.__slots__),
+                'sentences': [sentence.to_list() for sentence in self.sentences]}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls([SentenceEvaluation(*row) for row in data['sentences']])
+
+
+def build_structured_evaluation_request(model, pairs, max_tokens=4000):
+    """构建结构化输出的评估请求，输出格式由JSON Schema约束，提示词中不再需要格式示例"""
+    evaluation_pairs = []
+    for i, (eng, trans) in enumerate(pairs, 1):
+        evaluation_pairs.append(f"""句子 {i}:
+英文原文: {eng}
+用户翻译: {trans}
+""")
+
+    return {
+        'model': model,
+        'messages': STRUCTURED_EVALUATION_TEMPLATE.build_messages("\n".join(evaluation_pairs)),
+        'max_tokens': max_tokens,
+        'temperature': 0.3,
+        'response_format': RESPONSE_FORMAT
+    }
+
+
+def parse_structured_evaluation(content, pairs):
+    """解析结构化输出，按编号与句对合并为记录；模型漏掉的句子评分为None"""
+    try:
+        items = json.loads(content)['sentences']
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise Exception(f"解析结构化评估结果出错: {e}")
+
+    by_index = {item.get('index'): item for item in items if isinstance(item, dict)}
+    sentences = []
+    for number, (eng, trans) in enumerate(pairs, 1):
+        item = by_index.get(number, {})
+        sentences.append(SentenceEvaluation(
+            number, eng, trans,
+            item.get('reference', MISSING_FIELD), item.get('fluent', MISSING_FIELD),
+            item.get('score'), item.get('comment', MISSING_COMMENT)
+        ))
+    return EvaluationResult(sentences)
+
+
+def evaluate_translation_structured(client, model, english_sentences, user_translations):
+    """使用结构化输出评估翻译质量，返回 EvaluationResult"""
+
+    print(f"原文句数: {len(english_sentences)}")
+    print(f"翻译句数: {len(user_translations)}")
+
+    with get_metrics_recorder().stage('evaluate', STAGE_PROMPT_BUILD, structured=True):
+        pairs = _pair_sentences(english_sentences, user_translations)
+        request = build_structured_evaluation_request(model, pairs)
+
+    try:
+        response = timed_completion(client, 'evaluate', request, sentences=len(pairs), structured=True)
+    except Exception as e:
+        raise Exception(f"评估翻译时出错: {e}")
+
+    with get_metrics_recorder().stage('evaluate', STAGE_PARSE, structured=True):
+        return parse_structured_evaluation(response.choices[0].message.content, pairs)
+
+
+def sidecar_path_for(report_path):
+    """报告对应的JSON副本路径"""
+    return Path(report_path).with_suffix('.json')
+
+
+def generate_structured_report(result, article_title, translation_filename, model,
+                               results_dir='translation_results'):
+    """由记录渲染markdown报告并保存，同时保存同名的JSON副本，返回 (report_path, report_content)"""
+    report_path, report_content = generate_evaluation_report(
+        result.to_markdown(), article_title, translation_filename, model, results_dir
+    )
+    sidecar = dict(result.to_json(), article_title=article_title,
+                   translation_filename=translation_filename, model=model, average=result.average())
+    get_store().write_text(sidecar_path_for(report_path), json.dumps(sidecar, ensure_ascii=False))
+    return report_path, report_content
+
+
+def load_report_scores(results_dir='translation_results'):
+    """读取全部报告JSON副本中的评分，返回 {报告文件名: [各句评分]}，无需解析markdown"""
+    scores = {}
+    for path in sorted(Path(results_dir).glob('*.json')):
+        if path.name.startswith('.'):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            score_index = data['fields'].index('score')
+            scores[path.with_suffix('.md').name] = [row[score_index] for row in data['sentences']]
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            print(f"读取 {path.name} 时出错: {e}")
+    return scores
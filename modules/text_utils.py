@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+文本工具模块
+提供token数量估算、中文比例、字符n-gram重合度和MinHash近似重复检测等通用文本处理函数
+"""
+
+import hashlib
+import re
+
+CJK_PATTERN = re.compile(r'[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    """粗略估算文本的token数量：中文字符约1个token，其他字符约4个字符1个token"""
+    if not text:
+        return 0
+    cjk_count = len(CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + (other_count + 3) // 4
+
+
+def cjk_ratio(text):
+    """中文字符占非空白字符的比例"""
+    chars = re.sub(r'\s', '', text or '')
+    if not chars:
+        return 0.0
+    return len(CJK_PATTERN.findall(chars)) / len(chars)
+
+
+def normalize_for_comparison(text):
+    """去掉markdown加粗、空白和标点并转为小写，用于比较两段文本是否相同"""
+    return re.sub(r'[\W_]+', '', (text or '').replace('**', '')).lower()
+
+
+def char_ngrams(text, n=2):
+    """文本（规范化后）的字符n-gram集合"""
+    text = normalize_for_comparison(text)
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def ngram_overlap(a, b, n=2):
+    """两段文本字符n-gram的Dice系数（0-1）"""
+    grams_a, grams_b = char_ngrams(a, n), char_ngrams(b, n)
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+MINHASH_PERMUTATIONS = 64
+_MINHASH_PRIME = (1 << 61) - 1
+_MINHASH_PARAMS = [((i * 0x9E3779B97F4A7C15 + 1) % _MINHASH_PRIME or 1, (i * 0xBF58476D1CE4E5B9) % _MINHASH_PRIME)
+                   for i in range(1, MINHASH_PERMUTATIONS + 1)]
+
+
+def minhash_signature(text, n=2):
+    """字符n-gram的MinHash签名（长度为 MINHASH_PERMUTATIONS 的整数元组），结果在不同进程间一致"""
+    hashes = [int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'little')
+              for gram in char_ngrams(text, n)]
+    if not hashes:
+        return (0,) * MINHASH_PERMUTATIONS
+    return tuple(min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in _MINHASH_PARAMS)
+
+
+def minhash_similarity(signature_a, signature_b):
+    """由两个MinHash签名估算Jaccard相似度"""
+    return sum(x == y for x, y in zip(signature_a, signature_b)) / MINHASH_PERMUTATIONS
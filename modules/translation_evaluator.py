@@ -8,19 +8,42 @@ import re
 import time
 from pathlib import Path
 
+from .atomic_store import get_store, new_id
+from .catalog import get_catalog
+from .corpus_store import CorpusStore
+from .metrics import (
+    get_metrics_recorder, timed_completion, record_stream_call,
+    STAGE_PROMPT_BUILD, STAGE_FILE_WRITE
+)
+from .prompt_templates import EVALUATION_TEMPLATE
+from .sentence_aligner import align_sentences
+from .text_utils import estimate_tokens
+
 
 def get_available_articles(articles_dir='articles'):
-    """获取所有可用的文章文件"""
-    article_files = list(Path(articles_dir).glob('*.md'))
+    """获取所有可用的文章文件（articles_dir 也可以是 CorpusStore，此时返回语料库记录）"""
+    if isinstance(articles_dir, CorpusStore):
+        return articles_dir.list_records('article')
+    article_files = get_catalog().list_files('article', articles_dir)
     return article_files
 
 
 def get_available_translations(translations_dir='translations'):
-    """获取所有可用的翻译文件"""
-    translation_files = list(Path(translations_dir).glob('*.txt'))
+    """获取所有可用的翻译文件（translations_dir 也可以是 CorpusStore）"""
+    if isinstance(translations_dir, CorpusStore):
+        return translations_dir.list_records('translation')
+    translation_files = get_catalog().list_files('translation', translations_dir)
     return translation_files
 
 
+def _read_text(source):
+    """读取文件路径或语料库记录（任何带 read_text 方法的对象）的内容"""
+    if hasattr(source, 'read_text'):
+        return source.read_text(encoding='utf-8')
+    with open(source, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
 def display_available_files(articles, translations):
     """显示可用的文章和翻译文件"""
     print("可用的文章文件：")
@@ -41,8 +64,7 @@ def display_available_files(articles, translations):
 def extract_article_content(article_path):
     """从文章文件中提取正文内容"""
     try:
-        with open(article_path, 'r', encoding='utf-8') as f:
-            article_content = f.read()
+        article_content = _read_text(article_path)
         
         # 提取英文正文
         content_match = re.search(r'## 正文\s*\n(.*?)(?=\n---|\Z)', article_content, re.DOTALL)
@@ -61,90 +83,154 @@ def extract_article_content(article_path):
 def read_user_translation(translation_path):
     """读取用户翻译文件"""
     try:
-        with open(translation_path, 'r', encoding='utf-8') as f:
-            user_translations = [line.strip() for line in f.readlines() if line.strip()]
+        user_translations = [line.strip() for line in _read_text(translation_path).splitlines() if line.strip()]
         return user_translations
     except Exception as e:
         raise Exception(f"读取翻译文件时出错: {e}")
 
 
-def evaluate_translation_with_ai(client, model, english_sentences, user_translations):
-    """使用AI评估翻译质量"""
-    
-    print(f"原文句数: {len(english_sentences)}")
-    print(f"翻译句数: {len(user_translations)}")
-    
-    # 构建评估提示词
-    evaluation_pairs = []
-    for i, (eng, trans) in enumerate(zip(english_sentences, user_translations), 1):
-        evaluation_pairs.append(f"""
-句子 {i}:
-英文原文: {eng}
-用户翻译: {trans}
-""")
-    
-    prompt = f"""请作为专业的英语翻译评估专家，对以下英中翻译进行详细评估：
+SENTENCE_HEADER_PATTERN = re.compile(r'^## \*\*SENTENCE (\d+)\*\*', re.MULTILINE)
+SECTION_HEADER_PATTERN = re.compile(r'^## ', re.MULTILINE)
+FIELD_PATTERNS = {
+    'original': re.compile(r'\*\*原文\*\*:\s*(.*)'),
+    'user_translation': re.compile(r'\*\*用户翻译\*\*:\s*(.*)'),
+    'reference': re.compile(r'\*\*标准翻译\*\*:\s*(.*)'),
+    'fluent': re.compile(r'\*\*\*流畅翻译\*\*\*:\s*(.*)'),
+    'score': re.compile(r'\*\*评分\*\*:\s*\[?(\d+(?:\.\d+)?)'),
+    'comment': re.compile(r'\*\*评价\*\*:\s*(.*)', re.DOTALL),
+}
+
+MISSING_ENGLISH = "（无对应原文）"
+MISSING_TRANSLATION = "（未翻译）"
+
+REPORT_FOOTER = """
+## 使用说明
+本报告由AI自动生成，评估了您的英文翻译质量。请参考以下建议继续改进：
+
+1. **词汇选择**: 注意英文单词的准确对应和语境适配
+2. **语法结构**: 确保中文表达符合语法规范
+3. **语言流畅度**: 让翻译读起来自然流畅
+4. **文化适应**: 考虑中英文表达习惯的差异
+
+继续练习，您的翻译水平会不断提高！
 
-{chr(10).join(evaluation_pairs)}
+---
+*本报告由IwillbeEnMasteroooh学习系统自动生成*
+"""
 
-请严格按照以下格式对每个句子（如果发现用户很可能只是漏了/多了一个句子/句子错位请自行调整）进行评估，并在重点内容使用markdown格式强调：
 
-## **SENTENCE 1**
+def _pair_sentences(english_sentences, user_translations):
+    """将原文句子与翻译句子在本地对齐配对，缺失的一侧用占位文本标注"""
+    pairs = []
+    for pair in align_sentences(english_sentences, user_translations):
+        pairs.append((pair.english or MISSING_ENGLISH, pair.translation or MISSING_TRANSLATION))
+    return pairs
 
-**原文**: [英文原文]
-**用户翻译**: [用户的中文翻译]
-**标准翻译**: [您认为的标准中文翻译]
-***流畅翻译***: [更加流畅自然的中文翻译]
-**评分**: [1-10分的评分]
-**评价**: [详细的评价和改进建议，包括***词汇***、~~语法~~、*流畅度*等方面]
 
-## **SENTENCE 2**
+def build_evaluation_request(model, english_sentences, user_translations):
+    """构建翻译评估的请求参数"""
+    pairs = _pair_sentences(english_sentences, user_translations)
+    return build_evaluation_request_for_pairs(model, pairs)
 
-[继续同样格式...]
 
-最后请提供整体评估：
+def build_evaluation_request_for_pairs(model, pairs, max_tokens=4000, include_overall=True):
+    """根据 (原文, 翻译) 句对构建评估请求参数，include_overall=False 时不要求整体评估
 
-## **整体评估**
+    评分标准和输出格式位于模板的静态前缀中，句对和附加要求放在最后的用户消息里。
+    """
+    
+    evaluation_pairs = []
+    for i, (eng, trans) in enumerate(pairs, 1):
+        evaluation_pairs.append(f"""句子 {i}:
+英文原文: {eng}
+用户翻译: {trans}
+""")
+    
+    data = "请评估以下英中翻译：\n\n" + "\n".join(evaluation_pairs)
+    if not include_overall:
+        data += "\n只需评估以上句子，不需要提供整体评估。"
 
-**整体评分**: [1-10分]
-**总体评价**: [整体翻译质量的综合评价]
-***主要优点***: [列出翻译的主要优点]
-~~主要问题~~: [列出需要改进的主要问题]
-***改进建议***: [具体的改进建议]
+    return {
+        'model': model,
+        'messages': EVALUATION_TEMPLATE.build_messages(data),
+        'max_tokens': max_tokens,
+        'temperature': 0.3
+    }
 
-**评分标准**：
-- **9-10分**：翻译准确，语言流畅，完全符合中文表达习惯
-- **7-8分**：翻译基本准确，语言较流畅，有轻微不当之处
-- **5-6分**：翻译大意正确，但有明显的词汇或语法问题
-- **3-4分**：翻译部分正确，存在较多错误
-- **1-2分**：翻译错误较多，严重影响理解
 
-请确保使用markdown格式对重点内容进行强调：**粗体**、***斜体加粗***、~~删除线~~、*斜体*。"""
+def evaluate_translation_with_ai(client, model, english_sentences, user_translations, hedge=False):
+    """使用AI评估翻译质量
+
+    交互式评估可传入 hedge=True，启用模型路由时慢请求会向另一端点发送对冲请求；批量任务保持默认值。
+    """
+    
+    print(f"原文句数: {len(english_sentences)}")
+    print(f"翻译句数: {len(user_translations)}")
+    
+    with get_metrics_recorder().stage('evaluate', STAGE_PROMPT_BUILD):
+        pairs = _pair_sentences(english_sentences, user_translations)
+        request = build_evaluation_request_for_pairs(model, pairs)
 
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "你是一位资深的英语翻译评估专家，具有丰富的翻译教学经验。请客观公正地评估翻译质量，并提供有建设性的改进建议。输出时请严格使用markdown格式对重点内容进行强调。"},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=4000,
-            temperature=0.3
-        )
+        response = timed_completion(client, 'evaluate', request, hedge=hedge, sentences=len(pairs))
         
         return response.choices[0].message.content
     except Exception as e:
         raise Exception(f"评估翻译时出错: {e}")
 
 
-def generate_evaluation_report(evaluation_result, article_title, translation_filename, model, results_dir='translation_results'):
-    """生成评估报告并保存"""
+def parse_sentence_section(section_text):
+    """解析单个 ## **SENTENCE N** 评估段落，返回字段字典"""
+    header = SENTENCE_HEADER_PATTERN.search(section_text)
+    result = {
+        'number': int(header.group(1)) if header else None,
+        'text': section_text.strip()
+    }
+    for field, pattern in FIELD_PATTERNS.items():
+        match = pattern.search(section_text)
+        value = match.group(1).strip() if match else None
+        if field == 'score' and value is not None:
+            value = float(value)
+        result[field] = value
+    return result
+
+
+def split_evaluation_sections(evaluation_result):
+    """将评估结果按 ## 标题拆分为段落列表"""
+    starts = [m.start() for m in SECTION_HEADER_PATTERN.finditer(evaluation_result)]
+    return [evaluation_result[start:end].strip()
+            for start, end in zip(starts, starts[1:] + [len(evaluation_result)])]
+
+
+def renumber_sentence_sections(section_texts, start=1):
+    """按顺序重新编号 ## **SENTENCE N** 段落并合并为评估文本"""
+    renumbered = []
+    for number, section_text in enumerate(section_texts, start):
+        renumbered.append(SENTENCE_HEADER_PATTERN.sub(f"## **SENTENCE {number}**", section_text.strip(), count=1))
+    return "\n\n".join(renumbered)
+
+
+def build_overall_section(scores):
+    """根据各句评分在本地计算整体评估段落"""
+    numbered = [(i, score) for i, score in enumerate(scores, 1) if score is not None]
+    if not numbered:
+        return "## **整体评估**\n\n**整体评分**: 无  \n**总体评价**: 没有可用的句子评分。"
     
-    if not evaluation_result:
-        raise ValueError("没有评估结果可生成报告")
+    values = [score for _, score in numbered]
+    average = sum(values) / len(values)
+    weakest = sorted(numbered, key=lambda item: item[1])[:3]
+    weakest_text = "、".join(f"句子 {i}（{score:g}分）" for i, score in weakest)
     
-    # 构建报告内容
-    report_content = f"""# AI翻译评估报告
+    return f"""## **整体评估**
+
+**整体评分**: {average:.1f}  
+**总体评价**: 共评估 {len(values)} 句，平均 {average:.1f} 分，最高 {max(values):g} 分，最低 {min(values):g} 分。  
+~~主要问题~~: 得分最低的句子为 {weakest_text}，请优先参考这些句子的评价进行改进。"""
+
+
+def _build_report_header(article_title, translation_filename, model):
+    """构建评估报告的头部信息"""
+    return f"""# AI翻译评估报告
 
 ## 基本信息
 - **原文章标题**: {article_title}
@@ -154,36 +240,137 @@ def generate_evaluation_report(evaluation_result, article_title, translation_fil
 
 ## 详细评估结果
 
-{evaluation_result}
+"""
 
-## 使用说明
-本报告由AI自动生成，评估了您的英文翻译质量。请参考以下建议继续改进：
 
-1. **词汇选择**: 注意英文单词的准确对应和语境适配
-2. **语法结构**: 确保中文表达符合语法规范
-3. **语言流畅度**: 让翻译读起来自然流畅
-4. **文化适应**: 考虑中英文表达习惯的差异
+def _new_report_path(results_dir):
+    """生成新的评估报告路径"""
+    report_filename = f"AI_translation_evaluation_{new_id()}.md"
+    
+    # 确保目录存在
+    Path(results_dir).mkdir(exist_ok=True)
+    
+    return Path(results_dir) / report_filename
 
-继续练习，您的翻译水平会不断提高！
 
----
-*本报告由IwillbeEnMasteroooh学习系统自动生成*
-"""
+def generate_evaluation_report(evaluation_result, article_title, translation_filename, model, results_dir='translation_results'):
+    """生成评估报告并保存"""
     
-    # 保存报告
-    timestamp = time.strftime('%Y%m%d_%H%M%S')
-    report_filename = f"AI_translation_evaluation_{timestamp}.md"
-    report_path = Path(results_dir) / report_filename
+    if not evaluation_result:
+        raise ValueError("没有评估结果可生成报告")
     
-    # 确保目录存在
-    Path(results_dir).mkdir(exist_ok=True)
+    # 构建报告内容
+    report_content = _build_report_header(article_title, translation_filename, model) + evaluation_result + "\n" + REPORT_FOOTER
     
-    with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(report_content)
+    # 保存报告
+    report_path = _new_report_path(results_dir)
+    
+    with get_metrics_recorder().stage('evaluate', STAGE_FILE_WRITE):
+        get_store().write_text(report_path, report_content)
     
     return report_path, report_content
 
 
+def stream_evaluation_with_ai(client, model, english_sentences, user_translations, article_title,
+                              translation_filename, results_dir='translation_results'):
+    """流式评估翻译质量
+
+    每当一个 ## **SENTENCE N** 段落完整接收后，立即追加写入 translation_results/ 下的 .partial.md 文件，
+    并 yield 该句的解析结果：report_path 为当前写入的 .partial.md，final_report_path 为完成后的报告路径。
+    全部完成后原子重命名为最终报告；出错或调用方提前停止迭代时保留 .partial.md 中已评估的句子。
+    """
+    
+    print(f"原文句数: {len(english_sentences)}")
+    print(f"翻译句数: {len(user_translations)}")
+    
+    with get_metrics_recorder().stage('evaluate', STAGE_PROMPT_BUILD):
+        pairs = _pair_sentences(english_sentences, user_translations)
+        request = build_evaluation_request_for_pairs(model, pairs)
+    report_path = _new_report_path(results_dir)
+    partial_path = report_path.with_suffix('.partial.md')
+    print(f"报告将实时写入: {partial_path}（完成后重命名为 {report_path.name}）")
+    
+    def emit(report_file, section_text):
+        report_file.write(section_text.strip() + "\n\n")
+        report_file.flush()
+        if SENTENCE_HEADER_PATTERN.match(section_text):
+            result = parse_sentence_section(section_text)
+            result['report_path'] = partial_path
+            result['final_report_path'] = report_path
+            return result
+        return None
+    
+    start = time.perf_counter()
+    try:
+        stream = client.chat.completions.create(stream=True, stream_options={'include_usage': True}, **request)
+    except Exception as e:
+        record_stream_call('evaluate', model, time.perf_counter() - start, request=request,
+                           ok=False, status='error', error=e.__class__.__name__, sentences=len(pairs))
+        raise Exception(f"评估翻译时出错: {e}")
+    first_token_sec = None
+    usage = None
+    received = []
+    status, error = 'ok', None
+    
+    try:
+        with get_store().open(report_path, tmp_path=partial_path, keep_partial=True) as report_file:
+            report_file.write(_build_report_header(article_title, translation_filename, model))
+            report_file.flush()
+        
+            buffer = ""
+            for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token_sec is None:
+                    first_token_sec = time.perf_counter() - start
+                buffer += delta
+                received.append(delta)
+            
+                # 出现下一个 ## 标题时，之前的段落已经完整
+                while True:
+                    headers = list(SECTION_HEADER_PATTERN.finditer(buffer))
+                    if len(headers) < 2:
+                        break
+                    section_text = buffer[headers[0].start():headers[1].start()]
+                    buffer = buffer[headers[1].start():]
+                    result = emit(report_file, section_text)
+                    if result:
+                        yield result
+        
+            # 最后一个段落（通常为整体评估）
+            if buffer.strip():
+                result = emit(report_file, buffer)
+                if result:
+                    yield result
+        
+            report_file.write(REPORT_FOOTER.lstrip("\n"))
+    except GeneratorExit:
+        status = 'cancelled'
+        raise
+    except BaseException as e:
+        status, error = 'error', e.__class__.__name__
+        raise
+    finally:
+        # 调用方提前停止迭代时关闭HTTP流，不再接收（和计费）后续输出
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
+        if status != 'ok':
+            # 已评估的句子保留在 .partial.md 中
+            print(f"评估未完成，已评估的部分保留在: {partial_path}")
+        # 取消的调用没有服务端返回的用量，按已收到的文本估算输出token数
+        record_stream_call('evaluate', model, time.perf_counter() - start, first_token_sec, usage,
+                           request=request, ok={'ok': True, 'error': False}.get(status), status=status,
+                           error=error, sentences=len(pairs),
+                           streamed_tokens=estimate_tokens(''.join(received)))
+    
+    print(f"评估报告已保存: {report_path}")
+
+
 def display_evaluation_preview(report_content, char_limit=500):
     """显示评估报告预览"""
     print("\n=== 报告预览 ===")
@@ -194,35 +381,21 @@ def display_evaluation_preview(report_content, char_limit=500):
 def find_matching_files(article_filename, translation_filename=None, articles_dir='articles', translations_dir='translations'):
     """根据文件名查找匹配的文章和翻译文件"""
     
-    # 查找文章文件
-    article_path = None
-    articles = get_available_articles(articles_dir)
+    catalog = get_catalog()
     
-    for article in articles:
-        if article_filename.lower() in article.name.lower() or article.name.lower() in article_filename.lower():
-            article_path = article
-            break
+    # 查找文章文件
+    article_path = catalog.find_file('article', articles_dir, article_filename)
     
     if not article_path:
         raise FileNotFoundError(f"未找到匹配的文章文件: {article_filename}")
     
     # 查找翻译文件
-    translation_path = None
-    translations = get_available_translations(translations_dir)
-    
     if translation_filename:
         # 指定了翻译文件名
-        for translation in translations:
-            if translation_filename.lower() in translation.name.lower() or translation.name.lower() in translation_filename.lower():
-                translation_path = translation
-                break
+        translation_path = catalog.find_file('translation', translations_dir, translation_filename)
     else:
         # 自动查找匹配的翻译文件
-        article_stem = article_path.stem
-        for translation in translations:
-            if article_stem.lower() in translation.name.lower():
-                translation_path = translation
-                break
+        translation_path = catalog.find_translation_for_article(article_path, translations_dir)
     
     if not translation_path:
         raise FileNotFoundError(f"未找到匹配的翻译文件: {translation_filename or '自动匹配'}")
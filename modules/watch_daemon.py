@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+翻译监控模块
+轮询 translations/ 目录，新增或修改的翻译自动匹配文章并通过有界线程池评估；状态持久化到文件，内容哈希已有报告的翻译不会重复调用API
+
+用法: python -m modules.watch_daemon --interval 5 --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .atomic_store import get_store
+from .catalog import get_catalog
+from .file_manager import extract_title_from_article
+from .translation_evaluator import (
+    extract_article_content, read_user_translation, evaluate_translation_with_ai, generate_evaluation_report
+)
+
+DEFAULT_STATE_FILE = '.watch_state.json'
+STATE_VERSION = 1
+MAX_ATTEMPTS = 3
+
+
+def content_hash(translation_path, article_path):
+    """翻译内容与所匹配文章的哈希，同一份翻译对应同一篇文章时结果相同"""
+    digest = hashlib.sha256()
+    digest.update(Path(article_path).name.encode('utf-8'))
+    digest.update(b'\0')
+    with open(translation_path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+class TranslationWatcher:
+    """监控翻译目录并增量评估
+
+    状态文件记录每个翻译文件的 (mtime_ns, size, 哈希)，以及 哈希 -> 报告路径。
+    """
+
+    def __init__(self, client, model, translations_dir='translations', articles_dir='articles',
+                 results_dir='translation_results', state_path=DEFAULT_STATE_FILE, max_workers=4):
+        self.client = client
+        self.model = model
+        self.translations_dir = Path(translations_dir)
+        self.articles_dir = Path(articles_dir)
+        self.results_dir = Path(results_dir)
+        self.state_path = Path(state_path)
+        self.max_workers = max_workers
+        self.max_pending = max_workers * 2
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._unmatched = set()
+        self._failures = {}
+        self.state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return {'version': STATE_VERSION, 'files': {}, 'reports': {}}
+
+    def _save_state(self):
+        with self._lock:
+            content = json.dumps(self.state, ensure_ascii=False, indent=2)
+        get_store().write_text(self.state_path, content)
+
+    def _changed_files(self):
+        """返回自上次处理后新增或修改的翻译文件"""
+        changed = []
+        try:
+            entries = list(os.scandir(self.translations_dir))
+        except FileNotFoundError:
+            return changed
+        for entry in sorted(entries, key=lambda e: e.name):
+            if not entry.name.endswith('.txt') or entry.name.startswith('.') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            known = self.state['files'].get(entry.name)
+            if known and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+                continue
+            changed.append((Path(entry.path), stat))
+        return changed
+
+    def poll(self):
+        """扫描一次目录，将需要评估的翻译加入线程池，返回加入的数量"""
+        queued = 0
+        for path, stat in self._changed_files():
+            with self._lock:
+                if path.name in self._in_flight or len(self._in_flight) >= self.max_pending:
+                    continue
+                # 同一版本的文件连续失败多次后不再重试，文件再次修改时重新计数
+                failed_version, attempts = self._failures.get(path.name, (None, 0))
+                if failed_version == (stat.st_mtime_ns, stat.st_size) and attempts >= MAX_ATTEMPTS:
+                    continue
+
+            article_path = get_catalog().find_article_for_translation(path, self.articles_dir)
+            if not article_path:
+                if path.name not in self._unmatched:
+                    print(f"⚠️ 未找到与 {path.name} 匹配的文章，等待文章出现后重试")
+                    self._unmatched.add(path.name)
+                continue
+            self._unmatched.discard(path.name)
+
+            digest = content_hash(path, article_path)
+            report = self.state['reports'].get(digest)
+            if report and Path(report).exists():
+                with self._lock:
+                    self.state['files'][path.name] = [stat.st_mtime_ns, stat.st_size, digest]
+                self._save_state()
+                print(f"⏭️ {path.name} 内容未变化，已有报告: {Path(report).name}")
+                continue
+
+            with self._lock:
+                self._in_flight.add(path.name)
+            future = self.executor.submit(self._evaluate, path, article_path)
+            future.add_done_callback(
+                lambda f, path=path, stat=stat, digest=digest: self._finished(f, path, stat, digest)
+            )
+            queued += 1
+        return queued
+
+    def _evaluate(self, translation_path, article_path):
+        english_sentences = extract_article_content(article_path)
+        user_translations = read_user_translation(translation_path)
+        evaluation_result = evaluate_translation_with_ai(self.client, self.model, english_sentences, user_translations)
+        report_path, _ = generate_evaluation_report(
+            evaluation_result, extract_title_from_article(article_path), translation_path.name,
+            self.model, self.results_dir
+        )
+        return report_path
+
+    def _finished(self, future, path, stat, digest):
+        try:
+            report_path = future.result()
+        except Exception as e:
+            # 不记录文件状态，下次轮询时重试（同一版本最多 MAX_ATTEMPTS 次）
+            print(f"❌ 评估 {path.name} 失败: {e}")
+            version = (stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                previous_version, attempts = self._failures.get(path.name, (None, 0))
+                self._failures[path.name] = (version, attempts + 1 if previous_version == version else 1)
+                self._in_flight.discard(path.name)
+            return
+
+        with self._lock:
+            self.state['files'][path.name] = [stat.st_mtime_ns, stat.st_size, digest]
+            self.state['reports'][digest] = str(report_path)
+            self._in_flight.discard(path.name)
+        self._save_state()
+        print(f"✅ {path.name} 评估完成: {Path(report_path).name}")
+
+    def pending(self):
+        """正在评估的翻译数量"""
+        with self._lock:
+            return len(self._in_flight)
+
+    def run(self, interval=5.0, once=False):
+        """持续轮询；once=True 时处理完当前所有翻译后退出"""
+        print(f"开始监控 {self.translations_dir}，间隔 {interval} 秒，并发数 {self.max_workers}")
+        try:
+            while True:
+                queued = self.poll()
+                if once and not queued and not self.pending():
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n正在停止监控，等待进行中的评估完成...")
+        finally:
+            self.executor.shutdown(wait=True)
+            self._save_state()
+
+
+def main():
+    from .config_manager import load_config, init_openai_client
+
+    parser = argparse.ArgumentParser(description="监控翻译目录并自动评估新的翻译")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--translations', default='translations')
+    parser.add_argument('--articles', default='articles')
+    parser.add_argument('--results', default='translation_results')
+    parser.add_argument('--state', default=DEFAULT_STATE_FILE, help="状态文件路径")
+    parser.add_argument('--interval', type=float, default=5.0, help="轮询间隔（秒）")
+    parser.add_argument('--workers', type=int, default=4, help="并发评估数")
+    parser.add_argument('--once', action='store_true', help="处理完当前所有翻译后退出")
+    args = parser.parse_args()
+
+    client, model = init_openai_client(load_config(args.config))
+    watcher = TranslationWatcher(client, model, args.translations, args.articles, args.results,
+                                 args.state, args.workers)
+    watcher.run(args.interval, args.once)
+
+
+if __name__ == '__main__':
+    main()
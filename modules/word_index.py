@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+单词倒排索引模块
+对 articles/ 中的文章分词、词形归一后建立倒排索引，按文件修改时间增量更新
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+INDEX_FILENAME = '.word_index.json'
+INDEX_VERSION = 2
+
+WORD_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+WORD_LIST_PATTERN = re.compile(r'本文基于单词列表 "(.*?)" 生成')
+
+
+def _consonant_pattern(stem):
+    """单词的辅音/元音序列，y 在辅音后视为元音"""
+    pattern = []
+    for i, ch in enumerate(stem):
+        vowel = ch in 'aeiou' or (ch == 'y' and i > 0 and pattern[-1] == 'c')
+        pattern.append('v' if vowel else 'c')
+    return ''.join(pattern)
+
+
+def _measure(stem):
+    """Porter算法中的m值：词干中“元音串+辅音串”出现的次数"""
+    return _consonant_pattern(stem).count('vc')
+
+
+def _ends_cvc(stem):
+    """词干以 辅音-元音-辅音 结尾且最后一个辅音不是 w、x、y（例如 hop、bar）"""
+    return len(stem) >= 3 and _consonant_pattern(stem).endswith('cvc') and stem[-1] not in 'wxy'
+
+
+def normalize_word(word):
+    """轻量词形归一：按Porter算法的规则去掉复数、过去式、进行时词尾
+
+    结果本身不一定是合法单词（例如 cause / caused 都归一为 "caus"），
+    -eed 结尾的词不去掉 ed，因此 seed / see、feed / fee、need 互不混淆，bare / bar 也保持不同。
+    """
+    w = word.lower().strip("'")
+    if w.endswith("'s"):
+        w = w[:-2]
+
+    if len(w) > 4 and w.endswith('ies'):
+        w = w[:-3] + 'y'
+    elif len(w) > 4 and w.endswith(('sses', 'shes', 'ches', 'xes', 'zes')):
+        w = w[:-2]
+    elif len(w) > 3 and w.endswith('s') and not w.endswith(('ss', 'us', 'is')):
+        w = w[:-1]
+
+    if len(w) > 4 and w.endswith('ied'):
+        w = w[:-3] + 'y'
+    else:
+        stem = None
+        if len(w) > 4 and w.endswith('ing'):
+            stem = w[:-3]
+        elif len(w) > 3 and w.endswith('ed') and not w.endswith('eed'):
+            stem = w[:-2]
+        # 词干中必须有元音，例如 bring、shed 不是屈折形式
+        if stem and 'v' in _consonant_pattern(stem):
+            if stem.endswith(('at', 'bl', 'iz')):
+                stem += 'e'
+            elif len(stem) > 2 and stem[-1] == stem[-2] and stem[-1] not in 'aeioulsz':
+                stem = stem[:-1]
+            elif _measure(stem) == 1 and _ends_cvc(stem):
+                stem += 'e'
+            elif len(stem) < 3 and w.endswith('ed'):
+                # tied、used 这类短词只去掉 d
+                stem += 'e'
+            w = stem
+
+    # 去掉词尾不发音的 e，使 hope / hoped / hoping 一致；短词（see、fee）和 bare 这类词保留
+    if w.endswith('e') and not w.endswith('ee'):
+        stem = w[:-1]
+        if _measure(stem) > 1 or (_measure(stem) == 1 and not _ends_cvc(stem)):
+            w = stem
+    return w
+
+
+def tokenize(text):
+    """将文本切分为归一化后的单词列表"""
+    return [normalize_word(token) for token in WORD_PATTERN.findall(text.lower())]
+
+
+class WordIndex:
+    """文章目录的倒排索引：归一化单词 -> {文件名: 出现次数}"""
+
+    def __init__(self, articles_dir='articles'):
+        self.articles_dir = Path(articles_dir)
+        self.index_path = self.articles_dir / INDEX_FILENAME
+        self.files = {}
+        self.postings = {}
+        self._dirty = False
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        """从磁盘读取索引"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get('version') != INDEX_VERSION:
+            return
+        for name, (mtime_ns, size, word_list, counts) in data['files'].items():
+            self._add_entry(name, mtime_ns, size, word_list, counts)
+
+    def save(self):
+        """将索引写回磁盘（仅在有变化时）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                'version': INDEX_VERSION,
+                'files': {name: [entry['mtime_ns'], entry['size'], entry['word_list'], entry['counts']]
+                          for name, entry in self.files.items()}
+            }
+            self.articles_dir.mkdir(exist_ok=True)
+            tmp_path = self.index_path.with_name(f"{INDEX_FILENAME}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+    def _add_entry(self, name, mtime_ns, size, word_list, counts):
+        self.files[name] = {'mtime_ns': mtime_ns, 'size': size, 'word_list': word_list, 'counts': counts}
+        for stem, count in counts.items():
+            self.postings.setdefault(stem, {})[name] = count
+
+    def _remove_entry(self, name):
+        entry = self.files.pop(name, None)
+        if not entry:
+            return
+        for stem in entry['counts']:
+            postings = self.postings.get(stem)
+            if postings:
+                postings.pop(name, None)
+                if not postings:
+                    del self.postings[stem]
+
+    def add_article(self, path, stat=None):
+        """索引（或重新索引）单篇文章"""
+        path = Path(path)
+        stat = stat or path.stat()
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        word_list_match = WORD_LIST_PATTERN.search(content)
+        word_list = word_list_match.group(1) if word_list_match else None
+        counts = dict(Counter(tokenize(content)))
+
+        with self._lock:
+            self._remove_entry(path.name)
+            self._add_entry(path.name, stat.st_mtime_ns, stat.st_size, word_list, counts)
+            self._dirty = True
+
+    def add_articles(self, paths):
+        """批量索引新保存的文章"""
+        for path in paths:
+            self.add_article(path)
+
+    def refresh(self):
+        """根据文件修改时间和大小增量更新索引，返回 (新增或更新数, 删除数)"""
+        if not self.articles_dir.exists():
+            return 0, 0
+
+        seen = set()
+        updated = 0
+        with os.scandir(self.articles_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.md') or not entry.is_file():
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                indexed = self.files.get(entry.name)
+                if indexed and indexed['mtime_ns'] == stat.st_mtime_ns and indexed['size'] == stat.st_size:
+                    continue
+                try:
+                    self.add_article(entry.path, stat)
+                    updated += 1
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"索引文章 {entry.name} 时出错: {e}")
+
+        with self._lock:
+            removed = [name for name in self.files if name not in seen]
+            for name in removed:
+                self._remove_entry(name)
+            if removed:
+                self._dirty = True
+
+        self.save()
+        return updated, len(removed)
+
+    def count(self, word, filenames=None):
+        """统计单词（含屈折变化）在全部或指定文章中的出现次数"""
+        postings = self.postings.get(normalize_word(word), {})
+        if filenames is None:
+            return sum(postings.values())
+        return sum(postings.get(name, 0) for name in filenames)
+
+    def word_counts(self, words, filenames=None):
+        """批量统计单词出现次数，返回 {单词小写: 次数}"""
+        return {word.lower(): self.count(word, filenames) for word in words}
+
+    def articles_with_word(self, word):
+        """返回包含该单词的文章文件名列表，按出现次数降序"""
+        postings = self.postings.get(normalize_word(word), {})
+        return sorted(postings, key=postings.get, reverse=True)
+
+    def articles_for_word_list(self, word_list_name):
+        """返回基于某个单词列表生成的文章文件名列表"""
+        return [name for name, entry in self.files.items() if entry['word_list'] == word_list_name]
+
+    def coverage_for_word_list(self, word_list_name, words):
+        """统计单词列表中每个单词在该列表所有文章中的出现次数"""
+        return self.word_counts(words, self.articles_for_word_list(word_list_name))
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_word_index(articles_dir='articles'):
+    """获取（并缓存）某个文章目录的倒排索引"""
+    key = str(Path(articles_dir).resolve())
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = WordIndex(articles_dir)
+        return _indexes[key]
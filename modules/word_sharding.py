@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+单词列表分片模块
+按输出token预算将大型单词列表切分为多个分片（拼写前缀相同的单词尽量放在同一分片），并发生成后汇总文章和整张列表的覆盖清单
+"""
+
+import json
+import math
+from pathlib import Path
+
+from .article_generator import generate_articles_batch, count_word_coverage
+from .atomic_store import get_store
+from .word_index import normalize_word
+
+# 输出token估算：每个目标单词每出现一次约需一句话，每篇文章另有标题、摘要和格式标记
+TOKENS_PER_WORD_OCCURRENCE = 30
+TOKENS_PER_ARTICLE_OVERHEAD = 80
+PREFIX_GROUP_LENGTH = 5
+DEFAULT_COVERAGE_DIR = 'metrics/coverage'
+
+
+def max_words_per_shard(token_budget=3000, count=3, min_occurrences=2):
+    """根据输出token预算计算每个分片最多容纳的单词数"""
+    available = token_budget - count * TOKENS_PER_ARTICLE_OVERHEAD
+    return max(1, available // (TOKENS_PER_WORD_OCCURRENCE * max(1, min_occurrences)))
+
+
+def prefix_group_key(word):
+    """前缀分组键：归一化后前5个字母相同的单词视为同一组
+
+    只按拼写分组，能把同一词族（如 legislate / legislation / legislature）放在一起，
+    但不代表话题相关（interest / internet 也会同组）。需要按话题分组时可向 plan_word_shards 传入自定义 key。
+    """
+    return normalize_word(word)[:PREFIX_GROUP_LENGTH]
+
+
+def plan_word_shards(words, token_budget=3000, count=3, min_occurrences=2, key=prefix_group_key):
+    """将单词列表切分为若干分片，返回单词列表的列表
+
+    先按分组键（默认为拼写前缀）分组，再按组大小从大到小放入剩余容量足够的分片（first-fit decreasing），
+    同组单词尽量不拆开；超过分片容量的组按容量拆分。结果与输入顺序无关，相同输入得到相同分片。
+    """
+    unique_words = list(dict.fromkeys(w.strip() for w in words if w.strip()))
+    if not unique_words:
+        return []
+    # 在预算允许的最大分片容量内均衡各分片大小，避免最后一个分片过小
+    max_size = max_words_per_shard(token_budget, count, min_occurrences)
+    shard_count = math.ceil(len(unique_words) / max_size)
+    shard_size = math.ceil(len(unique_words) / shard_count)
+
+    groups = {}
+    for word in unique_words:
+        groups.setdefault(key(word), []).append(word)
+
+    pieces = []
+    for group_key in sorted(groups):
+        group = sorted(groups[group_key], key=str.lower)
+        pieces.extend(group[i:i + shard_size] for i in range(0, len(group), shard_size))
+    pieces.sort(key=len, reverse=True)
+
+    shards = []
+    for piece in pieces:
+        for shard in shards:
+            if len(shard) + len(piece) <= shard_size:
+                shard.extend(piece)
+                break
+        else:
+            shards.append(list(piece))
+    return shards
+
+
+def generate_sharded_articles(client, model, words, word_list_name, topic, genre, difficulty, count=3,
+                              min_occurrences=2, token_budget=3000, max_workers=4, articles_dir='articles',
+                              coverage_dir=DEFAULT_COVERAGE_DIR):
+    """分片并发生成文章，返回 (全部文章, 覆盖清单)，覆盖清单同时保存为 coverage_dir/{word_list_name}-coverage.json
+
+    所有分片的文章都使用原单词列表名称，WordIndex 按列表名称统计覆盖时包含全部分片；分片编号只记录在覆盖清单中。
+    """
+    shards = plan_word_shards(words, token_budget, count, min_occurrences)
+    print(f"单词列表 {word_list_name}: {len(words)} 个单词，切分为 {len(shards)} 个分片")
+
+    jobs = [{
+        'words': shard,
+        'word_list_name': word_list_name,
+        'shard': i,
+        'topic': topic, 'genre': genre, 'difficulty': difficulty,
+        'count': count, 'min_occurrences': min_occurrences, 'max_tokens': token_budget
+    } for i, shard in enumerate(shards, 1)]
+    results, failures = generate_articles_batch(client, model, jobs, max_workers, articles_dir)
+
+    articles = [article for result in results for article in result['articles']]
+    word_counts = count_word_coverage(articles, words)
+    insufficient_words = [word for word, c in word_counts.items() if c < min_occurrences]
+
+    manifest = {
+        'word_list_name': word_list_name,
+        'total_words': len(word_counts),
+        'min_occurrences': min_occurrences,
+        'shards': [{
+            'shard': result['job']['shard'],
+            'words': result['job']['words'],
+            'articles': [article['filename'] for article in result['articles']],
+            'error': result['error']
+        } for result in results],
+        'coverage': word_counts,
+        'insufficient_words': insufficient_words
+    }
+
+    manifest_path = Path(coverage_dir) / f"{word_list_name}-coverage.json"
+    get_store().write_text(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    covered = len(word_counts) - len(insufficient_words)
+    print(f"分片生成完成: {len(articles)} 篇文章，{covered}/{len(word_counts)} 个单词满足要求，"
+          f"{len(failures)} 个分片失败")
+    print(f"覆盖清单已保存: {manifest_path}")
+    return articles, manifest